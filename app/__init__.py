@@ -3,36 +3,71 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_marshmallow import Marshmallow
 from flask_migrate import Migrate
 from .config import Config
+from .cache import ResponseCache
+from .engine import init_engine
+from .metrics import Metrics
+from .querylog import QueryLog
+from .log import init_logging
+from .compression import Compress
+from .json_provider import json_provider_class
+from .replicas import ReplicaRouter, RoutingSession
+from .idempotency import Idempotency
+from .ratelimit import RateLimiter
 import logging
-from logging.handlers import RotatingFileHandler
-import os
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 ma = Marshmallow()
 migrate = Migrate()
+cache = ResponseCache()
+metrics = Metrics()
+query_log = QueryLog()
+compress = Compress()
+replicas = ReplicaRouter()
+idempotency = Idempotency()
+limiter = RateLimiter()
+
+
+def _include_object(object, name, type_, reflected, compare_to):
+    from .search import is_search_object
+    if reflected and compare_to is None and is_search_object(name):
+        return False
+    # Don't let autogenerate add indexes that are only created on another dialect.
+    ddl_if = getattr(object, '_ddl_if', None)
+    if ddl_if is not None and ddl_if.dialect is not None:
+        return db.engine.dialect.name == ddl_if.dialect
+    return True
 
 
 def create_app(config_class=Config):
     app = Flask(__name__)
 
     app.config.from_object(config_class)
+    app.json = json_provider_class(app.config['JSON_PROVIDER'])(app)
 
+    # First, so refused and shed requests never reach the database.
+    limiter.init_app(app)
+    # Adds the replica binds, so it has to come before the engines are created.
+    replicas.init_app(app)
     db.init_app(app)
+    init_engine(app)
     ma.init_app(app)
-    migrate.init_app(app, db)
+    # SQLite can't ALTER constraints, so autogenerate emits batch (copy-and-move) operations.
+    migrate.init_app(app, db, include_object=_include_object, render_as_batch=True)
+    cache.init_app(app)
+    idempotency.init_app(app)
+    # Registered first so its after_request runs last, outside the request's metrics.
+    query_log.init_app(app)
+    metrics.init_app(app)
+    compress.init_app(app)
 
     from app.routes import api_bp
     app.register_blueprint(api_bp)
 
+    from app.snapshot import catalog_cli
+    app.cli.add_command(catalog_cli)
+
     if not app.debug and not app.testing:
-        if not os.path.exists('logs'):
-            os.mkdir('logs')
-        file_handler = RotatingFileHandler('logs/cake_catalog.log', maxBytes=10240, backupCount=10)
-        file_handler.setLevel(logging.INFO)
-        formatter = logging.Formatter(
-            '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
-        file_handler.setFormatter(formatter)
-        app.logger.addHandler(file_handler)
+        init_logging(app)
     app.logger.setLevel(logging.INFO)
     app.logger.info('Cake Catalog startup')
 
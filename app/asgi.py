@@ -0,0 +1,325 @@
+"""Optional async deployment mode.
+
+Serves the cake and bakery endpoints as a plain ASGI application on top of
+SQLAlchemy's async engine, reusing the models, schemas and row serializers of
+the Flask app. Needs the packages in requirements-async.txt::
+
+    APP_CONFIG=app.config.ProductionConfig uvicorn app.asgi:application
+"""
+import json
+import logging
+import math
+import os
+import re
+from urllib.parse import parse_qs
+from marshmallow import ValidationError
+from sqlalchemy import delete, event, func, insert, select, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.utils import import_string
+from .config import Config
+from .engine import _apply_pragmas, sqlite_pragmas
+from .models import Cake, Bakery, TableVersion, cakes_bakeries
+from .schemas import CakeSchema, BakerySchema
+from .serializers import RowSerializer
+from .stats import count_statement, flavor_refresh_statements, needs_lock, refresh_statements
+from .versions import tables_for
+
+# The Flask app's logger, so both deployment modes log to the same place.
+logger = logging.getLogger('app')
+
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, payload):
+        self.status = status
+        self.payload = payload
+
+
+def not_found():
+    return HTTPError(404, {'error': 'Resource not found'})
+
+
+def async_database_uri(uri):
+    url = make_url(uri)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+
+class Request:
+    def __init__(self, scope, body):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.args = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        self.body = body
+
+    def arg(self, name, type=str):
+        # Same contract as Flask's request.args.get(name, type=...).
+        values = self.args.get(name)
+        if not values:
+            return None
+        try:
+            return type(values[0])
+        except ValueError:
+            return None
+
+    def get_json(self):
+        if not self.body:
+            return None
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            raise HTTPError(400, {'error': 'Failed to decode JSON object'})
+
+
+class Resource:
+    def __init__(self, model, schema_class):
+        self.model = model
+        self.schema_class = schema_class
+        self.serializer = RowSerializer(schema_class())
+        self.tag = 'cakes' if model is Cake else 'bakeries'
+
+    def select(self):
+        return select(*self.serializer.columns)
+
+    def dump(self, row):
+        return self.serializer.dump_row(row)
+
+    def load(self, data, partial=False):
+        return self.schema_class(load_instance=False, partial=partial).load(data)
+
+
+class AsyncCatalog:
+    def __init__(self, config_class=Config):
+        if isinstance(config_class, str):
+            config_class = import_string(config_class)
+        self.config = config_class
+        uri = config_class.ASYNC_DATABASE_URI or async_database_uri(config_class.SQLALCHEMY_DATABASE_URI)
+        self.engine = create_async_engine(uri, **getattr(config_class, 'SQLALCHEMY_ENGINE_OPTIONS', {}))
+        if self.engine.dialect.name == 'sqlite':
+            pragmas = sqlite_pragmas(config_class.SQLITE_PRAGMAS)
+            event.listen(self.engine.sync_engine, 'connect', _apply_pragmas(pragmas))
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+
+        self.cakes = Resource(Cake, CakeSchema)
+        self.bakeries = Resource(Bakery, BakerySchema)
+        self.routes = []
+        for method, pattern, handler in [
+            ('GET', r'/api/v1/cakes', self.list_cakes),
+            ('POST', r'/api/v1/cakes', self.create),
+            ('GET', r'/api/v1/cakes/(?P<id>\d+)', self.get),
+            ('PUT', r'/api/v1/cakes/(?P<id>\d+)', self.update),
+            ('DELETE', r'/api/v1/cakes/(?P<id>\d+)', self.delete),
+            ('GET', r'/api/v1/bakeries', self.list_bakeries),
+            ('POST', r'/api/v1/bakeries', self.create),
+            ('GET', r'/api/v1/bakeries/(?P<id>\d+)', self.get),
+            ('PUT', r'/api/v1/bakeries/(?P<id>\d+)', self.update),
+            ('DELETE', r'/api/v1/bakeries/(?P<id>\d+)', self.delete),
+            ('GET', r'/api/v1/bakeries/(?P<bakery_id>\d+)/cakes', self.list_cakes_by_bakery),
+            ('POST', r'/api/v1/cakes/(?P<cake_id>\d+)/bakeries/(?P<bakery_id>\d+)', self.add_bakery_to_cake),
+            ('DELETE', r'/api/v1/cakes/(?P<cake_id>\d+)/bakeries/(?P<bakery_id>\d+)', self.remove_bakery_from_cake),
+        ]:
+            self.routes.append((method, re.compile(pattern + '$'), handler))
+
+    def _resource(self, request):
+        return self.cakes if request.path.startswith('/api/v1/cakes') else self.bakeries
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await self.engine.dispose()
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        status, payload = await self.dispatch(Request(scope, body))
+
+        data = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8') + b'\n'
+        await send({'type': 'http.response.start', 'status': status, 'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(data)).encode('ascii')),
+        ]})
+        await send({'type': 'http.response.body', 'body': data})
+
+    async def dispatch(self, request):
+        allowed = False
+        for method, pattern, handler in self.routes:
+            match = pattern.match(request.path)
+            if match is None:
+                continue
+            if method != request.method:
+                allowed = True
+                continue
+            params = {name: int(value) for name, value in match.groupdict().items()}
+            try:
+                async with self.sessions() as session:
+                    return await handler(session, request, **params)
+            except HTTPError as err:
+                return err.status, err.payload
+            except Exception:
+                logger.exception(f'Server Error: {request.method} {request.path}')
+                return 500, {'error': 'An unexpected error occurred'}
+        if allowed:
+            return 405, {'error': 'Method not allowed'}
+        return 404, {'error': 'Resource not found'}
+
+    async def _linked_bakeries(self, session, cake_id):
+        return list(await session.scalars(select(cakes_bakeries.c.bakery_id).where(
+            cakes_bakeries.c.cake_id == cake_id)))
+
+    async def _cake_flavor(self, session, cake_id):
+        return await session.scalar(select(Cake.flavor).where(Cake.id == cake_id))
+
+    async def _commit(self, session, *tags, bakeries=(), flavors=()):
+        if bakeries:
+            for statement in refresh_statements(sorted(set(bakeries)), lock=needs_lock(self.engine.dialect)):
+                await session.execute(statement)
+        if flavors:
+            for statement in flavor_refresh_statements(sorted(set(flavors)), self.engine.dialect):
+                await session.execute(statement)
+        statement = (update(TableVersion)
+                     .where(TableVersion.table_name.in_(tables_for(tags)))
+                     .values(version=TableVersion.version + 1))
+        await session.execute(statement)
+        await session.commit()
+
+    async def _list(self, session, request, resource, statement):
+        page = request.arg('page', int)
+        limit = request.arg('limit', int)
+        if page is None or limit is None:
+            return 200, [resource.dump(row) for row in await session.execute(statement)]
+
+        page = max(page, 1)
+        total = await session.scalar(select(func.count()).select_from(statement.order_by(None).subquery()))
+        rows = await session.execute(statement.limit(limit).offset((page - 1) * limit))
+        return 200, {
+            'cakes': [resource.dump(row) for row in rows],
+            'total_pages': math.ceil(total / limit) if limit > 0 else 0,
+            'total_items': total,
+            'current_page': page
+        }
+
+    def _filter_cakes(self, request, statement):
+        flavor = request.arg('flavor')
+        max_price = request.arg('max_price', float)
+        if flavor:
+            statement = statement.where(Cake.flavor.ilike(f'%{flavor}%'))
+        if max_price is not None:
+            statement = statement.where(Cake.price <= max_price)
+        return statement
+
+    async def list_cakes(self, session, request):
+        return await self._list(session, request, self.cakes,
+                                self._filter_cakes(request, self.cakes.select()))
+
+    async def list_bakeries(self, session, request):
+        return 200, [self.bakeries.dump(row) for row in await session.execute(self.bakeries.select())]
+
+    async def list_cakes_by_bakery(self, session, request, bakery_id):
+        if await session.get(Bakery, bakery_id) is None:
+            raise not_found()
+        statement = self.cakes.select().join(cakes_bakeries, cakes_bakeries.c.cake_id == Cake.id).where(
+            cakes_bakeries.c.bakery_id == bakery_id)
+        return await self._list(session, request, self.cakes, self._filter_cakes(request, statement))
+
+    async def get(self, session, request, id):
+        resource = self._resource(request)
+        row = (await session.execute(resource.select().where(resource.model.id == id))).first()
+        if row is None:
+            raise not_found()
+        return 200, resource.dump(row)
+
+    async def create(self, session, request):
+        resource = self._resource(request)
+        json_data = request.get_json()
+        if not json_data:
+            return 400, {'error': 'No input data provided'}
+        try:
+            data = resource.load(json_data)
+        except ValidationError as err:
+            return 422, err.messages
+
+        row = (await session.execute(insert(resource.model).values(**data).returning(*resource.serializer.columns))).one()
+        if resource.model is Cake:
+            await session.execute(count_statement(Cake.__tablename__, 1))
+        await self._commit(session, resource.tag, flavors=[data['flavor']] if resource.model is Cake else ())
+        return 201, resource.dump(row)
+
+    async def update(self, session, request, id):
+        resource = self._resource(request)
+        json_data = request.get_json()
+        if not json_data:
+            return 400, {'error': 'No input data provided'}
+        try:
+            data = resource.load(json_data, partial=True)
+        except ValidationError as err:
+            return 422, err.messages
+
+        # The cake's old flavor, before the UPDATE may change it.
+        flavors = [await self._cake_flavor(session, id)] if resource.model is Cake else []
+        statement = update(resource.model).where(resource.model.id == id)
+        if data:
+            statement = statement.values(**data)
+        else:
+            statement = statement.values(id=resource.model.id)
+        row = (await session.execute(statement.returning(*resource.serializer.columns))).first()
+        if row is None:
+            raise not_found()
+        bakeries = await self._linked_bakeries(session, id) if resource.model is Cake else ()
+        if 'flavor' in data:
+            flavors.append(data['flavor'])
+        await self._commit(session, resource.tag, bakeries=bakeries, flavors=flavors)
+        return 200, resource.dump(row)
+
+    async def delete(self, session, request, id):
+        resource = self._resource(request)
+        if resource.model is Cake:
+            bakeries = await self._linked_bakeries(session, id)
+            flavors = [await self._cake_flavor(session, id)]
+        else:
+            bakeries, flavors = [id], []
+        result = await session.execute(delete(resource.model).where(resource.model.id == id))
+        if not result.rowcount:
+            raise not_found()
+        if resource.model is Cake:
+            await session.execute(count_statement(Cake.__tablename__, -1))
+        await self._commit(session, resource.tag, 'links', bakeries=bakeries, flavors=flavors)
+        noun = 'Cake' if resource.model is Cake else 'Bakery'
+        return 200, {'message': f'{noun} deleted successfully'}
+
+    async def _check_pair(self, session, cake_id, bakery_id):
+        if await session.get(Cake, cake_id) is None or await session.get(Bakery, bakery_id) is None:
+            raise not_found()
+
+    async def add_bakery_to_cake(self, session, request, cake_id, bakery_id):
+        await self._check_pair(session, cake_id, bakery_id)
+        linked = await session.execute(select(cakes_bakeries.c.cake_id).where(
+            cakes_bakeries.c.cake_id == cake_id, cakes_bakeries.c.bakery_id == bakery_id))
+        if linked.first() is None:
+            await session.execute(cakes_bakeries.insert().values(cake_id=cake_id, bakery_id=bakery_id))
+            await self._commit(session, 'links', bakeries=[bakery_id])
+        return 200, {'message': 'Bakery added to cake'}
+
+    async def remove_bakery_from_cake(self, session, request, cake_id, bakery_id):
+        await self._check_pair(session, cake_id, bakery_id)
+        result = await session.execute(cakes_bakeries.delete().where(
+            cakes_bakeries.c.cake_id == cake_id, cakes_bakeries.c.bakery_id == bakery_id))
+        if result.rowcount:
+            await self._commit(session, 'links', bakeries=[bakery_id])
+        return 200, {'message': 'Bakery removed from cake'}
+
+
+def create_asgi_app(config_class=Config):
+    return AsyncCatalog(config_class)
+
+
+application = create_asgi_app(os.environ.get('APP_CONFIG', Config))
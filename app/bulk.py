@@ -0,0 +1,153 @@
+from marshmallow import ValidationError, fields
+from sqlalchemy import delete, insert, select, tuple_, update
+from . import db
+from .models import Cake, Bakery, cakes_bakeries
+from .schemas import CakeBakeryLinkSchema
+from .stats import UPSERT_INSERTS, count_rows, mark_bakeries, mark_cakes, mark_flavors
+
+_ids_field = fields.List(fields.Integer(strict=True), required=True)
+
+
+def _existing_ids(model, ids):
+    if not ids:
+        return set()
+    return set(db.session.scalars(select(model.id).where(model.id.in_(set(ids)))))
+
+
+def bulk_create(model, schema_class, items):
+    rows = schema_class(many=True, load_instance=False).load(items)
+    # A single compiled INSERT run through insertmanyvalues in one transaction;
+    # sort_by_parameter_order keeps the returned ids in input order.
+    statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+    ids = db.session.scalars(statement, rows).all()
+    if model is Cake:
+        mark_flavors(row['flavor'] for row in rows)
+        count_rows(Cake.__tablename__, len(ids))
+    return [{'index': index, 'id': id, 'status': 201} for index, id in enumerate(ids)]
+
+
+def bulk_update(model, schema_class, items):
+    rows = schema_class(many=True, load_instance=False, partial=True).load(items)
+    missing = {index: {'id': ['Missing data for required field.']}
+               for index, row in enumerate(rows) if row.get('id') is None}
+    if missing:
+        raise ValidationError(missing)
+
+    existing = _existing_ids(model, [row['id'] for row in rows])
+    found = [row for row in rows if row['id'] in existing]
+    if found and model is Cake:
+        mark_cakes(row['id'] for row in found)
+        mark_flavors(row['flavor'] for row in found if 'flavor' in row)
+    if found:
+        # ORM bulk UPDATE by primary key, executed as executemany batches.
+        db.session.execute(update(model), found)
+    return [{'index': index, 'id': row['id'], 'status': 200 if row['id'] in existing else 404}
+            for index, row in enumerate(rows)]
+
+
+def bulk_delete(model, ids):
+    ids = _ids_field.deserialize(ids)
+    existing = _existing_ids(model, ids)
+    if existing:
+        if model is Cake:
+            mark_cakes(existing)
+            count_rows(Cake.__tablename__, -len(existing))
+        else:
+            mark_bakeries(existing)
+        db.session.execute(delete(model).where(model.id.in_(existing)))
+    return [{'index': index, 'id': id, 'status': 200 if id in existing else 404}
+            for index, id in enumerate(ids)]
+
+
+def _link_results(pairs):
+    pairs = CakeBakeryLinkSchema(many=True).load(pairs)
+    cake_ids = _existing_ids(Cake, [pair['cake_id'] for pair in pairs])
+    bakery_ids = _existing_ids(Bakery, [pair['bakery_id'] for pair in pairs])
+    return [(pair['cake_id'], pair['bakery_id'],
+             pair['cake_id'] in cake_ids and pair['bakery_id'] in bakery_ids)
+            for pair in pairs]
+
+
+def _linked(pairs):
+    if not pairs:
+        return set()
+    key = tuple_(cakes_bakeries.c.cake_id, cakes_bakeries.c.bakery_id)
+    statement = select(cakes_bakeries.c.cake_id, cakes_bakeries.c.bakery_id).where(key.in_(pairs))
+    return {tuple(row) for row in db.session.execute(statement)}
+
+
+def bulk_link(pairs):
+    checked = _link_results(pairs)
+    valid = {(cake_id, bakery_id) for cake_id, bakery_id, ok in checked if ok}
+    new = valid - _linked(valid)
+    if new:
+        mark_bakeries(bakery_id for _, bakery_id in new)
+        db.session.execute(cakes_bakeries.insert(),
+                           [{'cake_id': cake_id, 'bakery_id': bakery_id} for cake_id, bakery_id in sorted(new)])
+    return [{'index': index, 'cake_id': cake_id, 'bakery_id': bakery_id, 'status': 200 if ok else 404}
+            for index, (cake_id, bakery_id, ok) in enumerate(checked)]
+
+
+def bulk_unlink(pairs):
+    checked = _link_results(pairs)
+    valid = {(cake_id, bakery_id) for cake_id, bakery_id, ok in checked if ok}
+    if valid:
+        mark_bakeries(bakery_id for _, bakery_id in valid)
+        key = tuple_(cakes_bakeries.c.cake_id, cakes_bakeries.c.bakery_id)
+        db.session.execute(cakes_bakeries.delete().where(key.in_(valid)))
+    return [{'index': index, 'cake_id': cake_id, 'bakery_id': bakery_id, 'status': 200 if ok else 404}
+            for index, (cake_id, bakery_id, ok) in enumerate(checked)]
+
+
+def cake_bakery_ids(data):
+    """Validate a list of bakery ids for one cake with a single IN query."""
+    ids = set(_ids_field.deserialize(data))
+    unknown = ids - _existing_ids(Bakery, ids)
+    if unknown:
+        raise ValidationError({'bakery_ids': [f"Unknown ids: {', '.join(map(str, sorted(unknown)))}"]})
+    return ids
+
+
+def link_cake_bakeries(cake_id, bakery_ids):
+    """Link the cake to ``bakery_ids`` in one INSERT that skips existing pairs; returns the new ones."""
+    if not bakery_ids:
+        return []
+    rows = [{'cake_id': cake_id, 'bakery_id': bakery_id} for bakery_id in sorted(bakery_ids)]
+    dialect = db.session.get_bind().dialect
+    upsert = UPSERT_INSERTS.get(dialect.name)
+    if upsert is not None:
+        statement = upsert(cakes_bakeries).values(rows).on_conflict_do_nothing().returning(cakes_bakeries.c.bakery_id)
+        added = sorted(db.session.scalars(statement))
+    else:
+        linked = {bakery_id for _, bakery_id in _linked({(cake_id, bakery_id) for bakery_id in bakery_ids})}
+        added = sorted(set(bakery_ids) - linked)
+        if added:
+            db.session.execute(cakes_bakeries.insert(), [row for row in rows if row['bakery_id'] not in linked])
+    mark_bakeries(added)
+    return added
+
+
+def _unlink_cake(cake_id, condition):
+    statement = cakes_bakeries.delete().where(cakes_bakeries.c.cake_id == cake_id, condition)
+    if db.session.get_bind().dialect.delete_returning:
+        removed = sorted(db.session.scalars(statement.returning(cakes_bakeries.c.bakery_id)))
+    else:
+        removed = sorted(db.session.scalars(
+            select(cakes_bakeries.c.bakery_id).where(cakes_bakeries.c.cake_id == cake_id, condition)))
+        if removed:
+            db.session.execute(statement)
+    mark_bakeries(removed)
+    return removed
+
+
+def unlink_cake_bakeries(cake_id, bakery_ids):
+    """Remove the cake's links to ``bakery_ids`` in one DELETE; returns the ones that existed."""
+    if not bakery_ids:
+        return []
+    return _unlink_cake(cake_id, cakes_bakeries.c.bakery_id.in_(bakery_ids))
+
+
+def replace_cake_bakeries(cake_id, bakery_ids):
+    """Make ``bakery_ids`` the cake's exact set of bakeries; returns ``(added, removed)``."""
+    removed = _unlink_cake(cake_id, cakes_bakeries.c.bakery_id.not_in(bakery_ids))
+    return link_cake_bakeries(cake_id, bakery_ids), removed
@@ -0,0 +1,189 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, g, request
+from werkzeug.utils import import_string
+
+
+class CacheBackend:
+    """Storage used by :class:`ResponseCache`.
+
+    A shared backend (memcached, Redis, ...) only has to implement these
+    methods and ``from_config``; :class:`LocalCache` is the in-process one.
+    """
+
+    @classmethod
+    def from_config(cls, config):
+        return cls()
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class LocalCache(CacheBackend):
+    def __init__(self, max_entries=1024, default_ttl=60):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(max_entries=config['CACHE_MAX_ENTRIES'], default_ttl=config['CACHE_TTL'])
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class ResponseCache:
+    """Cache GET responses keyed on the route and its normalised query args.
+
+    Every entry is stored with the current version token of each of its tags
+    (``'cakes'``, ``'cake:3'``...). Write handlers call :meth:`invalidate`,
+    which gives those tags new tokens, so the stale entries stop matching
+    without having to find them. A tag whose token was evicted counts as
+    changed, never as unchanged.
+
+    Entries also record the ``table_version`` rows of the tables behind their
+    tags, read before the view runs. Writes that never reach this process's
+    tokens (another worker, ``app.asgi``, a snapshot load) still bump those,
+    so the entry stops matching as well.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config['CACHE_BACKEND']
+        if backend == 'local':
+            backend = LocalCache
+        elif isinstance(backend, str):
+            backend = import_string(backend)
+        self.backend = backend.from_config(app.config)
+        app.extensions['response_cache'] = self
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+    @staticmethod
+    def _key():
+        args = sorted(request.args.items(multi=True))
+        return 'response:' + request.path + '?' + '&'.join(f'{name}={value}' for name, value in args)
+
+    def _tag_versions(self, tags):
+        return dict(zip(tags, self.backend.get_many(['tag:' + tag for tag in tags])))
+
+    def invalidate(self, *tags):
+        for tag in tags:
+            self.backend.set('tag:' + tag, uuid.uuid4().hex, ttl=0)
+
+    def cached(self, tags, unless=None):
+        """Cache a view's successful responses under ``tags(**view_args)``."""
+
+        def decorator(f):
+            @wraps(f)
+            def decorated(**kwargs):
+                if not current_app.config['CACHE_ENABLED'] or (unless is not None and unless()):
+                    return f(**kwargs)
+
+                from .versions import request_versions, tables_for
+
+                key = self._key()
+                entry_tags = tags(**kwargs)
+                versions = self._tag_versions(entry_tags)
+                tables = request_versions(tables_for(entry_tags))
+                entry = self.backend.get(key)
+                if (entry is not None and None not in versions.values() and entry['tags'] == versions
+                        and entry['tables'] == tables):
+                    self._count(hit=True)
+                    response = current_app.response_class(entry['body'], status=entry['status'],
+                                                          mimetype=entry['mimetype'])
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+                self._count(hit=False)
+
+                response = current_app.make_response(f(**kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                if g.get('db_route', 'primary') != 'primary':
+                    # A lagging replica may answer after the invalidation it missed.
+                    return response
+                body = response.get_data()
+                if len(body) > current_app.config['CACHE_MAX_ENTRY_BYTES']:
+                    return response
+
+                missing = [tag for tag, version in versions.items() if version is None]
+                if missing:
+                    # Start tracking the tags now and cache on the next request, so a
+                    # concurrent invalidate can never be overwritten by our token.
+                    for tag in missing:
+                        self.backend.set('tag:' + tag, uuid.uuid4().hex, ttl=0)
+                    return response
+                self.backend.set(key, {
+                    'tags': versions,
+                    'tables': tables,
+                    'body': body,
+                    'status': response.status_code,
+                    'mimetype': response.mimetype,
+                })
+                response.headers['X-Cache'] = 'MISS'
+                return response
+
+            return decorated
+
+        return decorator
@@ -0,0 +1,78 @@
+import gzip
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _gzip(data, level):
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _brotli(data, level):
+    return brotli.compress(data, quality=level)
+
+
+def _zstd(data, level):
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+ENCODERS = {'gzip': _gzip}
+if brotli is not None:
+    ENCODERS['br'] = _brotli
+if zstandard is not None:
+    ENCODERS['zstd'] = _zstd
+
+
+class Compress:
+    """Compress responses for clients that accept it.
+
+    The encoding is negotiated from ``Accept-Encoding`` among the available
+    ones in ``COMPRESS_ALGORITHMS`` order; ``br`` and ``zstd`` need the
+    ``brotli``/``zstandard`` packages. Bodies under ``COMPRESS_MIN_SIZE``
+    bytes and streamed responses are sent as they are.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['compress'] = self
+        if app.config['COMPRESS_ENABLED']:
+            app.after_request(self.after_request)
+
+    @staticmethod
+    def available(config):
+        return [name for name in config['COMPRESS_ALGORITHMS'] if name in ENCODERS]
+
+    def after_request(self, response):
+        config = current_app.config
+        if response.mimetype not in config['COMPRESS_MIMETYPES']:
+            return response
+        response.vary.add('Accept-Encoding')
+        if (response.status_code < 200 or response.status_code >= 300 or response.direct_passthrough
+                or response.is_streamed or 'Content-Encoding' in response.headers):
+            return response
+        if (response.content_length or 0) < config['COMPRESS_MIN_SIZE']:
+            return response
+
+        encoding = request.accept_encodings.best_match(self.available(config))
+        if encoding is None:
+            return response
+
+        response.set_data(ENCODERS[encoding](response.get_data(), config['COMPRESS_LEVEL']))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # Byte-for-byte different from the identity body, but equivalent;
+            # If-None-Match uses the weak comparison so 304s keep working.
+            response.set_etag(etag, weak=True)
+        return response
@@ -6,7 +6,71 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, '..', 'cakes_bakeries.db')
+    # Used by app.asgi; derived from SQLALCHEMY_DATABASE_URI when unset.
+    ASYNC_DATABASE_URI = os.environ.get('ASYNC_DATABASE_URI')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', 50))
+    MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 1000))
+    STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', 1000))
+    BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', 1000))
+    SNAPSHOT_CHUNK_SIZE = int(os.environ.get('SNAPSHOT_CHUNK_SIZE', 10000))
+    IDEMPOTENCY_ENABLED = os.environ.get('IDEMPOTENCY_ENABLED', 'true').lower() == 'true'
+    IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', 24 * 60 * 60))
+    # How long a claimed key blocks retries before its response is stored; keep it above the slowest write.
+    IDEMPOTENCY_LOCK_TIMEOUT = int(os.environ.get('IDEMPOTENCY_LOCK_TIMEOUT', 60))
+    IDEMPOTENCY_CACHE_SIZE = int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', 10000))
+    IDEMPOTENCY_PURGE_INTERVAL = int(os.environ.get('IDEMPOTENCY_PURGE_INTERVAL', 60))
+    FAST_SERIALIZER = os.environ.get('FAST_SERIALIZER', 'true').lower() == 'true'
+    # Off by default: with the in-process backend, each worker only sees its own entries.
+    CACHE_ENABLED = os.environ.get('CACHE_ENABLED', 'false').lower() == 'true'
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'local')
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 1024))
+    CACHE_TTL = int(os.environ.get('CACHE_TTL', 60))
+    CACHE_MAX_ENTRY_BYTES = int(os.environ.get('CACHE_MAX_ENTRY_BYTES', 1024 * 1024))
+    # How long filtered list counts are reused; 0 runs COUNT(*) on every request.
+    COUNT_CACHE_TTL = int(os.environ.get('COUNT_CACHE_TTL', 30))
+    SQLITE_PRAGMAS = {}
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_PATH = os.environ.get('METRICS_PATH', '/metrics')
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+    N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 10))
+    QUERY_LOG_RAISE = os.environ.get('QUERY_LOG_RAISE', 'false').lower() == 'true'
+    LOG_DIR = os.environ.get('LOG_DIR', 'logs')
+    LOG_FILE = os.environ.get('LOG_FILE', 'cake_catalog.log')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+    LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024))
+    LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', 10))
+    LOG_QUEUE = os.environ.get('LOG_QUEUE', 'true').lower() == 'true'
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+    LOG_REQUESTS = os.environ.get('LOG_REQUESTS', 'false').lower() == 'true'
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER', 'auto')
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_ALGORITHMS = os.environ.get('COMPRESS_ALGORITHMS', 'zstd,br,gzip').split(',')
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_MIMETYPES = ['application/json', 'application/x-ndjson', 'text/plain']
+    # Comma-separated; GET requests are spread over these when set.
+    REPLICA_DATABASE_URLS = [url for url in os.environ.get('REPLICA_DATABASE_URLS', '').split(',') if url]
+    REPLICA_MAX_LAG = float(os.environ.get('REPLICA_MAX_LAG', 5))
+    REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('REPLICA_LAG_CHECK_INTERVAL', 1))
+    READ_YOUR_WRITES_SECONDS = int(os.environ.get('READ_YOUR_WRITES_SECONDS', 10))
+    READ_YOUR_WRITES_COOKIE = os.environ.get('READ_YOUR_WRITES_COOKIE', 'catalog_wrote')
+    # Off by default: behind a reverse proxy every request shares the proxy's address, so
+    # enable it only with RATELIMIT_CLIENT_HEADER set or werkzeug's ProxyFix in front of the app.
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'false').lower() == 'true'
+    RATELIMIT_BACKEND = os.environ.get('RATELIMIT_BACKEND', 'local')
+    # Tokens per second and bucket size, per client and per client and endpoint.
+    RATELIMIT_RATE = float(os.environ.get('RATELIMIT_RATE', 20))
+    RATELIMIT_BURST = int(os.environ.get('RATELIMIT_BURST', 100))
+    RATELIMIT_ENDPOINT_RATE = float(os.environ.get('RATELIMIT_ENDPOINT_RATE', 10))
+    RATELIMIT_ENDPOINT_BURST = int(os.environ.get('RATELIMIT_ENDPOINT_BURST', 50))
+    RATELIMIT_UNPAGINATED_COST = int(os.environ.get('RATELIMIT_UNPAGINATED_COST', 10))
+    RATELIMIT_MAX_BUCKETS = int(os.environ.get('RATELIMIT_MAX_BUCKETS', 10000))
+    # Identifies clients by this header (e.g. an API key) instead of the remote address.
+    RATELIMIT_CLIENT_HEADER = os.environ.get('RATELIMIT_CLIENT_HEADER')
+    # Summed request cost allowed in flight per process; 0 never sheds.
+    LOAD_SHED_MAX_INFLIGHT = int(os.environ.get('LOAD_SHED_MAX_INFLIGHT', 64))
+    LOAD_SHED_RETRY_AFTER = int(os.environ.get('LOAD_SHED_RETRY_AFTER', 1))
 
 class TestingConfig(Config):
     TESTING = True
@@ -15,3 +79,23 @@ class TestingConfig(Config):
     WTF_CSRF_ENABLED = False
     DEBUG = False
     PROPAGATE_EXCEPTIONS = False
+    CACHE_ENABLED = False
+    COUNT_CACHE_TTL = 0
+    RATELIMIT_ENABLED = False
+
+class ProductionConfig(Config):
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true',
+    }
+    # Only applied when SQLALCHEMY_DATABASE_URI points at SQLite.
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+        'foreign_keys': 'ON',
+    }
@@ -0,0 +1,28 @@
+import hashlib
+from flask import current_app
+from . import cache
+from .versions import current_versions
+
+COUNT_MODES = ('exact', 'estimate', 'none')
+
+
+def cached_count(query, exact=True):
+    """``COUNT(*)`` of ``query``, shared through the cache backend for ``COUNT_CACHE_TTL`` seconds.
+
+    Exact counts are also keyed on the table versions, so a write through the
+    API is never hidden; estimates are reused until the TTL runs out.
+    """
+    query = query.order_by(None)
+    ttl = current_app.config['COUNT_CACHE_TTL']
+    if not ttl:
+        return query.count()
+
+    compiled = query.statement.compile()
+    versions = current_versions(['cake', 'cakes_bakeries']) if exact else None
+    raw = repr((str(compiled), sorted(compiled.params.items()), versions))
+    key = 'count:' + hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    total = cache.backend.get(key)
+    if total is None:
+        total = query.count()
+        cache.backend.set(key, total, ttl=ttl)
+    return total
@@ -0,0 +1,25 @@
+from sqlalchemy import event
+
+
+def _apply_pragmas(pragmas):
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+    return set_sqlite_pragmas
+
+
+def sqlite_pragmas(pragmas):
+    # cakes_bakeries relies on ON DELETE CASCADE, which SQLite only honours with foreign keys on.
+    return {'foreign_keys': 'ON', **pragmas}
+
+
+def init_engine(app):
+    """Apply ``SQLITE_PRAGMAS`` to every new connection of the app's SQLite engines."""
+    pragmas = sqlite_pragmas(app.config['SQLITE_PRAGMAS'])
+    with app.app_context():
+        for engine in app.extensions['sqlalchemy'].engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', _apply_pragmas(pragmas))
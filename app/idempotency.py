@@ -0,0 +1,149 @@
+import hashlib
+import time
+from functools import wraps
+from flask import current_app, jsonify, request
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from .cache import LocalCache
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def _fingerprint():
+    digest = hashlib.sha256(f'{request.method} {request.path}\n'.encode('utf-8'))
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+class Idempotency:
+    """Replay the response of a write retried with the same ``Idempotency-Key``.
+
+    The first request claims the key with a row in ``idempotency_key`` before
+    the view runs and stores the response in it afterwards. Retries within
+    ``IDEMPOTENCY_TTL`` seconds get that response back, from an in-memory
+    front cache when possible, without running the view again. A retry that
+    arrives while the first request is still running gets a 409; one that
+    reuses the key for a different request gets a 422. Responses with a 5xx
+    status release the key so the write can be retried, and a claim whose
+    worker died lapses after ``IDEMPOTENCY_LOCK_TIMEOUT`` seconds.
+    """
+
+    def __init__(self, app=None):
+        self.cache = None
+        self._next_purge = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.cache = LocalCache(max_entries=app.config['IDEMPOTENCY_CACHE_SIZE'],
+                                default_ttl=app.config['IDEMPOTENCY_TTL'])
+        app.extensions['idempotency'] = self
+
+    def idempotent(self, f):
+        @wraps(f)
+        def decorated(**kwargs):
+            key = request.headers.get(HEADER)
+            if key is None or not current_app.config['IDEMPOTENCY_ENABLED']:
+                return f(**kwargs)
+            if not 1 <= len(key) <= MAX_KEY_LENGTH:
+                return jsonify({'error': f'{HEADER} must be 1 to {MAX_KEY_LENGTH} characters'}), 400
+
+            fingerprint = _fingerprint()
+            record = self._lookup(key)
+            if record is None:
+                if self._claim(key, fingerprint):
+                    return self._run(f, kwargs, key, fingerprint)
+                # Another request claimed the key between our lookup and insert.
+                record = self._lookup(key) or {'fingerprint': fingerprint, 'status': None}
+            return self._replay(record, fingerprint)
+
+        return decorated
+
+    def _run(self, f, kwargs, key, fingerprint):
+        try:
+            response = current_app.make_response(f(**kwargs))
+            if response.status_code >= 500 or response.is_streamed:
+                self._release(key)
+            else:
+                self._store(key, fingerprint, response)
+        except BaseException:
+            self._release(key)
+            raise
+        return response
+
+    def _lookup(self, key):
+        from . import db
+        from .models import IdempotencyKey
+
+        record = self.cache.get(key)
+        if record is not None:
+            return record
+        row = db.session.execute(
+            select(IdempotencyKey.fingerprint, IdempotencyKey.status, IdempotencyKey.body,
+                   IdempotencyKey.mimetype, IdempotencyKey.expires_at)
+            .where(IdempotencyKey.key == key, IdempotencyKey.expires_at > time.time())
+        ).first()
+        if row is None:
+            return None
+        record = {'fingerprint': row.fingerprint, 'status': row.status, 'body': row.body, 'mimetype': row.mimetype}
+        if row.status is not None:
+            self._remember(key, record, row.expires_at)
+        return record
+
+    def _remember(self, key, record, expires_at):
+        if len(record['body'] or b'') <= current_app.config['CACHE_MAX_ENTRY_BYTES']:
+            self.cache.set(key, record, ttl=max(expires_at - time.time(), 1))
+
+    def _claim(self, key, fingerprint):
+        from . import db
+        from .models import IdempotencyKey
+
+        now = time.time()
+        if now >= self._next_purge:
+            self._next_purge = now + current_app.config['IDEMPOTENCY_PURGE_INTERVAL']
+            db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= now))
+        else:
+            db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key,
+                                                            IdempotencyKey.expires_at <= now))
+        db.session.execute(insert(IdempotencyKey).values(
+            key=key, fingerprint=fingerprint, expires_at=now + current_app.config['IDEMPOTENCY_LOCK_TIMEOUT']))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return False
+        return True
+
+    def _store(self, key, fingerprint, response):
+        from . import db
+        from .models import IdempotencyKey
+
+        record = {'fingerprint': fingerprint, 'status': response.status_code, 'body': response.get_data(),
+                  'mimetype': response.mimetype}
+        expires_at = time.time() + current_app.config['IDEMPOTENCY_TTL']
+        db.session.execute(update(IdempotencyKey).where(IdempotencyKey.key == key).values(
+            status=record['status'], body=record['body'], mimetype=record['mimetype'], expires_at=expires_at))
+        db.session.commit()
+        self._remember(key, record, expires_at)
+
+    def _release(self, key):
+        from . import db
+        from .models import IdempotencyKey
+
+        db.session.rollback()
+        db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key))
+        db.session.commit()
+
+    @staticmethod
+    def _replay(record, fingerprint):
+        if record['fingerprint'] != fingerprint:
+            return jsonify({'error': f'{HEADER} was already used for a different request'}), 422
+        if record['status'] is None:
+            response = jsonify({'error': f'A request with this {HEADER} is still in progress'})
+            response.status_code = 409
+            response.headers['Retry-After'] = '1'
+            return response
+        response = current_app.response_class(record['body'], status=record['status'], mimetype=record['mimetype'])
+        response.headers['Idempotent-Replayed'] = 'true'
+        return response
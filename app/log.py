@@ -0,0 +1,126 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from flask import g, has_request_context, request
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
+
+
+class RequestContextFilter(logging.Filter):
+    """Copy the request id, route and elapsed time onto records logged during a request."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.method = request.method
+            record.path = request.path
+            start = g.get('request_start')
+            if start is not None:
+                record.latency_ms = round((time.perf_counter() - start) * 1000, 2)
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    FIELDS = ('request_id', 'method', 'path', 'status', 'latency_ms')
+
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+        }
+        for field in self.FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc_info'] = record.exc_text
+        return json.dumps(data, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Hand records to a bounded queue without blocking; count what doesn't fit."""
+
+    def __init__(self, maxsize):
+        super().__init__(queue.Queue(maxsize))
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # Resolve the message and traceback on the calling thread but leave the
+        # formatting to the listener's handler.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _file_handler(config):
+    log_dir = config['LOG_DIR']
+    if not os.path.exists(log_dir):
+        os.mkdir(log_dir)
+    handler = RotatingFileHandler(os.path.join(log_dir, config['LOG_FILE']),
+                                  maxBytes=config['LOG_MAX_BYTES'], backupCount=config['LOG_BACKUP_COUNT'])
+    handler.setLevel(logging.INFO)
+    handler.setFormatter(JSONFormatter() if config['LOG_FORMAT'] == 'json' else logging.Formatter(TEXT_FORMAT))
+    return handler
+
+
+def _start_request():
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    g.request_start = time.perf_counter()
+
+
+def _finish_request(app):
+    def finish_request(response):
+        if 'request_id' in g:
+            response.headers['X-Request-ID'] = g.request_id
+        if app.config['LOG_REQUESTS']:
+            app.logger.info(f'{request.method} {request.path} {response.status_code}',
+                            extra={'status': response.status_code})
+        return response
+
+    return finish_request
+
+
+def init_logging(app):
+    """Write ``app.logger`` to a rotating file, through a queue when ``LOG_QUEUE`` is set.
+
+    With the queue the request thread only appends the record to a bounded
+    buffer; a listener thread does the disk I/O. Records that arrive while the
+    buffer is full are dropped and counted in ``app.extensions['log_queue']``.
+    """
+    handler = _file_handler(app.config)
+    if app.config['LOG_QUEUE']:
+        queue_handler = DroppingQueueHandler(app.config['LOG_QUEUE_SIZE'])
+        listener = QueueListener(queue_handler.queue, handler, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+        app.extensions['log_queue'] = queue_handler
+        handler = queue_handler
+    handler.addFilter(RequestContextFilter())
+    app.logger.addHandler(handler)
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request(app))
+    return handler
@@ -0,0 +1,182 @@
+import bisect
+import threading
+import time
+from functools import wraps
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        counts, total = self.series.get(labels, (None, 0))
+        if counts is None:
+            counts = [0] * (len(self.buckets) + 1)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.series[labels] = (counts, total + value)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total) in sorted(self.series.items()):
+            label_text = ','.join(f'{name}="{value}"' for name, value in labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total:.6f}')
+            lines.append(f'{self.name}_count{{{label_text}}} {cumulative}')
+        return lines
+
+
+class RequestStats:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.json_time = 0.0
+
+
+def request_stats():
+    if has_request_context():
+        return g.get('request_stats')
+    return None
+
+
+def timed(attr):
+    """Add the wrapped call's duration to ``RequestStats.<attr>``.
+
+    SQL run inside the call (lazy loads) is left to ``db_time``.
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            stats = request_stats()
+            if stats is None:
+                return f(*args, **kwargs)
+            start, db_time = time.perf_counter(), stats.db_time
+            try:
+                return f(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start - (stats.db_time - db_time)
+                setattr(stats, attr, getattr(stats, attr) + elapsed)
+
+        return decorated
+
+    return decorator
+
+
+def timed_json_provider(provider_class):
+    """Subclass ``provider_class`` so that building JSON responses counts as ``json_time``."""
+    return type(f'Timed{provider_class.__name__}', (provider_class,),
+                {'response': timed('json_time')(provider_class.response)})
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's context: a statement that raises never reaches after_cursor_execute.
+    context.metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = context.metrics_start
+    stats = request_stats()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - start
+
+
+class Metrics:
+    """Per-request SQL, serialization and size measurements.
+
+    Every response gets a ``Server-Timing`` header and the measurements are
+    aggregated into histograms per endpoint, served in the Prometheus text
+    format at ``METRICS_PATH``.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.histograms = {
+            'duration': Histogram('catalog_request_duration_seconds', 'Time spent handling the request.',
+                                  DURATION_BUCKETS),
+            'db': Histogram('catalog_request_db_seconds', 'Time spent executing SQL.', DURATION_BUCKETS),
+            'serialize': Histogram('catalog_request_serialize_seconds',
+                                   'Time spent dumping objects and encoding JSON.', DURATION_BUCKETS),
+            'queries': Histogram('catalog_request_queries', 'SQL statements executed.', QUERY_BUCKETS),
+            'size': Histogram('catalog_response_size_bytes', 'Response body size.', SIZE_BUCKETS),
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['metrics'] = self
+        if not app.config['METRICS_ENABLED']:
+            return
+
+        app.json = timed_json_provider(type(app.json))(app)
+        with app.app_context():
+            for engine in app.extensions['sqlalchemy'].engines.values():
+                if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+                    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+                    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule(app.config['METRICS_PATH'], 'metrics', self.render)
+
+    @staticmethod
+    def _before_request():
+        g.request_stats = RequestStats()
+
+    def _after_request(self, response):
+        stats = g.pop('request_stats', None)
+        if stats is None or request.endpoint == 'metrics':
+            return response
+
+        total = time.perf_counter() - stats.start
+        serialize = stats.serialize_time + stats.json_time
+        size = response.calculate_content_length()
+        response.headers.add('Server-Timing', ', '.join([
+            f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries"',
+            f'serialize;dur={stats.serialize_time * 1000:.2f}',
+            f'json;dur={stats.json_time * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ]))
+
+        labels = (('method', request.method), ('endpoint', request.endpoint or 'none'))
+        with self._lock:
+            key = labels + (('status', str(response.status_code)),)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.histograms['duration'].observe(labels, total)
+            self.histograms['db'].observe(labels, stats.db_time)
+            self.histograms['serialize'].observe(labels, serialize)
+            self.histograms['queries'].observe(labels, stats.queries)
+            if size is not None:
+                # Streamed responses have no length up front.
+                self.histograms['size'].observe(labels, size)
+        return response
+
+    def render(self):
+        lines = ['# HELP catalog_requests_total Requests handled.', '# TYPE catalog_requests_total counter']
+        with self._lock:
+            for labels, count in sorted(self.requests.items()):
+                label_text = ','.join(f'{name}="{value}"' for name, value in labels)
+                lines.append(f'catalog_requests_total{{{label_text}}} {count}')
+            for histogram in self.histograms.values():
+                lines.extend(histogram.render())
+        log_queue = current_app.extensions.get('log_queue')
+        if log_queue is not None:
+            lines += ['# HELP catalog_log_records_dropped_total Log records dropped because the queue was full.',
+                      '# TYPE catalog_log_records_dropped_total counter',
+                      f'catalog_log_records_dropped_total {log_queue.dropped}']
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
@@ -1,4 +1,5 @@
 from . import db
+from sqlalchemy import DDL, event
 from sqlalchemy.ext.declarative import declared_attr
 
 
@@ -11,8 +12,12 @@ class BaseModel(db.Model):
 
 
 cakes_bakeries = db.Table('cakes_bakeries',
-                          db.Column('cake_id', db.Integer, db.ForeignKey('cake.id'), primary_key=True),
-                          db.Column('bakery_id', db.Integer, db.ForeignKey('bakery.id'), primary_key=True)
+                          db.Column('cake_id', db.Integer, db.ForeignKey('cake.id', ondelete='CASCADE'),
+                                    primary_key=True),
+                          db.Column('bakery_id', db.Integer, db.ForeignKey('bakery.id', ondelete='CASCADE'),
+                                    primary_key=True),
+                          # The primary key leads with cake_id; bakery-side lookups need the reverse.
+                          db.Index('ix_cakes_bakeries_bakery_id_cake_id', 'bakery_id', 'cake_id')
                           )
 
 
@@ -21,9 +26,22 @@ class Cake(BaseModel):
 
     name = db.Column(db.String(100), nullable=False)
     flavor = db.Column(db.String(50), nullable=False)
-    price = db.Column(db.Float, nullable=False)
+    price = db.Column(db.Float, nullable=False, index=True)
     available = db.Column(db.Boolean, default=True)
-    bakeries = db.relationship('Bakery', secondary=cakes_bakeries, back_populates='cakes')
+    # The database drops the links on delete (ON DELETE CASCADE), so deletes don't load the collection.
+    bakeries = db.relationship('Bakery', secondary=cakes_bakeries, back_populates='cakes', passive_deletes=True)
+
+    __table_args__ = (
+        # Covers the GROUP BY that refreshes one flavor's cake_flavor_stats rows.
+        db.Index('ix_cake_flavor_available_price', 'flavor', 'available', 'price'),
+        # Lets PostgreSQL answer the infix ILIKE filter on flavor from a trigram index.
+        db.Index('ix_cake_flavor_trgm', 'flavor',
+                 postgresql_using='gin', postgresql_ops={'flavor': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+    )
+
+
+event.listen(Cake.__table__, 'before_create',
+             DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
 
 
 class Bakery(BaseModel):
@@ -32,4 +50,79 @@ class Bakery(BaseModel):
     name = db.Column(db.String(100), nullable=False)
     location = db.Column(db.String(50), nullable=False)
     rating = db.Column(db.Integer, nullable=False)
-    cakes = db.relationship('Cake', secondary=cakes_bakeries, back_populates='bakeries')
+    cakes = db.relationship('Cake', secondary=cakes_bakeries, back_populates='bakeries', passive_deletes=True)
+
+
+class TableVersion(db.Model):
+    __tablename__ = 'table_version'
+
+    table_name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+@event.listens_for(TableVersion.__table__, 'after_create')
+def seed_table_versions(target, connection, **kw):
+    connection.execute(target.insert(), [
+        {'table_name': name, 'version': 0} for name in ('cake', 'bakery', 'cakes_bakeries')
+    ])
+
+
+class BakeryStats(db.Model):
+    """Per-bakery price aggregates, maintained by app.stats; bakeries without cakes have no row."""
+    __tablename__ = 'bakery_stats'
+
+    bakery_id = db.Column(db.Integer, primary_key=True)
+    cake_count = db.Column(db.Integer, nullable=False)
+    price_sum = db.Column(db.Float, nullable=False)
+    min_price = db.Column(db.Float, nullable=False)
+    max_price = db.Column(db.Float, nullable=False)
+
+
+class BakeryFlavorStats(db.Model):
+    __tablename__ = 'bakery_flavor_stats'
+
+    bakery_id = db.Column(db.Integer, primary_key=True)
+    flavor = db.Column(db.String(50), primary_key=True)
+    cake_count = db.Column(db.Integer, nullable=False)
+
+
+class CakeFlavorStats(db.Model):
+    """Cake price aggregates per flavor and availability, maintained by app.stats.
+
+    Rows are kept once created, with a zero count when their cakes are gone,
+    so a refresh can lock them.
+    """
+    __tablename__ = 'cake_flavor_stats'
+
+    flavor = db.Column(db.String(50), primary_key=True)
+    available = db.Column(db.Boolean, primary_key=True)
+    cake_count = db.Column(db.Integer, nullable=False)
+    price_sum = db.Column(db.Float, nullable=False)
+    min_price = db.Column(db.Float)
+    max_price = db.Column(db.Float)
+
+
+class RowCount(db.Model):
+    """Row totals maintained by app.stats so unfiltered list pages don't run COUNT(*)."""
+    __tablename__ = 'row_count'
+
+    table_name = db.Column(db.String(50), primary_key=True)
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+@event.listens_for(RowCount.__table__, 'after_create')
+def seed_row_counts(target, connection, **kw):
+    connection.execute(target.insert(), [{'table_name': 'cake', 'row_count': 0}])
+
+
+class IdempotencyKey(db.Model):
+    """Responses of writes sent with an ``Idempotency-Key``, kept for replay by app.idempotency."""
+    __tablename__ = 'idempotency_key'
+
+    key = db.Column(db.String(255), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    # NULL until the first request has finished.
+    status = db.Column(db.Integer)
+    body = db.Column(db.LargeBinary)
+    mimetype = db.Column(db.String(100))
+    expires_at = db.Column(db.Float, nullable=False, index=True)
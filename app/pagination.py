@@ -0,0 +1,38 @@
+import base64
+import json
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(last_id):
+    raw = json.dumps({'id': last_id}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(token):
+    # An empty cursor asks for the first page.
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return int(data['id'])
+    except (ValueError, KeyError, TypeError) as err:
+        raise InvalidCursor('Invalid cursor') from err
+
+
+def keyset_page(query, key_column, after, limit):
+    """Fetch up to ``limit`` rows ordered by ``key_column`` that come after ``after``.
+
+    Seeks through the index on ``key_column`` instead of using OFFSET and
+    fetches one extra row to find out whether there is a next page.
+    """
+    if after is not None:
+        query = query.filter(key_column > after)
+    rows = query.order_by(key_column).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(getattr(rows[-1], key_column.key))
+    return rows, None
@@ -0,0 +1,135 @@
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAMS = re.compile(r'%\(\w+\)s|%s|:\w+|\$\d+')
+_PLACEHOLDERS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACE = re.compile(r'\s+')
+
+
+class QueryProblem(Exception):
+    pass
+
+
+def normalize(statement):
+    """Reduce ``statement`` to its shape: literals and IN lists collapse to ``?``."""
+    shape = _STRING.sub('?', statement)
+    shape = _NUMBER.sub('?', shape)
+    shape = _PARAMS.sub('?', shape)
+    shape = _PLACEHOLDERS.sub('(?)', shape)
+    return _SPACE.sub(' ', shape).strip()
+
+
+class QueryLog:
+    """Flag slow statements and repeated statement shapes (N+1 queries).
+
+    Statements slower than ``SLOW_QUERY_MS`` and SELECT shapes run more than
+    ``N_PLUS_ONE_THRESHOLD`` times in one request are logged through
+    ``app.logger`` with the route, its arguments and the query plan. With
+    ``QUERY_LOG_RAISE`` set the request fails with :class:`QueryProblem`
+    instead, and :meth:`capture` collects the reports for tests.
+    """
+
+    def __init__(self, app=None):
+        self.captures = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['query_log'] = self
+        with app.app_context():
+            for engine in app.extensions['sqlalchemy'].engines.values():
+                if not event.contains(engine, 'before_cursor_execute', self._before_cursor_execute):
+                    event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+                    event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        app.before_request(self.start)
+        app.after_request(self.finish)
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context.query_log_start = time.perf_counter()
+
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = (time.perf_counter() - context.query_log_start) * 1000
+        if executemany or not has_request_context() or 'query_log' not in g:
+            return
+        if context.execution_options.get('query_log') is False:
+            return
+        log = g.query_log
+        shape = normalize(statement)
+        log['shapes'][shape] += 1
+        log['examples'].setdefault(shape, (statement, parameters))
+        threshold = current_app.config['SLOW_QUERY_MS']
+        if threshold and elapsed > threshold:
+            log['slow'].append((statement, parameters, elapsed))
+
+    @staticmethod
+    def start():
+        g.query_log = {'shapes': Counter(), 'examples': {}, 'slow': []}
+
+    def finish(self, response):
+        log = g.pop('query_log', None)
+        if log is None:
+            return response
+
+        reports = [{'kind': 'slow', 'statement': statement, 'parameters': parameters, 'ms': round(ms, 2)}
+                   for statement, parameters, ms in log['slow']]
+        limit = current_app.config['N_PLUS_ONE_THRESHOLD']
+        for shape, count in log['shapes'].items():
+            if limit and count > limit and shape.upper().startswith('SELECT'):
+                statement, parameters = log['examples'][shape]
+                reports.append({'kind': 'n+1', 'statement': statement, 'parameters': parameters, 'count': count})
+        if not reports:
+            return response
+
+        for report in reports:
+            report['route'] = f'{request.method} {request.path}'
+            report['args'] = request.args.to_dict(flat=False)
+            report['view_args'] = request.view_args
+            report['plan'] = self.explain(report['statement'], report['parameters'])
+            self._log(report)
+            for capture in self.captures:
+                capture.append(report)
+        if current_app.config['QUERY_LOG_RAISE']:
+            raise QueryProblem('; '.join(f"{report['kind']}: {report['statement']}" for report in reports))
+        return response
+
+    @staticmethod
+    def explain(statement, parameters):
+        from . import db
+        prefix = {'sqlite': 'EXPLAIN QUERY PLAN ', 'postgresql': 'EXPLAIN '}.get(db.engine.dialect.name)
+        if prefix is None or not statement.lstrip().upper().startswith('SELECT'):
+            return None
+        try:
+            rows = db.session.connection().exec_driver_sql(prefix + statement, parameters,
+                                                           execution_options={'query_log': False})
+            return [' '.join(str(column) for column in row) for row in rows]
+        except Exception as err:
+            return [f'EXPLAIN failed: {err}']
+
+    @staticmethod
+    def _log(report):
+        if report['kind'] == 'slow':
+            summary = f"Slow query ({report['ms']} ms)"
+        else:
+            summary = f"N+1 query ({report['count']} times)"
+        plan = '\n  '.join(report['plan'] or [])
+        current_app.logger.warning(
+            f"{summary} in {report['route']} args={report['args']} view_args={report['view_args']}: "
+            f"{report['statement']} parameters={report['parameters']}\n  {plan}")
+
+    @contextmanager
+    def capture(self):
+        """Collect the reports made inside the block into the yielded list."""
+        reports = []
+        self.captures.append(reports)
+        try:
+            yield reports
+        finally:
+            self.captures.remove(reports)
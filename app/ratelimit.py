@@ -0,0 +1,141 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, g, jsonify, request
+from werkzeug.utils import import_string
+
+# Lists that return every row unless paged; they cost RATELIMIT_UNPAGINATED_COST tokens.
+LIST_ENDPOINTS = ('api.get_cakes', 'api.get_bakeries', 'api.get_cakes_by_bakery')
+EXEMPT_ENDPOINTS = ('metrics', 'static')
+
+
+class RateLimitBackend:
+    """Token bucket storage used by :class:`RateLimiter`.
+
+    A shared backend (Redis, ...) only has to implement :meth:`take`
+    atomically and ``from_config``; :class:`LocalBuckets` keeps the buckets
+    in process memory, so each worker limits on its own.
+    """
+
+    @classmethod
+    def from_config(cls, config):
+        return cls()
+
+    def take(self, key, cost, rate, burst):
+        """Take ``cost`` tokens from the bucket ``key``, which refills at ``rate``
+        tokens per second up to ``burst``. Returns 0 when they were taken,
+        otherwise the seconds until there will be enough."""
+        raise NotImplementedError
+
+
+class LocalBuckets(RateLimitBackend):
+    def __init__(self, max_buckets=10000):
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(max_buckets=config['RATELIMIT_MAX_BUCKETS'])
+
+    def take(self, key, cost, rate, burst):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0
+            else:
+                wait = (cost - tokens) / rate if rate else math.inf
+            self._buckets[key] = (tokens, now)
+            # The least recently used buckets have refilled the longest; dropping one just refills it.
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+def request_cost():
+    if request.endpoint in LIST_ENDPOINTS and 'cursor' not in request.args and not (
+            'page' in request.args and 'limit' in request.args):
+        return current_app.config['RATELIMIT_UNPAGINATED_COST']
+    return 1
+
+
+def _refuse(status, message, retry_after):
+    response = jsonify({'error': message})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+class RateLimiter:
+    """Per-client token buckets plus a concurrency-based load shedder.
+
+    Every API request takes ``request_cost()`` tokens from the client's bucket
+    and from the client's bucket for the endpoint, so one client can neither
+    flood the API nor a single expensive endpoint; refusals get a 429. The
+    shedder keeps the summed cost of in-flight requests in this process under
+    ``LOAD_SHED_MAX_INFLIGHT`` and answers 503 beyond it. Both send
+    ``Retry-After``.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.inflight = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config['RATELIMIT_BACKEND']
+        if backend == 'local':
+            backend = LocalBuckets
+        elif isinstance(backend, str):
+            backend = import_string(backend)
+        self.backend = backend.from_config(app.config)
+        app.extensions['rate_limiter'] = self
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+
+    @staticmethod
+    def _client():
+        header = current_app.config['RATELIMIT_CLIENT_HEADER']
+        return (header and request.headers.get(header)) or request.remote_addr or 'unknown'
+
+    def _limit(self, cost):
+        config = current_app.config
+        client = self._client()
+        limits = [(f'endpoint:{client}:{request.endpoint}', config['RATELIMIT_ENDPOINT_RATE'],
+                   config['RATELIMIT_ENDPOINT_BURST']),
+                  (f'client:{client}', config['RATELIMIT_RATE'], config['RATELIMIT_BURST'])]
+        for key, rate, burst in limits:
+            # Anything dearer than a full bucket drains it instead of never getting through.
+            wait = self.backend.take(key, min(cost, burst), rate, burst)
+            if wait:
+                return _refuse(429, 'Too many requests', wait)
+        return None
+
+    def _before_request(self):
+        config = current_app.config
+        if not config['RATELIMIT_ENABLED'] or request.endpoint in EXEMPT_ENDPOINTS:
+            return None
+        cost = request_cost()
+        refused = self._limit(cost)
+        if refused is not None:
+            return refused
+
+        limit = config['LOAD_SHED_MAX_INFLIGHT']
+        with self._lock:
+            if limit and self.inflight and self.inflight + cost > limit:
+                return _refuse(503, 'Server busy, retry later', config['LOAD_SHED_RETRY_AFTER'])
+            self.inflight += cost
+        g.inflight_cost = cost
+        return None
+
+    def _teardown_request(self, exc):
+        cost = g.pop('inflight_cost', None)
+        if cost is not None:
+            with self._lock:
+                self.inflight -= cost
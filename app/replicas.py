@@ -0,0 +1,220 @@
+import argparse
+import bisect
+import itertools
+import sqlite3
+import threading
+import time
+from flask import current_app, g, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+
+READ_METHODS = ('GET', 'HEAD')
+
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica engine chosen for the request.
+
+    Flushes, and anything given an explicit bind, still go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = self.info.get('replica')
+        if replica is not None and bind is None and not self._flushing:
+            return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _versions(engine):
+    with engine.connect() as conn:
+        return dict(conn.execute(text('SELECT table_name, version FROM table_version')).all())
+
+
+class ReplicaRouter:
+    """Route GET requests to the ``REPLICA_DATABASE_URLS`` read replicas.
+
+    Replicas are registered as ``replica<n>`` binds and used round-robin.
+    Writes, and reads from a client that wrote in the last
+    ``READ_YOUR_WRITES_SECONDS`` (tracked with a cookie), go to the primary.
+    A replica is skipped while its lag exceeds ``REPLICA_MAX_LAG`` seconds:
+    the time since the primary reached the oldest table version the replica
+    is still missing.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._state = {}
+        # table -> [(version, first seen on the primary)], ascending.
+        self._reached = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # Must run before db.init_app so the binds exist when the engines are created.
+        app.extensions['replica_router'] = self
+        urls = app.config['REPLICA_DATABASE_URLS']
+        if not urls:
+            return
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        names = []
+        for index, url in enumerate(urls):
+            names.append(f'replica{index}')
+            binds[names[-1]] = url
+        app.config['SQLALCHEMY_BINDS'] = binds
+        app.config['REPLICA_BINDS'] = names
+        self._cycle = itertools.cycle(names)
+        self._state, self._reached = {}, {}
+
+        app.before_request(self._route)
+        app.after_request(self._remember_write)
+        app.teardown_request(self._reset)
+
+    def _db(self):
+        return current_app.extensions['sqlalchemy']
+
+    def _observe(self, primary, now):
+        for table, version in primary.items():
+            history = self._reached.setdefault(table, [])
+            if history and history[-1][0] > version:
+                # The primary was restored from an older copy.
+                history.clear()
+            if not history or history[-1][0] < version:
+                history.append((version, now))
+
+    def _behind_since(self, primary, replica):
+        since = None
+        for table, version in primary.items():
+            missing = replica.get(table, -1) + 1
+            if missing > version:
+                continue
+            history = self._reached[table]
+            reached = history[bisect.bisect_left(history, (missing,))][1]
+            since = reached if since is None else min(since, reached)
+        return since
+
+    def _prune(self):
+        # Versions every replica already has can't be the oldest missing one any more.
+        for table, history in self._reached.items():
+            applied = [state['versions'].get(table, -1) for state in self._state.values()
+                       if state['versions'] is not None]
+            if applied:
+                del history[:bisect.bisect_right(history, (min(applied), float('inf')))]
+
+    def lag(self, name):
+        """Seconds since the primary reached the oldest version the replica lacks.
+
+        Primary versions are timed when a check first sees them, so this can
+        read up to ``REPLICA_LAG_CHECK_INTERVAL`` low.
+        """
+        now = time.monotonic()
+        with self._lock:
+            state = self._state.setdefault(name, {'checked': None, 'behind_since': None, 'error': False,
+                                                  'versions': None})
+            due = state['checked'] is None or now - state['checked'] >= current_app.config['REPLICA_LAG_CHECK_INTERVAL']
+            if due:
+                state['checked'] = now
+        if due:
+            db = self._db()
+            try:
+                primary, replica = _versions(db.engine), _versions(db.engines[name])
+            except Exception as err:
+                current_app.logger.warning(f'Replica {name} check failed: {err}')
+                primary = replica = None
+            with self._lock:
+                state['error'] = primary is None
+                state['versions'] = replica
+                if primary is not None:
+                    self._observe(primary, now)
+                    state['behind_since'] = self._behind_since(primary, replica)
+                    self._prune()
+        with self._lock:
+            if state['error']:
+                return float('inf')
+            return 0.0 if state['behind_since'] is None else now - state['behind_since']
+
+    def _wants_primary(self):
+        if request.method not in READ_METHODS:
+            return True
+        if request.headers.get('X-Read-Consistency') == 'primary':
+            return True
+        try:
+            written_until = float(request.cookies.get(current_app.config['READ_YOUR_WRITES_COOKIE'], 0))
+        except ValueError:
+            written_until = 0
+        return written_until > time.time()
+
+    def _route(self):
+        g.db_route = 'primary'
+        if self._wants_primary():
+            return
+        names = current_app.config['REPLICA_BINDS']
+        for _ in names:
+            name = next(self._cycle)
+            if self.lag(name) <= current_app.config['REPLICA_MAX_LAG']:
+                self._db().session.info['replica'] = self._db().engines[name]
+                g.db_route = name
+                return
+
+    def _remember_write(self, response):
+        response.headers['X-DB-Route'] = g.get('db_route', 'primary')
+        if request.method not in READ_METHODS and response.status_code < 400:
+            window = current_app.config['READ_YOUR_WRITES_SECONDS']
+            response.set_cookie(current_app.config['READ_YOUR_WRITES_COOKIE'], str(time.time() + window),
+                                max_age=window, httponly=True, samesite='Lax')
+        return response
+
+    def _reset(self, exc):
+        self._db().session.info.pop('replica', None)
+
+
+class SQLiteReplicator:
+    """Stand-in replication for local testing: copies the primary SQLite file
+    over the replica with the online backup API, once or every ``interval``."""
+
+    def __init__(self, primary, replica):
+        self.primary = primary
+        self.replica = replica
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sync(self):
+        source = sqlite3.connect(self.primary)
+        target = sqlite3.connect(self.replica)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+
+    def start(self, interval):
+        def run():
+            while not self._stop.wait(interval):
+                self.sync()
+
+        self.sync()
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Keep a SQLite replica file in sync with the primary.')
+    parser.add_argument('primary')
+    parser.add_argument('replica')
+    parser.add_argument('--interval', type=float, default=1.0, help='seconds between copies')
+    args = parser.parse_args()
+
+    replicator = SQLiteReplicator(args.primary, args.replica)
+    replicator.start(args.interval)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        replicator.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,22 @@
-from flask import Blueprint, request, jsonify, current_app
-from .models import db, Cake, Bakery
-from .schemas import CakeSchema, BakerySchema
-from werkzeug.exceptions import NotFound, BadRequest
+import math
+from functools import partial
+from flask import Blueprint, Response, request, jsonify, current_app, abort, stream_with_context
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import selectinload
+from . import cache, idempotency
+from .models import db, Cake, Bakery, cakes_bakeries
+from .schemas import CakeSchema, BakerySchema, CakeWithBakeriesSchema, BakeryWithCakesSchema
+from .pagination import InvalidCursor, decode_cursor, keyset_page
+from .streaming import stream_ndjson, wants_stream
+from .serializers import RowSerializer, SchemaSerializer
+from .versions import bump_versions, conditional, tables_for
+from .search import search_cakes
+from .bulk import (bulk_create, bulk_update, bulk_delete, bulk_link, bulk_unlink, cake_bakery_ids,
+                   link_cake_bakeries, replace_cake_bakeries, unlink_cake_bakeries)
+from .stats import (CAKE_GROUPS, bakery_cake_count, bakery_stats, cake_stats, count_rows, mark_bakeries,
+                    mark_cakes, mark_flavors, refresh_bakery_stats, row_count)
+from .counts import COUNT_MODES, cached_count
+from .snapshot import MIMETYPE as SNAPSHOT_MIMETYPE, SnapshotError, dump_snapshot, load_snapshot
 from marshmallow import ValidationError
 
 api_bp = Blueprint('api', __name__)
@@ -10,6 +25,13 @@ cake_schema = CakeSchema()
 cakes_schema = CakeSchema(many=True)
 bakery_schema = BakerySchema()
 bakeries_schema = BakerySchema(many=True)
+cake_serializer = RowSerializer(cake_schema)
+bakery_serializer = RowSerializer(bakery_schema)
+# Updates validate into plain dicts and go straight to an UPDATE statement.
+cake_changes_schema = CakeSchema(load_instance=False, partial=True)
+bakery_changes_schema = BakerySchema(load_instance=False, partial=True)
+cake_with_bakeries_serializer = SchemaSerializer(CakeWithBakeriesSchema(), selectinload(Cake.bakeries))
+bakery_with_cakes_serializer = SchemaSerializer(BakeryWithCakesSchema(), selectinload(Bakery.cakes))
 
 
 @api_bp.app_errorhandler(ValidationError)
@@ -17,6 +39,11 @@ def handle_validation_error(error):
     return jsonify({'error': error.messages}), 400
 
 
+@api_bp.app_errorhandler(400)
+def handle_bad_request_error(error):
+    return jsonify({'error': error.description}), 400
+
+
 @api_bp.app_errorhandler(404)
 def handle_not_found_error(error):
     return jsonify({'error': 'Resource not found'}), 404
@@ -33,46 +60,81 @@ def trigger_internal_server_error():
     raise Exception("This is a test exception")
 
 
+@api_bp.route('/api/v1/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify(cache.stats()), 200
+
+
+def _cake_tags(id=None):
+    tags = ['cakes'] if id is None else [f'cake:{id}']
+    if 'include' in request.args:
+        tags += ['bakeries', 'links']
+    return tags
+
+
+def _bakery_tags(id=None):
+    tags = ['bakeries'] if id is None else [f'bakery:{id}']
+    if 'include' in request.args:
+        tags += ['cakes', 'links']
+    return tags
+
+
+def _bakery_cakes_tags(bakery_id):
+    return _cake_tags() + ['links', f'bakery:{bakery_id}']
+
+
+def _commit(*tags):
+    refresh_bakery_stats()
+    bump_versions(tables_for(tags))
+    db.session.commit()
+    cache.invalidate(*tags)
+
+
 @api_bp.route('/api/v1/cakes', methods=['GET'])
+@conditional(_cake_tags)
+@cache.cached(_cake_tags, unless=wants_stream)
 def get_cakes():
-    flavor = request.args.get('flavor')
-    max_price = request.args.get('max_price', type=float)
-    page = request.args.get('page', type=int)
-    limit = request.args.get('limit', type=int)
+    return _list_cakes(Cake.query)
 
-    query = Cake.query
-    if flavor:
-        query = query.filter(Cake.flavor.ilike(f'%{flavor}%'))
 
-    if max_price is not None:
-        query = query.filter(Cake.price <= max_price)
+def _include(allowed):
+    include = {name for name in request.args.get('include', '').split(',') if name}
+    unknown = include - {allowed}
+    if unknown:
+        abort(400, f"Unknown include: {', '.join(sorted(unknown))}")
+    return allowed in include
 
-    if page is not None and limit is not None:
-        pagination = query.paginate(page=page, per_page=limit, error_out=False)
-        cakes = pagination.items
-        total_pages = pagination.pages
-        total_items = pagination.total
 
-        result = {
-            'cakes': cakes_schema.dump(cakes),
-            'total_pages': total_pages,
-            'total_items': total_items,
-            'current_page': page
-        }
-        return jsonify(result), 200
-    else:
-        # No pagination, return all results
-        cakes = query.all()
-        return cakes_schema.jsonify(cakes), 200
+def _fields(serializer, schema):
+    # Sparse fieldsets: ?fields=name,price narrows both the SELECT and the output; id is always kept.
+    if 'fields' not in request.args:
+        return serializer
+    names = {name.strip() for name in request.args['fields'].split(',') if name.strip()}
+    unknown = names - set(schema.dump_fields)
+    if unknown:
+        abort(400, f"Unknown field: {', '.join(sorted(unknown))}")
+    return serializer.only(tuple(sorted(names | {'id'})))
+
+
+def _cake_serializer():
+    return _fields(cake_with_bakeries_serializer if _include('bakeries') else cake_serializer, cake_schema)
+
+
+def _bakery_serializer():
+    return _fields(bakery_with_cakes_serializer if _include('cakes') else bakery_serializer, bakery_schema)
 
 
 @api_bp.route('/api/v1/cakes/<int:id>', methods=['GET'])
+@conditional(_cake_tags)
+@cache.cached(_cake_tags)
 def get_cake(id):
-    cake = Cake.query.get_or_404(id)
-    return cake_schema.jsonify(cake), 200
+    serializer = _cake_serializer()
+    cake = serializer.query(Cake.query.filter(Cake.id == id)).first_or_404()
+    return jsonify(serializer.dump(cake)), 200
 
 
 @api_bp.route('/api/v1/cakes', methods=['POST'])
+@idempotency.idempotent
 def create_cake():
     json_data = request.get_json()
     if not json_data:
@@ -84,47 +146,134 @@ def create_cake():
         return jsonify(err.messages), 422
 
     db.session.add(cake)
-    db.session.commit()
+    db.session.flush()
+    _commit('cakes', f'cake:{cake.id}')
     return cake_schema.jsonify(cake), 201
 
 
 @api_bp.route('/api/v1/cakes/<int:id>', methods=['PUT'])
+@idempotency.idempotent
 def update_cake(id):
-    cake = Cake.query.get_or_404(id)
     json_data = request.get_json()
     if not json_data:
         return jsonify({'error': 'No input data provided'}), 400
 
     try:
-        cake = cake_schema.load(json_data, instance=cake, partial=True)
+        data = cake_changes_schema.load(json_data)
     except ValidationError as err:
         return jsonify(err.messages), 422
 
-    db.session.commit()
-    return cake_schema.jsonify(cake), 200
+    if data.keys() & {'price', 'flavor', 'available'}:
+        mark_cakes([id])
+    if 'flavor' in data:
+        mark_flavors([data['flavor']])
+    row = _update_returning(Cake, cake_serializer, id, data)
+    _commit('cakes', f'cake:{id}')
+    return jsonify(cake_serializer.dump_row(row)), 200
 
 
 @api_bp.route('/api/v1/cakes/<int:id>', methods=['DELETE'])
 def delete_cake(id):
-    cake = Cake.query.get_or_404(id)
-    db.session.delete(cake)
-    db.session.commit()
+    mark_cakes([id])
+    _delete_by_id(Cake, id)
+    count_rows(Cake.__tablename__, -1)
+    _commit('cakes', f'cake:{id}', 'links')
     return jsonify({'message': 'Cake deleted successfully'}), 200
 
 
+def _update_returning(model, serializer, id, data):
+    """One UPDATE ... RETURNING the serializer's columns instead of loading the object first."""
+    statement = update(model).where(model.id == id)
+    statement = statement.values(**data) if data else statement.values(id=model.id)
+    row = db.session.execute(statement.returning(*serializer.columns)).first()
+    if row is None:
+        abort(404)
+    return row
+
+
+def _delete_by_id(model, id):
+    # The links go with the row through ON DELETE CASCADE.
+    if not db.session.execute(delete(model).where(model.id == id)).rowcount:
+        abort(404)
+
+
+@api_bp.route('/api/v1/cakes:batch', methods=['POST'])
+@idempotency.idempotent
+def create_cakes_batch():
+    return _batch(bulk_create, Cake, CakeSchema, tags=_cake_batch_tags, status=201)
+
+
+@api_bp.route('/api/v1/cakes:batch', methods=['PUT'])
+@idempotency.idempotent
+def update_cakes_batch():
+    return _batch(bulk_update, Cake, CakeSchema, tags=_cake_batch_tags)
+
+
+@api_bp.route('/api/v1/cakes:batch', methods=['DELETE'])
+def delete_cakes_batch():
+    return _batch(bulk_delete, Cake, tags=lambda results: _cake_batch_tags(results) + ['links'])
+
+
+def _cake_batch_tags(results):
+    return ['cakes'] + [f"cake:{result['id']}" for result in results if result['status'] != 404]
+
+
+def _stats_tags(**kwargs):
+    return ['cakes', 'bakeries', 'links']
+
+
+@api_bp.route('/api/v1/cakes/stats', methods=['GET'])
+@conditional(_stats_tags)
+@cache.cached(_stats_tags)
+def get_cake_stats():
+    group_by = request.args.get('group_by')
+    if group_by is None:
+        return jsonify(cake_stats()), 200
+    if group_by not in CAKE_GROUPS:
+        abort(400, f"group_by must be one of: {', '.join(CAKE_GROUPS)}")
+    return jsonify({'group_by': group_by, 'groups': cake_stats(group_by)}), 200
+
+
+@api_bp.route('/api/v1/bakeries/stats', methods=['GET'])
+@conditional(_stats_tags)
+@cache.cached(_stats_tags)
+def get_bakeries_stats():
+    return jsonify(bakery_stats()), 200
+
+
+@api_bp.route('/api/v1/bakeries/<int:id>/stats', methods=['GET'])
+@conditional(_stats_tags)
+@cache.cached(_stats_tags)
+def get_bakery_stats(id):
+    stats = bakery_stats(id)
+    if not stats:
+        abort(404)
+    return jsonify(stats[0]), 200
+
+
 @api_bp.route('/api/v1/bakeries', methods=['GET'])
+@conditional(_bakery_tags)
+@cache.cached(_bakery_tags, unless=wants_stream)
 def get_bakeries():
-    bakeries = Bakery.query.all()
-    return bakeries_schema.jsonify(bakeries), 200
+    serializer = _bakery_serializer()
+    query = serializer.query(Bakery.query)
+    if wants_stream():
+        return stream_ndjson(query.order_by(Bakery.id), serializer.dump)
+    bakeries = query.all()
+    return jsonify(serializer.dump_many(bakeries)), 200
 
 
 @api_bp.route('/api/v1/bakeries/<int:id>', methods=['GET'])
+@conditional(_bakery_tags)
+@cache.cached(_bakery_tags)
 def get_bakery(id):
-    bakery = Bakery.query.get_or_404(id)
-    return bakery_schema.jsonify(bakery), 200
+    serializer = _bakery_serializer()
+    bakery = serializer.query(Bakery.query.filter(Bakery.id == id)).first_or_404()
+    return jsonify(serializer.dump(bakery)), 200
 
 
 @api_bp.route('/api/v1/bakeries', methods=['POST'])
+@idempotency.idempotent
 def create_bakery():
     json_data = request.get_json()
     if not json_data:
@@ -136,82 +285,269 @@ def create_bakery():
         return jsonify(err.messages), 422
 
     db.session.add(bakery)
-    db.session.commit()
+    db.session.flush()
+    _commit('bakeries', f'bakery:{bakery.id}')
     return bakery_schema.jsonify(bakery), 201
 
 
 @api_bp.route('/api/v1/bakeries/<int:id>', methods=['PUT'])
+@idempotency.idempotent
 def update_bakery(id):
-    bakery = Bakery.query.get_or_404(id)
     json_data = request.get_json()
     if not json_data:
         return jsonify({'error': 'No input data provided'}), 400
 
     try:
-        bakery = bakery_schema.load(json_data, instance=bakery, partial=True)
+        data = bakery_changes_schema.load(json_data)
     except ValidationError as err:
         return jsonify(err.messages), 422
 
-    db.session.commit()
-    return bakery_schema.jsonify(bakery), 200
+    row = _update_returning(Bakery, bakery_serializer, id, data)
+    _commit('bakeries', f'bakery:{id}')
+    return jsonify(bakery_serializer.dump_row(row)), 200
 
 
 @api_bp.route('/api/v1/bakeries/<int:id>', methods=['DELETE'])
 def delete_bakery(id):
-    bakery = Bakery.query.get_or_404(id)
-    db.session.delete(bakery)
-    db.session.commit()
+    _delete_by_id(Bakery, id)
+    mark_bakeries([id])
+    _commit('bakeries', f'bakery:{id}', 'links')
     return jsonify({'message': 'Bakery deleted successfully'}), 200
 
 
+@api_bp.route('/api/v1/bakeries:batch', methods=['POST'])
+@idempotency.idempotent
+def create_bakeries_batch():
+    return _batch(bulk_create, Bakery, BakerySchema, tags=_bakery_batch_tags, status=201)
+
+
+@api_bp.route('/api/v1/bakeries:batch', methods=['PUT'])
+@idempotency.idempotent
+def update_bakeries_batch():
+    return _batch(bulk_update, Bakery, BakerySchema, tags=_bakery_batch_tags)
+
+
+@api_bp.route('/api/v1/bakeries:batch', methods=['DELETE'])
+def delete_bakeries_batch():
+    return _batch(bulk_delete, Bakery, tags=lambda results: _bakery_batch_tags(results) + ['links'])
+
+
+def _bakery_batch_tags(results):
+    return ['bakeries'] + [f"bakery:{result['id']}" for result in results if result['status'] != 404]
+
+
+def _batch(operation, *args, tags, status=200):
+    json_data = request.get_json()
+    if not json_data:
+        return jsonify({'error': 'No input data provided'}), 400
+    if not isinstance(json_data, list):
+        return jsonify({'error': 'Expected a list of items'}), 400
+    if len(json_data) > current_app.config['BATCH_MAX_ITEMS']:
+        return jsonify({'error': f"A batch may contain at most {current_app.config['BATCH_MAX_ITEMS']} items"}), 400
+
+    try:
+        results = operation(*args, json_data)
+    except ValidationError as err:
+        db.session.rollback()
+        return jsonify(err.messages), 422
+
+    _commit(*tags(results))
+    return jsonify({'results': results}), status
+
+
+@api_bp.route('/api/v1/cakes/bakeries:batch', methods=['POST'])
+def link_bakeries_batch():
+    return _batch(bulk_link, tags=lambda results: ['links'])
+
+
+@api_bp.route('/api/v1/cakes/bakeries:batch', methods=['DELETE'])
+def unlink_bakeries_batch():
+    return _batch(bulk_unlink, tags=lambda results: ['links'])
+
+
+@api_bp.route('/api/v1/catalog/snapshot', methods=['GET'])
+def export_snapshot():
+    chunk_size = request.args.get('chunk_size', current_app.config['SNAPSHOT_CHUNK_SIZE'], type=int)
+    if not 1 <= chunk_size <= current_app.config['SNAPSHOT_CHUNK_SIZE']:
+        return jsonify({'error': f"chunk_size must be between 1 and {current_app.config['SNAPSHOT_CHUNK_SIZE']}"}), 400
+    response = Response(stream_with_context(dump_snapshot(chunk_size)), mimetype=SNAPSHOT_MIMETYPE)
+    response.headers['Content-Disposition'] = 'attachment; filename=catalog-snapshot.tar'
+    return response
+
+
+@api_bp.route('/api/v1/catalog/snapshot', methods=['POST'])
+def import_snapshot():
+    replace = request.args.get('replace', '').lower() in ('1', 'true')
+    try:
+        loaded = load_snapshot(request.stream, replace=replace)
+    except SnapshotError as err:
+        return jsonify({'error': str(err)}), 400
+    return jsonify({'loaded': loaded}), 200
+
+
+@api_bp.route('/api/v1/cakes/<int:cake_id>/bakeries', methods=['PUT'])
+def set_cake_bakeries(cake_id):
+    return _change_cake_bakeries(cake_id, replace_cake_bakeries)
+
+
+@api_bp.route('/api/v1/cakes/<int:cake_id>/bakeries', methods=['POST'])
+def add_cake_bakeries(cake_id):
+    return _change_cake_bakeries(cake_id, lambda cake_id, ids: (link_cake_bakeries(cake_id, ids), []))
+
+
+@api_bp.route('/api/v1/cakes/<int:cake_id>/bakeries', methods=['DELETE'])
+def remove_cake_bakeries(cake_id):
+    return _change_cake_bakeries(cake_id, lambda cake_id, ids: ([], unlink_cake_bakeries(cake_id, ids)))
+
+
+def _change_cake_bakeries(cake_id, change):
+    json_data = request.get_json()
+    if json_data is None:
+        return jsonify({'error': 'No input data provided'}), 400
+    if not isinstance(json_data, list):
+        return jsonify({'error': 'Expected a list of bakery ids'}), 400
+    if len(json_data) > current_app.config['BATCH_MAX_ITEMS']:
+        return jsonify({'error': f"A batch may contain at most {current_app.config['BATCH_MAX_ITEMS']} items"}), 400
+
+    Cake.query.get_or_404(cake_id)
+    try:
+        bakery_ids = cake_bakery_ids(json_data)
+    except ValidationError as err:
+        return jsonify(err.messages), 422
+
+    added, removed = change(cake_id, bakery_ids)
+    if added or removed:
+        _commit('links')
+    return jsonify({'cake_id': cake_id, 'added': added, 'removed': removed}), 200
+
+
 @api_bp.route('/api/v1/cakes/<int:cake_id>/bakeries/<int:bakery_id>', methods=['POST'])
 def add_bakery_to_cake(cake_id, bakery_id):
-    cake = Cake.query.get_or_404(cake_id)
-    bakery = Bakery.query.get_or_404(bakery_id)
-    if bakery not in cake.bakeries:
-        cake.bakeries.append(bakery)
-        db.session.commit()
+    Cake.query.get_or_404(cake_id)
+    Bakery.query.get_or_404(bakery_id)
+    if not _is_linked(cake_id, bakery_id):
+        db.session.execute(cakes_bakeries.insert().values(cake_id=cake_id, bakery_id=bakery_id))
+        mark_bakeries([bakery_id])
+        _commit('links')
     return jsonify({'message': 'Bakery added to cake'}), 200
 
 
 @api_bp.route('/api/v1/cakes/<int:cake_id>/bakeries/<int:bakery_id>', methods=['DELETE'])
 def remove_bakery_from_cake(cake_id, bakery_id):
-    cake = Cake.query.get_or_404(cake_id)
-    bakery = Bakery.query.get_or_404(bakery_id)
-    if bakery in cake.bakeries:
-        cake.bakeries.remove(bakery)
-        db.session.commit()
+    Cake.query.get_or_404(cake_id)
+    Bakery.query.get_or_404(bakery_id)
+    result = db.session.execute(cakes_bakeries.delete().where(
+        cakes_bakeries.c.cake_id == cake_id, cakes_bakeries.c.bakery_id == bakery_id))
+    if result.rowcount:
+        mark_bakeries([bakery_id])
+        _commit('links')
     return jsonify({'message': 'Bakery removed from cake'}), 200
 
 
+def _is_linked(cake_id, bakery_id):
+    # Primary key lookup on cakes_bakeries instead of loading cake.bakeries.
+    statement = select(cakes_bakeries.c.cake_id).where(
+        cakes_bakeries.c.cake_id == cake_id, cakes_bakeries.c.bakery_id == bakery_id)
+    return db.session.execute(statement).first() is not None
+
+
 @api_bp.route('/api/v1/bakeries/<int:bakery_id>/cakes', methods=['GET'])
+@conditional(_bakery_cakes_tags)
+@cache.cached(_bakery_cakes_tags, unless=wants_stream)
 def get_cakes_by_bakery(bakery_id):
-    bakery = Bakery.query.get_or_404(bakery_id)
+    Bakery.query.get_or_404(bakery_id)
+    query = Cake.query.join(cakes_bakeries, cakes_bakeries.c.cake_id == Cake.id).filter(
+        cakes_bakeries.c.bakery_id == bakery_id)
+    return _list_cakes(query, bakery_id=bakery_id)
+
+
+def _list_cakes(query, bakery_id=None):
+    q = request.args.get('q')
     flavor = request.args.get('flavor')
     max_price = request.args.get('max_price', type=float)
     page = request.args.get('page', type=int)
     limit = request.args.get('limit', type=int)
 
-    query = Cake.query.join(Cake.bakeries).filter(Bakery.id == bakery_id)
     if flavor:
         query = query.filter(Cake.flavor.ilike(f'%{flavor}%'))
 
     if max_price is not None:
         query = query.filter(Cake.price <= max_price)
 
+    rank = None
+    if q is not None:
+        query, rank = search_cakes(query, q)
+
+    # Counted before the serializer narrows the columns, so every fieldset shares a cached count.
+    count_total = partial(_count_total, query, filtered=bool(flavor) or max_price is not None or q is not None,
+                          bakery_id=bakery_id)
+    serializer = _cake_serializer()
+    query = serializer.query(query)
+    if 'cursor' in request.args:
+        # Keyset pages are ordered by id, so search results are not ranked here.
+        return _list_cakes_by_cursor(query, limit, serializer, count_total)
+
+    if rank is not None:
+        query = query.order_by(rank, Cake.id)
+
     if page is not None and limit is not None:
-        pagination = query.paginate(page=page, per_page=limit, error_out=False)
+        total_items = count_total('exact')
+        pagination = query.paginate(page=page, per_page=limit, error_out=False, count=False)
         cakes = pagination.items
-        total_pages = pagination.pages
-        total_items = pagination.total
 
         result = {
-            'cakes': cakes_schema.dump(cakes),
-            'total_pages': total_pages,
-            'total_items': total_items,
+            'cakes': serializer.dump_many(cakes),
             'current_page': page
         }
+        if total_items is not None:
+            result['total_pages'] = math.ceil(total_items / pagination.per_page) if total_items else 0
+            result['total_items'] = total_items
         return jsonify(result), 200
     else:
+        # No pagination, return all results
+        if wants_stream():
+            return stream_ndjson(query.order_by(Cake.id), serializer.dump)
         cakes = query.all()
-        return cakes_schema.jsonify(cakes), 200
+        return jsonify(serializer.dump_many(cakes)), 200
+
+
+def _count_total(query, default, filtered, bakery_id=None):
+    """``total_items`` as asked for by ``?count=``; None when it should be left out.
+
+    Unfiltered lists read the maintained counters, filtered ones go through
+    the short-lived count cache.
+    """
+    count = request.args.get('count', default)
+    if count not in COUNT_MODES:
+        abort(400, f"count must be one of: {', '.join(COUNT_MODES)}")
+    if count == 'none':
+        return None
+    if not filtered:
+        total = row_count(Cake.__tablename__) if bakery_id is None else bakery_cake_count(bakery_id)
+        if total is not None:
+            return total
+    return cached_count(query, exact=count == 'exact')
+
+
+def _list_cakes_by_cursor(query, limit, serializer, count_total):
+    if limit is None:
+        limit = current_app.config['DEFAULT_PAGE_SIZE']
+    if not 1 <= limit <= current_app.config['MAX_PAGE_SIZE']:
+        return jsonify({'error': f"limit must be between 1 and {current_app.config['MAX_PAGE_SIZE']}"}), 400
+
+    total_items = count_total('none')
+
+    try:
+        after = decode_cursor(request.args['cursor'])
+    except InvalidCursor as err:
+        return jsonify({'error': str(err)}), 400
+
+    cakes, next_cursor = keyset_page(query, Cake.id, after, limit)
+    result = {
+        'cakes': serializer.dump_many(cakes),
+        'next_cursor': next_cursor,
+        'limit': limit
+    }
+    if total_items is not None:
+        result['total_items'] = total_items
+    return jsonify(result), 200
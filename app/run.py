@@ -1,6 +1,8 @@
+import os
 from app import create_app
+from app.config import Config
 
-app = create_app()
+app = create_app(os.environ.get('APP_CONFIG', Config))
 
 if __name__ == '__main__':
     app.run()
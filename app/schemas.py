@@ -1,6 +1,6 @@
 from . import ma
 from .models import Cake, Bakery
-from marshmallow import validates, ValidationError
+from marshmallow import fields, validates, ValidationError
 
 class CakeSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
@@ -23,3 +23,13 @@ class BakerySchema(ma.SQLAlchemyAutoSchema):
     def validate_rating(self, value):
         if not 1 <= value <= 5:
             raise ValidationError('Rating must be between 1 and 5.')
+
+class CakeWithBakeriesSchema(CakeSchema):
+    bakeries = ma.Nested(BakerySchema, many=True, dump_only=True)
+
+class BakeryWithCakesSchema(BakerySchema):
+    cakes = ma.Nested(CakeSchema, many=True, dump_only=True)
+
+class CakeBakeryLinkSchema(ma.Schema):
+    cake_id = fields.Integer(required=True, strict=True)
+    bakery_id = fields.Integer(required=True, strict=True)
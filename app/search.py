@@ -0,0 +1,103 @@
+import re
+from flask import current_app
+from sqlalchemy import Float, Integer, event, false, func, literal_column, or_, text
+from sqlalchemy.exc import DBAPIError
+from . import db
+from .models import Cake
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS cake_fts USING fts5("
+    "name, flavor, content='cake', content_rowid='id', prefix='2 3', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS cake_fts_ai AFTER INSERT ON cake BEGIN "
+    "INSERT INTO cake_fts(rowid, name, flavor) VALUES (new.id, new.name, new.flavor); END",
+    "CREATE TRIGGER IF NOT EXISTS cake_fts_ad AFTER DELETE ON cake BEGIN "
+    "INSERT INTO cake_fts(cake_fts, rowid, name, flavor) VALUES ('delete', old.id, old.name, old.flavor); END",
+    "CREATE TRIGGER IF NOT EXISTS cake_fts_au AFTER UPDATE OF name, flavor ON cake BEGIN "
+    "INSERT INTO cake_fts(cake_fts, rowid, name, flavor) VALUES ('delete', old.id, old.name, old.flavor); "
+    "INSERT INTO cake_fts(rowid, name, flavor) VALUES (new.id, new.name, new.flavor); END",
+]
+
+POSTGRESQL_DDL = [
+    "ALTER TABLE cake ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS "
+    "(to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(flavor, ''))) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_cake_search_vector ON cake USING gin (search_vector)",
+]
+
+# Engine URL -> whether the index exists. The migration runs offline, so the answer holds for the process.
+_available = {}
+
+
+def is_search_object(name):
+    # Objects maintained here rather than declared on the models.
+    return name.startswith('cake_fts') or name in ('search_vector', 'ix_cake_search_vector')
+
+
+@event.listens_for(Cake.__table__, 'after_create')
+def create_search_index(target, connection, **kw):
+    statements = {'sqlite': SQLITE_DDL, 'postgresql': POSTGRESQL_DDL}.get(connection.dialect.name)
+    if not statements:
+        return
+    try:
+        with connection.begin_nested():
+            for statement in statements:
+                connection.exec_driver_sql(statement)
+        _available[connection.engine.url] = True
+    except DBAPIError as err:
+        # e.g. SQLite built without FTS5; searches fall back to ILIKE.
+        current_app.logger.warning(f'Cake search index unavailable: {err}')
+
+
+@event.listens_for(Cake.__table__, 'before_drop')
+def drop_search_index(target, connection, **kw):
+    _available.pop(connection.engine.url, None)
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql('DROP TABLE IF EXISTS cake_fts')
+
+
+def search_available():
+    engine = db.engine
+    if engine.url in _available:
+        return _available[engine.url]
+    if engine.dialect.name == 'sqlite':
+        statement = text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cake_fts'")
+    elif engine.dialect.name == 'postgresql':
+        statement = text("SELECT 1 FROM information_schema.columns "
+                         "WHERE table_name = 'cake' AND column_name = 'search_vector'")
+    else:
+        _available[engine.url] = False
+        return False
+    _available[engine.url] = db.session.execute(statement).first() is not None
+    return _available[engine.url]
+
+
+def _terms(q):
+    return re.findall(r'\w+', q)
+
+
+def search_cakes(query, q):
+    """Restrict ``query`` to cakes whose name or flavor match ``q``.
+
+    Every term is matched as a prefix. Returns the filtered query and a rank
+    expression that sorts best matches first, or ``None`` when the search
+    index is missing and the ILIKE fallback was used.
+    """
+    terms = _terms(q)
+    if not terms:
+        return query.filter(false()), None
+
+    if not search_available():
+        for term in terms:
+            query = query.filter(or_(Cake.name.ilike(f'%{term}%'), Cake.flavor.ilike(f'%{term}%')))
+        return query, None
+
+    if db.engine.dialect.name == 'sqlite':
+        match = ' AND '.join(f'"{term}"*' for term in terms)
+        matches = (text('SELECT rowid AS cake_id, bm25(cake_fts) AS rank FROM cake_fts WHERE cake_fts MATCH :match')
+                   .bindparams(match=match)
+                   .columns(cake_id=Integer, rank=Float)
+                   .subquery('cake_search'))
+        return query.join(matches, matches.c.cake_id == Cake.id), matches.c.rank
+
+    tsquery = func.to_tsquery('simple', ' & '.join(f'{term}:*' for term in terms))
+    search_vector = literal_column('cake.search_vector')
+    return query.filter(search_vector.op('@@')(tsquery)), -func.ts_rank(search_vector, tsquery)
@@ -0,0 +1,220 @@
+import csv
+import gzip
+import io
+import json
+import sys
+import tarfile
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import delete, select, text
+from sqlalchemy.exc import SQLAlchemyError
+from . import cache, db
+from .models import Cake, Bakery, BakeryStats, BakeryFlavorStats, CakeFlavorStats, cakes_bakeries
+from .stats import rebuild_bakery_stats, rebuild_row_counts
+from .versions import bump_versions
+
+FORMAT_VERSION = 1
+MANIFEST = 'manifest.json'
+MIMETYPE = 'application/x-tar'
+# Parents before children, so a load never violates a foreign key.
+TABLES = (Bakery.__table__, Cake.__table__, cakes_bakeries)
+DERIVED_TABLES = (BakeryStats.__table__, BakeryFlavorStats.__table__, CakeFlavorStats.__table__)
+GZIP_LEVEL = 6
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+class _Buffer:
+    """Write target for a streamed tar that hands back what was written so far."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def _add(archive, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(time.time())
+    archive.addfile(info, io.BytesIO(data))
+
+
+def _encode(columns, rows):
+    text_buffer = io.StringIO()
+    writer = csv.writer(text_buffer)
+    writer.writerow(columns)
+    writer.writerows([int(value) if isinstance(value, bool) else value for value in row] for row in rows)
+    return gzip.compress(text_buffer.getvalue().encode('utf-8'), compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _point_in_time(engine):
+    """Open a connection whose reads all see the database as of the first one."""
+    if engine.dialect.name == 'sqlite':
+        connection = engine.connect()
+        # pysqlite doesn't BEGIN before a SELECT; one explicit transaction keeps one read snapshot.
+        connection.exec_driver_sql('BEGIN')
+        return connection
+    return engine.connect().execution_options(isolation_level='REPEATABLE READ')
+
+
+def dump_snapshot(chunk_size):
+    """Yield the catalog as a tar stream of gzipped CSV chunks.
+
+    The archive holds ``manifest.json`` and then ``<table>/<n>.csv.gz``
+    members of at most ``chunk_size`` rows each, every one starting with a
+    header row. Rows are fetched ``chunk_size`` at a time, so memory stays
+    bounded by the chunk size rather than by the catalog. All tables are read
+    in one transaction, so links never point at rows missing from the dump.
+    """
+    buffer = _Buffer()
+    with _point_in_time(db.session.get_bind()) as connection, tarfile.open(fileobj=buffer, mode='w|') as archive:
+        manifest = {'format': FORMAT_VERSION, 'tables': [table.name for table in TABLES]}
+        _add(archive, MANIFEST, json.dumps(manifest).encode('utf-8'))
+        for table in TABLES:
+            columns = [column.name for column in table.columns]
+            statement = select(*table.columns).order_by(*table.primary_key.columns)
+            result = connection.execute(statement.execution_options(yield_per=chunk_size))
+            for index, rows in enumerate(result.partitions(chunk_size)):
+                _add(archive, f'{table.name}/{index:06d}.csv.gz', _encode(columns, rows))
+                yield buffer.take()
+        connection.rollback()
+    yield buffer.take()
+
+
+def _converter(column):
+    python_type = column.type.python_type
+    if python_type is bool:
+        convert = lambda value: value.lower() in ('1', 'true')  # noqa: E731
+    elif python_type is str:
+        convert = str
+    else:
+        convert = python_type
+
+    def parse(value):
+        if value == '' and (column.nullable or python_type is not str):
+            return None
+        return convert(value)
+
+    return parse
+
+
+def _decode(table, data):
+    reader = csv.reader(io.StringIO(gzip.decompress(data).decode('utf-8')))
+    header = next(reader, [])
+    unknown = [name for name in header if name not in table.columns]
+    if unknown:
+        raise SnapshotError(f"Unknown column in {table.name}: {', '.join(unknown)}")
+    converters = [_converter(table.columns[name]) for name in header]
+    return [{name: convert(value) for name, convert, value in zip(header, converters, row)} for row in reader]
+
+
+def _is_empty():
+    return all(db.session.execute(select(*table.primary_key.columns).limit(1)).first() is None for table in TABLES)
+
+
+def _reset_sequences():
+    # Rows were inserted with their ids, which PostgreSQL sequences don't see.
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return
+    for table in (Bakery.__table__, Cake.__table__):
+        db.session.execute(text(f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                                f"coalesce(max(id), 0) + 1, false) FROM {table.name}"))
+
+
+def load_snapshot(fileobj, replace=False):
+    """Bulk insert a snapshot read from ``fileobj``, one chunk at a time.
+
+    The catalog must be empty unless ``replace`` is set, in which case it is
+    cleared first. Everything happens in one transaction; the derived stats
+    and counters are rebuilt and the response cache is cleared afterwards.
+    Returns the number of rows loaded per table.
+    """
+    tables = {table.name: table for table in TABLES}
+    loaded = dict.fromkeys(tables, 0)
+    try:
+        if replace:
+            for table in reversed(TABLES + DERIVED_TABLES):
+                db.session.execute(delete(table))
+        elif not _is_empty():
+            raise SnapshotError('The catalog is not empty; load with replace to overwrite it')
+
+        with tarfile.open(fileobj=fileobj, mode='r|') as archive:
+            seen_manifest = False
+            for member in archive:
+                data = archive.extractfile(member).read() if member.isfile() else None
+                if member.name == MANIFEST:
+                    if json.loads(data).get('format') != FORMAT_VERSION:
+                        raise SnapshotError('Unsupported snapshot format')
+                    seen_manifest = True
+                    continue
+                table = tables.get(member.name.split('/', 1)[0])
+                if not seen_manifest or table is None or data is None:
+                    raise SnapshotError(f'Unexpected snapshot member: {member.name}')
+                rows = _decode(table, data)
+                if rows:
+                    db.session.execute(table.insert(), rows)
+                    loaded[table.name] += len(rows)
+            if not seen_manifest:
+                raise SnapshotError('Missing snapshot manifest')
+
+        rebuild_bakery_stats()
+        rebuild_row_counts()
+        _reset_sequences()
+        bump_versions(sorted(tables))
+        db.session.commit()
+    except SnapshotError:
+        db.session.rollback()
+        raise
+    except (tarfile.TarError, OSError, EOFError, csv.Error, TypeError, ValueError,
+            SQLAlchemyError) as err:
+        db.session.rollback()
+        raise SnapshotError(f'Invalid snapshot: {err}') from err
+    # Per-item tags such as 'cake:3' can't be enumerated, so drop everything.
+    cache.backend.clear()
+    return loaded
+
+
+catalog_cli = AppGroup('catalog', help='Export and import catalog snapshots.')
+
+
+@catalog_cli.command('export')
+@click.argument('path', type=click.Path(dir_okay=False, allow_dash=True), default='-')
+@click.option('--chunk-size', type=int, default=None, help='Rows per chunk (default: SNAPSHOT_CHUNK_SIZE).')
+def export_command(path, chunk_size):
+    """Write a catalog snapshot to PATH, or stdout."""
+    chunk_size = chunk_size or current_app.config['SNAPSHOT_CHUNK_SIZE']
+    out = sys.stdout.buffer if path == '-' else open(path, 'wb')
+    try:
+        for data in dump_snapshot(chunk_size):
+            out.write(data)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+
+@catalog_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False, allow_dash=True), default='-')
+@click.option('--replace', is_flag=True, help='Delete the current catalog first.')
+def import_command(path, replace):
+    """Load a catalog snapshot from PATH, or stdin."""
+    source = sys.stdin.buffer if path == '-' else open(path, 'rb')
+    try:
+        loaded = load_snapshot(source, replace=replace)
+    except SnapshotError as err:
+        raise click.ClickException(str(err))
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+    click.echo(', '.join(f'{count} {table}' for table, count in loaded.items()) + ' rows loaded')
@@ -0,0 +1,266 @@
+from sqlalchemy import delete, event, exists, func, insert, inspect, literal, select, true, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from . import db
+from .models import Cake, Bakery, BakeryStats, BakeryFlavorStats, CakeFlavorStats, RowCount, cakes_bakeries
+
+_STALE = 'stale_bakeries'
+_STALE_FLAVORS = 'stale_flavors'
+_FLUSHED_FLAVORS = 'flushed_flavors'
+# Dialects whose INSERT supports ON CONFLICT DO NOTHING.
+UPSERT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+# cake.available is nullable but part of the cake_flavor_stats key; NULL counts as the default.
+_AVAILABLE = func.coalesce(Cake.available, true())
+
+
+def _bakery_cakes():
+    return select(cakes_bakeries.c.bakery_id).join(Cake, Cake.id == cakes_bakeries.c.cake_id)
+
+
+def _stats_select():
+    return _bakery_cakes().add_columns(
+        func.count(), func.sum(Cake.price), func.min(Cake.price), func.max(Cake.price)
+    ).group_by(cakes_bakeries.c.bakery_id)
+
+
+def _flavor_stats_select():
+    return _bakery_cakes().add_columns(Cake.flavor, func.count()).group_by(cakes_bakeries.c.bakery_id, Cake.flavor)
+
+
+def mark_bakeries(bakery_ids):
+    """Queue the stats of ``bakery_ids`` for recomputation at the next :func:`refresh_bakery_stats`."""
+    db.session.info.setdefault(_STALE, set()).update(bakery_ids)
+
+
+def mark_flavors(flavors):
+    """Queue the cake stats of ``flavors`` for recomputation at the next :func:`refresh_bakery_stats`."""
+    db.session.info.setdefault(_STALE_FLAVORS, set()).update(flavors)
+
+
+def mark_cakes(cake_ids):
+    """Queue the stats of the flavors of ``cake_ids`` and of every bakery selling one.
+
+    Call before the change, e.g. ahead of deleting the cakes or giving them a
+    new flavor; mark the new flavor with :func:`mark_flavors`.
+    """
+    cake_ids = list(cake_ids)
+    if cake_ids:
+        rows = db.session.execute(
+            select(Cake.flavor, cakes_bakeries.c.bakery_id)
+            .outerjoin(cakes_bakeries, cakes_bakeries.c.cake_id == Cake.id)
+            .where(Cake.id.in_(cake_ids)).distinct()).all()
+        mark_flavors({flavor for flavor, _ in rows})
+        mark_bakeries({bakery_id for _, bakery_id in rows if bakery_id is not None})
+
+
+def refresh_statements(bakery_ids=None, lock=False):
+    """Statements recomputing the stats of ``bakery_ids``, or of every bakery.
+
+    With ``lock`` the bakery rows are first locked with ``SELECT ... FOR
+    UPDATE``, in id order, so two transactions refreshing the same bakery
+    take turns instead of both inserting its rows. SQLite serializes writers
+    on its own and doesn't need it.
+    """
+    stats, flavors = _stats_select(), _flavor_stats_select()
+    deletes = [delete(BakeryStats), delete(BakeryFlavorStats)]
+    locks = [select(Bakery.id).order_by(Bakery.id).with_for_update()] if lock else []
+    if bakery_ids is not None:
+        stats = stats.where(cakes_bakeries.c.bakery_id.in_(bakery_ids))
+        flavors = flavors.where(cakes_bakeries.c.bakery_id.in_(bakery_ids))
+        deletes = [statement.where(statement.table.c.bakery_id.in_(bakery_ids)) for statement in deletes]
+        locks = [statement.where(Bakery.id.in_(bakery_ids)) for statement in locks]
+    return locks + deletes + [
+        insert(BakeryStats).from_select(['bakery_id', 'cake_count', 'price_sum', 'min_price', 'max_price'], stats),
+        insert(BakeryFlavorStats).from_select(['bakery_id', 'flavor', 'cake_count'], flavors),
+    ]
+
+
+def _flavor_aggregate(column):
+    return (select(column)
+            .where(Cake.flavor == CakeFlavorStats.flavor, _AVAILABLE == CakeFlavorStats.available)
+            .scalar_subquery())
+
+
+def flavor_refresh_statements(flavors, dialect):
+    """Statements recomputing the ``cake_flavor_stats`` rows of ``flavors``.
+
+    Rows for new groups are created first, then all of the flavors' rows are
+    locked (where :func:`needs_lock`) and recomputed in place, so concurrent
+    refreshes of one flavor take turns like those of a bakery.
+    """
+    columns = ['flavor', 'available', 'cake_count', 'price_sum']
+    groups = select(Cake.flavor, _AVAILABLE, literal(0), literal(0.0)).where(Cake.flavor.in_(flavors)).distinct()
+    upsert = UPSERT_INSERTS.get(dialect.name)
+    if upsert is not None:
+        create = upsert(CakeFlavorStats).from_select(columns, groups).on_conflict_do_nothing()
+    else:
+        create = insert(CakeFlavorStats).from_select(columns, groups.where(~exists().where(
+            CakeFlavorStats.flavor == Cake.flavor, CakeFlavorStats.available == _AVAILABLE)))
+    statements = [create]
+    if needs_lock(dialect):
+        statements.append(select(CakeFlavorStats.flavor).where(CakeFlavorStats.flavor.in_(flavors))
+                          .order_by(CakeFlavorStats.flavor, CakeFlavorStats.available).with_for_update())
+    statements.append(update(CakeFlavorStats).where(CakeFlavorStats.flavor.in_(flavors)).values(
+        cake_count=_flavor_aggregate(func.count()),
+        price_sum=_flavor_aggregate(func.coalesce(func.sum(Cake.price), 0.0)),
+        min_price=_flavor_aggregate(func.min(Cake.price)),
+        max_price=_flavor_aggregate(func.max(Cake.price)),
+    ))
+    return statements
+
+
+def needs_lock(dialect):
+    return dialect.name != 'sqlite'
+
+
+def refresh_bakery_stats():
+    """Recompute the queued bakeries and flavors with GROUP BYs over their own cakes only."""
+    bakery_ids = db.session.info.pop(_STALE, None)
+    flavors = db.session.info.pop(_STALE_FLAVORS, None)
+    dialect = db.session.get_bind().dialect
+    if bakery_ids:
+        for statement in refresh_statements(sorted(bakery_ids), lock=needs_lock(dialect)):
+            db.session.execute(statement)
+    if flavors:
+        for statement in flavor_refresh_statements(sorted(flavors), dialect):
+            db.session.execute(statement)
+
+
+def rebuild_bakery_stats():
+    """Recompute every bakery and flavor, e.g. after loading data outside the API."""
+    db.session.info.pop(_STALE, None)
+    db.session.info.pop(_STALE_FLAVORS, None)
+    for statement in refresh_statements(lock=needs_lock(db.session.get_bind().dialect)):
+        db.session.execute(statement)
+    db.session.execute(delete(CakeFlavorStats))
+    db.session.execute(insert(CakeFlavorStats).from_select(
+        ['flavor', 'available', 'cake_count', 'price_sum', 'min_price', 'max_price'],
+        select(Cake.flavor, _AVAILABLE, func.count(), func.sum(Cake.price), func.min(Cake.price),
+               func.max(Cake.price)).group_by(Cake.flavor, _AVAILABLE)))
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_flushed_flavors(session, flush_context, instances):
+    # Read before the flush, while deleted cakes can still be loaded and history is intact.
+    flavors = {obj.flavor for obj in session.new | session.deleted if isinstance(obj, Cake)}
+    for obj in session.dirty:
+        if not isinstance(obj, Cake):
+            continue
+        state = inspect(obj)
+        history = [state.attrs[name].history for name in ('flavor', 'price', 'available')]
+        if any(item.has_changes() for item in history):
+            flavors.add(obj.flavor)
+            flavors.update(history[0].deleted)
+    if flavors:
+        session.info[_FLUSHED_FLAVORS] = flavors
+
+
+@event.listens_for(Session, 'after_flush')
+def _refresh_flushed_flavors(session, flush_context):
+    # Cakes written through the session are refreshed right away, like their row count.
+    flavors = session.info.pop(_FLUSHED_FLAVORS, None)
+    if flavors:
+        connection = session.connection()
+        for statement in flavor_refresh_statements(sorted(flavors), connection.dialect):
+            connection.execute(statement)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_stale_bakeries(session, previous_transaction):
+    session.info.pop(_STALE, None)
+    session.info.pop(_STALE_FLAVORS, None)
+    session.info.pop(_FLUSHED_FLAVORS, None)
+
+
+def count_statement(table, delta):
+    return (update(RowCount).where(RowCount.table_name == table)
+            .values(row_count=RowCount.row_count + delta))
+
+
+def count_rows(table, delta):
+    """Adjust the maintained row total of ``table`` after a bulk INSERT or DELETE.
+
+    Objects added or deleted through the session are counted at flush time.
+    """
+    if delta:
+        db.session.execute(count_statement(table, delta))
+
+
+@event.listens_for(Session, 'after_flush')
+def _count_flushed_cakes(session, flush_context):
+    delta = (sum(isinstance(obj, Cake) for obj in session.new)
+             - sum(isinstance(obj, Cake) for obj in session.deleted))
+    if delta:
+        session.connection().execute(count_statement(Cake.__tablename__, delta))
+
+
+def rebuild_row_counts():
+    """Recount every maintained table, e.g. after loading data outside the API."""
+    total = select(func.count()).select_from(Cake).scalar_subquery()
+    db.session.execute(update(RowCount).where(RowCount.table_name == Cake.__tablename__).values(row_count=total))
+
+
+def row_count(table):
+    return db.session.scalar(select(RowCount.row_count).where(RowCount.table_name == table))
+
+
+def bakery_cake_count(bakery_id):
+    return db.session.scalar(select(BakeryStats.cake_count).where(BakeryStats.bakery_id == bakery_id)) or 0
+
+
+def _bakery_stats_row(row, flavors):
+    bakery_id, name, cake_count, price_sum, min_price, max_price = row
+    return {
+        'bakery_id': bakery_id,
+        'name': name,
+        'cake_count': cake_count or 0,
+        'avg_price': round(price_sum / cake_count, 2) if cake_count else None,
+        'min_price': min_price,
+        'max_price': max_price,
+        'flavors': flavors.get(bakery_id, {}),
+    }
+
+
+def bakery_stats(bakery_id=None):
+    """Read the maintained stats, one row per bakery, in bakery id order."""
+    query = (select(Bakery.id, Bakery.name, BakeryStats.cake_count, BakeryStats.price_sum,
+                    BakeryStats.min_price, BakeryStats.max_price)
+             .outerjoin(BakeryStats, BakeryStats.bakery_id == Bakery.id)
+             .order_by(Bakery.id))
+    flavor_query = select(BakeryFlavorStats.bakery_id, BakeryFlavorStats.flavor, BakeryFlavorStats.cake_count)
+    if bakery_id is not None:
+        query = query.where(Bakery.id == bakery_id)
+        flavor_query = flavor_query.where(BakeryFlavorStats.bakery_id == bakery_id)
+
+    flavors = {}
+    for id, flavor, count in db.session.execute(flavor_query.order_by(BakeryFlavorStats.flavor)):
+        flavors.setdefault(id, {})[flavor] = count
+    return [_bakery_stats_row(row, flavors) for row in db.session.execute(query)]
+
+
+CAKE_GROUPS = {'flavor': CakeFlavorStats.flavor, 'available': CakeFlavorStats.available}
+
+
+def cake_stats(group_by=None):
+    """Add up the maintained ``cake_flavor_stats`` rows, O(flavors) rather than O(cakes)."""
+    cake_count = func.sum(CakeFlavorStats.cake_count)
+    columns = [func.coalesce(cake_count, 0).label('cake_count'), func.sum(CakeFlavorStats.price_sum).label('price_sum'),
+               func.min(CakeFlavorStats.min_price).label('min_price'),
+               func.max(CakeFlavorStats.max_price).label('max_price')]
+    if group_by is None:
+        row = db.session.execute(select(*columns)).one()
+        return _price_stats(row._mapping)
+    column = CAKE_GROUPS[group_by]
+    rows = db.session.execute(select(column.label(group_by), *columns)
+                              .group_by(column).having(cake_count > 0).order_by(column))
+    return [dict(_price_stats(row._mapping), **{group_by: row._mapping[group_by]}) for row in rows]
+
+
+def _price_stats(mapping):
+    cake_count = mapping['cake_count']
+    return {
+        'cake_count': cake_count,
+        'avg_price': round(mapping['price_sum'] / cake_count, 2) if cake_count else None,
+        'min_price': mapping['min_price'],
+        'max_price': mapping['max_price'],
+    }
@@ -0,0 +1,31 @@
+from flask import Response, current_app, request, stream_with_context
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def wants_stream():
+    if request.args.get('stream', '').lower() in ('1', 'true'):
+        return True
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def stream_ndjson(query, dump):
+    """Serialize ``query`` one object per line without loading it all into memory.
+
+    Rows are fetched ``STREAM_BATCH_SIZE`` at a time and every batch is sent
+    as a single chunk, so memory stays bounded by the batch size.
+    """
+    batch_size = current_app.config['STREAM_BATCH_SIZE']
+    dumps = current_app.json.dumps
+
+    def generate():
+        lines = []
+        for obj in query.yield_per(batch_size):
+            lines.append(dumps(dump(obj)))
+            if len(lines) >= batch_size:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        if lines:
+            yield '\n'.join(lines) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
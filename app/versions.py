@@ -0,0 +1,87 @@
+import hashlib
+from functools import wraps
+from flask import current_app, g, request
+from sqlalchemy import select, update
+from . import db
+from .models import TableVersion
+
+# Maps the cache tags used by the routes onto the table they describe.
+TAG_TABLES = {
+    'cakes': 'cake',
+    'cake': 'cake',
+    'bakeries': 'bakery',
+    'bakery': 'bakery',
+    'links': 'cakes_bakeries',
+}
+
+
+def tables_for(tags):
+    return sorted({TAG_TABLES[tag.split(':', 1)[0]] for tag in tags})
+
+
+def current_versions(tables):
+    statement = select(TableVersion.table_name, TableVersion.version).where(TableVersion.table_name.in_(tables))
+    versions = dict(db.session.execute(statement).all())
+    return [(table, versions.get(table, 0)) for table in tables]
+
+
+def request_versions(tables):
+    """The versions ``conditional`` read for the current view, or fresh ones.
+
+    The response cache checks its entries against these, so a cached body is
+    only served under the ETag of the versions it was stored with.
+    """
+    versions = g.get('table_versions')
+    if versions is None or [table for table, _ in versions] != tables:
+        versions = current_versions(tables)
+    return versions
+
+
+def bump_versions(tables):
+    statement = (update(TableVersion)
+                 .where(TableVersion.table_name.in_(tables))
+                 .values(version=TableVersion.version + 1)
+                 .execution_options(synchronize_session=False))
+    result = db.session.execute(statement)
+    if result.rowcount < len(tables):
+        # Databases created before the table was seeded.
+        known = {table for table, in db.session.execute(
+            select(TableVersion.table_name).where(TableVersion.table_name.in_(tables)))}
+        db.session.add_all(TableVersion(table_name=table, version=1) for table in tables if table not in known)
+
+
+def conditional(tags):
+    """Answer ``If-None-Match`` with 304 from the table versions alone.
+
+    The ETag hashes the request with the versions of every table behind
+    ``tags(**view_args)``. The versions are read before the view runs, so a
+    concurrent write can only make the ETag older than the body, never newer.
+    The view sees them as ``g.table_versions``; the response cache only
+    serves an entry stored under those same versions.
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def decorated(**kwargs):
+            versions = current_versions(tables_for(tags(**kwargs)))
+            args = sorted(request.args.items(multi=True))
+            raw = repr((request.path, args, request.headers.get('Accept', ''), versions))
+            etag = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+                response.set_etag(etag)
+                return response
+
+            g.table_versions = versions
+            try:
+                response = current_app.make_response(f(**kwargs))
+            finally:
+                g.pop('table_versions', None)
+            if response.status_code == 200:
+                response.set_etag(etag)
+            return response
+
+        return decorated
+
+    return decorator
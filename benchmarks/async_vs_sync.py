@@ -0,0 +1,88 @@
+"""Compare sustained RPS and latency of the threaded WSGI server against the ASGI app under uvicorn.
+
+    pip install -r requirements-async.txt
+    python -m benchmarks.async_vs_sync --concurrency 32 --duration 10
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+from app import create_app, db
+from app.config import ProductionConfig
+from .load import drive, serve, wait_for
+from .seed import seed_catalog
+
+PATHS = ['/api/v1/cakes?page={page}&limit=20', '/api/v1/cakes/{cake_id}', '/api/v1/bakeries/{bakery_id}/cakes']
+
+
+def _requests(args):
+    def next_request(rng):
+        path = rng.choice(PATHS).format(page=rng.randint(1, 50), cake_id=rng.randint(1, args.cakes),
+                                        bakery_id=rng.randint(1, args.bakeries))
+        return 'GET', path, None
+
+    return next_request
+
+
+def run_sync(config_class, args):
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    with serve(create_app(config_class), args.port):
+        return drive(args.port, _requests(args), args.concurrency, args.duration)
+
+
+def run_async(config_class, args):
+    env = dict(os.environ, DATABASE_URL=config_class.SQLALCHEMY_DATABASE_URI,
+               APP_CONFIG='app.config.ProductionConfig')
+    server = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'app.asgi:application', '--no-access-log',
+                               '--log-level', 'warning', '--port', str(args.port + 1)], env=env)
+    try:
+        wait_for(args.port + 1, '/api/v1/bakeries/1')
+        return drive(args.port + 1, _requests(args), args.concurrency, args.duration)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--cakes', type=int, default=10000)
+    parser.add_argument('--bakeries', type=int, default=100)
+    parser.add_argument('--port', type=int, default=8750, help='the ASGI server uses the next port')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'load.db')
+
+    class BenchmarkConfig(ProductionConfig):
+        CACHE_ENABLED = False
+        # All the load comes from one address, and app.asgi has no limiter to compare against.
+        RATELIMIT_ENABLED = False
+        SQLALCHEMY_DATABASE_URI = database_url
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.create_all()
+        seed_catalog(args.bakeries, args.cakes, 3)
+        db.engine.dispose()
+
+    report = {
+        'concurrency': args.concurrency,
+        'duration': args.duration,
+        'sync': run_sync(BenchmarkConfig, args),
+        'async': run_async(BenchmarkConfig, args),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
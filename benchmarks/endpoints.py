@@ -0,0 +1,166 @@
+"""Drive every API endpoint against a seeded synthetic catalog and report throughput,
+p50/p95/p99 latency and peak RSS as JSON, so runs can be compared over time.
+
+    python -m benchmarks.endpoints --cakes 1000000 --bakeries 10000 --links-per-cake 5 \\
+        --concurrency 16 --duration 10 --output bench.json
+
+Write endpoints run after the reads; deletes consume ids from the top of the seeded range.
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import tempfile
+import time
+from urllib.parse import quote
+from app import create_app, db
+from app.config import TestingConfig
+from app.pagination import encode_cursor
+from .load import drive, peak_rss_mb, serve
+from .seed import FLAVORS, seed_catalog
+
+
+def _cake_body(rng):
+    return {'name': f'Bench Cake {rng.randrange(10 ** 9)}', 'flavor': rng.choice(FLAVORS),
+            'price': round(rng.uniform(1, 100), 2), 'available': True}
+
+
+def _bakery_body(rng):
+    return {'name': f'Bench Bakery {rng.randrange(10 ** 9)}', 'location': f'{rng.randrange(1000)} Bench St',
+            'rating': rng.randint(1, 5)}
+
+
+def scenarios(args):
+    """``(name, next_request)`` pairs covering every route in app/routes.py except the
+    test-only ``/trigger-500``, ``/cache/stats`` (used to wait for the server) and
+    ``POST /catalog/snapshot``, which would replace the seeded catalog mid-run."""
+    cake = lambda rng: rng.randint(1, args.cakes)  # noqa: E731
+    bakery = lambda rng: rng.randint(1, args.bakeries)  # noqa: E731
+    bakery_set = lambda rng: [bakery(rng) for _ in range(args.links_per_cake)]  # noqa: E731
+    pages = max(1, min(args.cakes // 50, 1000))
+    batch = args.batch_size
+    # Deletes walk down from the highest seeded ids, shared by all clients.
+    cake_ids = itertools.count(args.cakes, -1)
+    bakery_ids = itertools.count(args.bakeries, -1)
+
+    return [
+        ('GET /cakes?page&limit', lambda rng: ('GET', f'/api/v1/cakes?page={rng.randint(1, pages)}&limit=50', None)),
+        ('GET /cakes?cursor', lambda rng: ('GET', f'/api/v1/cakes?limit=50&cursor={encode_cursor(cake(rng))}',
+                                           None)),
+        ('GET /cakes?flavor', lambda rng: ('GET', f'/api/v1/cakes?flavor={quote(rng.choice(FLAVORS))}&page=1&limit=50',
+                                           None)),
+        ('GET /cakes?max_price', lambda rng: ('GET', f'/api/v1/cakes?max_price={rng.randint(1, 100)}'
+                                                     f'&page=1&limit=50', None)),
+        ('GET /cakes?q', lambda rng: ('GET', f'/api/v1/cakes?q={quote(rng.choice(FLAVORS)[:4])}&page=1&limit=50', None)),
+        ('GET /cakes?include=bakeries', lambda rng: ('GET', f'/api/v1/cakes?include=bakeries'
+                                                            f'&page={rng.randint(1, pages)}&limit=50', None)),
+        ('GET /cakes/<id>', lambda rng: ('GET', f'/api/v1/cakes/{cake(rng)}', None)),
+        ('GET /bakeries', lambda rng: ('GET', '/api/v1/bakeries', None)),
+        ('GET /bakeries/<id>', lambda rng: ('GET', f'/api/v1/bakeries/{bakery(rng)}', None)),
+        ('GET /bakeries/<id>/cakes', lambda rng: ('GET', f'/api/v1/bakeries/{bakery(rng)}/cakes', None)),
+        ('GET /cakes/stats', lambda rng: ('GET', '/api/v1/cakes/stats', None)),
+        ('GET /cakes/stats?group_by', lambda rng: ('GET', '/api/v1/cakes/stats?group_by='
+                                                          + rng.choice(['flavor', 'available']), None)),
+        ('GET /bakeries/stats', lambda rng: ('GET', '/api/v1/bakeries/stats', None)),
+        ('GET /bakeries/<id>/stats', lambda rng: ('GET', f'/api/v1/bakeries/{bakery(rng)}/stats', None)),
+        ('GET /catalog/snapshot', lambda rng: ('GET', '/api/v1/catalog/snapshot', None)),
+        ('POST /cakes', lambda rng: ('POST', '/api/v1/cakes', _cake_body(rng))),
+        ('PUT /cakes/<id>', lambda rng: ('PUT', f'/api/v1/cakes/{cake(rng)}',
+                                         {'price': round(rng.uniform(1, 100), 2)})),
+        ('POST /bakeries', lambda rng: ('POST', '/api/v1/bakeries', _bakery_body(rng))),
+        ('PUT /bakeries/<id>', lambda rng: ('PUT', f'/api/v1/bakeries/{bakery(rng)}', {'rating': rng.randint(1, 5)})),
+        ('POST /cakes/<id>/bakeries/<id>', lambda rng: ('POST', f'/api/v1/cakes/{cake(rng)}/bakeries/{bakery(rng)}',
+                                                        None)),
+        ('DELETE /cakes/<id>/bakeries/<id>', lambda rng: ('DELETE', f'/api/v1/cakes/{cake(rng)}'
+                                                                    f'/bakeries/{bakery(rng)}', None)),
+        ('PUT /cakes/<id>/bakeries', lambda rng: ('PUT', f'/api/v1/cakes/{cake(rng)}/bakeries', bakery_set(rng))),
+        ('POST /cakes/<id>/bakeries', lambda rng: ('POST', f'/api/v1/cakes/{cake(rng)}/bakeries', bakery_set(rng))),
+        ('DELETE /cakes/<id>/bakeries', lambda rng: ('DELETE', f'/api/v1/cakes/{cake(rng)}/bakeries',
+                                                     bakery_set(rng))),
+        ('POST /cakes:batch', lambda rng: ('POST', '/api/v1/cakes:batch', [_cake_body(rng) for _ in range(batch)])),
+        ('PUT /cakes:batch', lambda rng: ('PUT', '/api/v1/cakes:batch',
+                                          [{'id': cake(rng), 'price': 9.99} for _ in range(batch)])),
+        ('POST /bakeries:batch', lambda rng: ('POST', '/api/v1/bakeries:batch',
+                                              [_bakery_body(rng) for _ in range(batch)])),
+        ('PUT /bakeries:batch', lambda rng: ('PUT', '/api/v1/bakeries:batch',
+                                             [{'id': bakery(rng), 'rating': 3} for _ in range(batch)])),
+        ('POST /cakes/bakeries:batch', lambda rng: ('POST', '/api/v1/cakes/bakeries:batch',
+                                                    [{'cake_id': cake(rng), 'bakery_id': bakery(rng)}
+                                                     for _ in range(batch)])),
+        ('DELETE /cakes/bakeries:batch', lambda rng: ('DELETE', '/api/v1/cakes/bakeries:batch',
+                                                      [{'cake_id': cake(rng), 'bakery_id': bakery(rng)}
+                                                       for _ in range(batch)])),
+        ('DELETE /cakes/<id>', lambda rng: ('DELETE', f'/api/v1/cakes/{next(cake_ids)}', None)),
+        ('DELETE /cakes:batch', lambda rng: ('DELETE', '/api/v1/cakes:batch',
+                                             [next(cake_ids) for _ in range(batch)])),
+        ('DELETE /bakeries/<id>', lambda rng: ('DELETE', f'/api/v1/bakeries/{next(bakery_ids)}', None)),
+        ('DELETE /bakeries:batch', lambda rng: ('DELETE', '/api/v1/bakeries:batch',
+                                                [next(bakery_ids) for _ in range(batch)])),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cakes', type=int, default=100000)
+    parser.add_argument('--bakeries', type=int, default=1000)
+    parser.add_argument('--links-per-cake', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per endpoint')
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--only', help='run only endpoints whose name contains this text')
+    parser.add_argument('--cache', action='store_true', help='enable the response cache')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--port', type=int, default=8760)
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    database_url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'endpoints.db')
+
+    class BenchmarkConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = database_url
+        CACHE_ENABLED = args.cache
+        # Concurrent writers would otherwise fail immediately with "database is locked".
+        SQLITE_PRAGMAS = {'journal_mode': 'WAL', 'busy_timeout': 5000}
+
+    app = create_app(BenchmarkConfig)
+    start = time.perf_counter()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed_catalog(args.bakeries, args.cakes, args.links_per_cake, seed=args.seed)
+    seed_seconds = round(time.perf_counter() - start, 1)
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    results = {}
+    with serve(app, args.port):
+        for name, next_request in scenarios(args):
+            if args.only and args.only not in name:
+                continue
+            results[name] = drive(args.port, next_request, args.concurrency, args.duration, seed=args.seed)
+            results[name]['peak_rss_mb'] = peak_rss_mb()
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'database': database_url.split(':', 1)[0],
+        'catalog': {'cakes': args.cakes, 'bakeries': args.bakeries, 'links_per_cake': args.links_per_cake},
+        'concurrency': args.concurrency,
+        'duration': args.duration,
+        'cache': args.cache,
+        'seed_seconds': seed_seconds,
+        'peak_rss_mb': peak_rss_mb(),
+        'endpoints': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
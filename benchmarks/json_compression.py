@@ -0,0 +1,88 @@
+"""Compare JSON encode time per provider and bytes on the wire per content encoding for the list endpoints.
+
+    python -m benchmarks.json_compression --cakes 100000 --bakeries 1000
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from flask.json.provider import DefaultJSONProvider
+from app import create_app, db
+from app.compression import ENCODERS
+from app.config import TestingConfig
+from app.json_provider import OrjsonProvider, orjson
+from .seed import seed_catalog
+
+PATHS = ['/api/v1/cakes?page=1&limit=1000', '/api/v1/cakes?max_price=50', '/api/v1/bakeries',
+         '/api/v1/bakeries/1/cakes', '/api/v1/cakes?page=1&limit=100&include=bakeries']
+
+
+def _median_ms(f, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(timings), 3)
+
+
+def _measure(app, client, path, args):
+    data = client.get(path).get_json()
+    providers = {'default': DefaultJSONProvider(app)}
+    if orjson is not None:
+        providers['orjson'] = OrjsonProvider(app)
+
+    result = {'items': len(data['cakes']) if isinstance(data, dict) else len(data), 'encode_ms': {}, 'bytes': {}}
+    with app.test_request_context():
+        for name, provider in providers.items():
+            result['encode_ms'][name] = _median_ms(lambda: provider.response(data), args.repeat)
+        body = providers['default'].response(data).get_data()
+    result['bytes']['identity'] = len(body)
+    result['compress_ms'] = {}
+    for encoding, encode in ENCODERS.items():
+        result['bytes'][encoding] = len(encode(body, args.level))
+        result['compress_ms'][encoding] = _median_ms(lambda: encode(body, args.level), args.repeat)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--cakes', type=int, default=100000)
+    parser.add_argument('--bakeries', type=int, default=1000)
+    parser.add_argument('--links-per-cake', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--level', type=int, default=6, help='compression level')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'json.db')
+
+    class BenchmarkConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = database_url
+        COMPRESS_ENABLED = False
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.create_all()
+        seed_catalog(args.bakeries, args.cakes, args.links_per_cake)
+        client = app.test_client()
+        results = {path: _measure(app, client, path, args) for path in PATHS}
+
+    report = {
+        'cakes': args.cakes,
+        'bakeries': args.bakeries,
+        'encodings': list(ENCODERS),
+        'endpoints': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
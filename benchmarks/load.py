@@ -0,0 +1,102 @@
+import http.client
+import json
+import random
+import resource
+import statistics
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from werkzeug.serving import make_server
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    return round(values[min(len(values) - 1, int(len(values) * percent / 100))], 2)
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux.
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+@contextmanager
+def serve(app, port):
+    """Run ``app`` on the threaded werkzeug server for the duration of the block."""
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        wait_for(port)
+        yield server
+    finally:
+        server.shutdown()
+        thread.join()
+
+
+def wait_for(port, path='/api/v1/cache/stats', timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', path)
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+def _client(port, next_request, rng, stop, latencies, errors):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    while not stop.is_set():
+        method, path, body = next_request(rng)
+        headers = {}
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors.append(None)
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port)
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+        if response.status >= 400:
+            errors.append(response.status)
+    conn.close()
+
+
+def drive(port, next_request, concurrency, duration, seed=0):
+    """Call ``next_request(rng)`` -> ``(method, path, json_body)`` from ``concurrency``
+    keep-alive clients for ``duration`` seconds and summarise the latencies."""
+    latencies, errors = [], []
+    stop = threading.Event()
+    threads = [threading.Thread(target=_client, args=(port, next_request, random.Random(seed + i),
+                                                      stop, latencies, errors))
+               for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'error_statuses': dict(Counter(str(status) for status in errors)),
+        'rps': round(len(latencies) / duration, 1),
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'mean_ms': round(statistics.fmean(latencies), 2) if latencies else None,
+    }
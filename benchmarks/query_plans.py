@@ -0,0 +1,100 @@
+"""Compare query plans and timings of the list endpoint queries with and without the filter indexes.
+
+    python -m benchmarks.query_plans --cakes 200000 --bakeries 2000
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from sqlalchemy import text
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Cake, cakes_bakeries
+from .seed import seed_catalog
+
+INDEXES = ['ix_cake_price', 'ix_cakes_bakeries_bakery_id_cake_id', 'ix_cake_flavor_trgm']
+
+
+def _queries(bakery_id):
+    # The same queries get_cakes and get_cakes_by_bakery build.
+    return {
+        'cakes?max_price=5': Cake.query.filter(Cake.price <= 5.0),
+        'cakes?flavor=velvet': Cake.query.filter(Cake.flavor.ilike('%velvet%')),
+        f'bakeries/{bakery_id}/cakes': Cake.query.join(
+            cakes_bakeries, cakes_bakeries.c.cake_id == Cake.id).filter(cakes_bakeries.c.bakery_id == bakery_id),
+    }
+
+
+def _explain(sql):
+    prefix = 'EXPLAIN QUERY PLAN ' if db.engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    return [' '.join(str(column) for column in row) for row in db.session.execute(text(prefix + sql))]
+
+
+def _measure(repeat, bakery_id):
+    results = {}
+    for name, query in _queries(bakery_id).items():
+        sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = len(db.session.execute(text(sql)).all())
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = {'rows': rows, 'median_ms': round(statistics.median(timings), 3), 'plan': _explain(sql)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--cakes', type=int, default=100000)
+    parser.add_argument('--bakeries', type=int, default=1000)
+    parser.add_argument('--links-per-cake', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    database_url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'plans.db')
+
+    class BenchmarkConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = database_url
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed_catalog(args.bakeries, args.cakes, args.links_per_cake)
+        bakery_id = args.bakeries // 2 or 1
+
+        for name in INDEXES:
+            db.session.execute(text(f'DROP INDEX IF EXISTS {name}'))
+        db.session.commit()
+        before = _measure(args.repeat, bakery_id)
+
+        for table in db.metadata.tables.values():
+            for index in table.indexes:
+                if index.name in INDEXES:
+                    index.create(db.engine, checkfirst=True)
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+        after = _measure(args.repeat, bakery_id)
+        dialect = db.engine.dialect.name
+
+    report = {
+        'database': dialect,
+        'cakes': args.cakes,
+        'bakeries': args.bakeries,
+        'before': before,
+        'after': after,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+import random
+from sqlalchemy import insert
+from app import db
+from app.models import Cake, Bakery, cakes_bakeries
+from app.stats import rebuild_bakery_stats, rebuild_row_counts
+
+FLAVORS = ['Chocolate', 'Vanilla', 'Red Velvet', 'Lemon', 'Carrot', 'Strawberry',
+           'Mango-Chocolate', 'Cheese', 'Banana', 'Coffee', 'Pistachio', 'Coconut']
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def seed_catalog(bakeries, cakes, links_per_cake, chunk_size=10000, seed=0):
+    """Insert a synthetic catalog in chunks; must run inside an app context."""
+    rng = random.Random(seed)
+
+    bakery_rows = ({'id': i, 'name': f'Bakery {i}', 'location': f'{i} Main St', 'rating': rng.randint(1, 5)}
+                   for i in range(1, bakeries + 1))
+    for chunk in _chunks(bakery_rows, chunk_size):
+        db.session.execute(insert(Bakery), chunk)
+
+    cake_rows = ({'id': i, 'name': f'Cake {i}', 'flavor': rng.choice(FLAVORS),
+                  'price': round(rng.uniform(1, 100), 2), 'available': rng.random() < 0.9}
+                 for i in range(1, cakes + 1))
+    for chunk in _chunks(cake_rows, chunk_size):
+        db.session.execute(insert(Cake), chunk)
+
+    link_rows = ({'cake_id': cake_id, 'bakery_id': bakery_id}
+                 for cake_id in range(1, cakes + 1)
+                 for bakery_id in rng.sample(range(1, bakeries + 1), min(links_per_cake, bakeries)))
+    for chunk in _chunks(link_rows, chunk_size):
+        db.session.execute(cakes_bakeries.insert(), chunk)
+
+    rebuild_bakery_stats()
+    rebuild_row_counts()
+    db.session.commit()
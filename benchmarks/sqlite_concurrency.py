@@ -0,0 +1,102 @@
+"""Compare mixed read/write throughput on SQLite with the default settings and with ProductionConfig.
+
+    python -m benchmarks.sqlite_concurrency --writers 4 --readers 8 --duration 10
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from sqlalchemy.exc import OperationalError
+from app import create_app, db
+from app.config import Config, ProductionConfig
+from app.models import Cake
+from .seed import seed_catalog
+
+
+def _worker(app, stop, write, counts, errors):
+    with app.app_context():
+        done = failed = 0
+        while not stop.is_set():
+            try:
+                if write:
+                    db.session.add(Cake(name='Benchmark Cake', flavor='Vanilla', price=9.99))
+                    db.session.commit()
+                else:
+                    Cake.query.filter(Cake.price <= 10.0).limit(50).all()
+                    db.session.rollback()
+                done += 1
+            except OperationalError:
+                # "database is locked" once the busy timeout (if any) expires.
+                db.session.rollback()
+                failed += 1
+        db.session.remove()
+        counts.append(done)
+        errors.append(failed)
+
+
+def run(config_class, args):
+    database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'concurrency.db')
+
+    class BenchmarkConfig(config_class):
+        TESTING = True
+        CACHE_ENABLED = False
+        SQLALCHEMY_DATABASE_URI = database_url
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.create_all()
+        seed_catalog(args.bakeries, args.cakes, 1)
+
+    results = {role: {'counts': [], 'errors': []} for role in ('write', 'read')}
+    stop = threading.Event()
+    threads = [threading.Thread(target=_worker, args=(app, stop, role == 'write',
+                                                      results[role]['counts'], results[role]['errors']))
+               for role, workers in (('write', args.writers), ('read', args.readers))
+               for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    with app.app_context():
+        db.engine.dispose()
+
+    return {
+        role: {
+            'ops_per_sec': round(sum(result['counts']) / args.duration, 1),
+            'errors': sum(result['errors']),
+        }
+        for role, result in results.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--cakes', type=int, default=10000)
+    parser.add_argument('--bakeries', type=int, default=100)
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    report = {
+        'writers': args.writers,
+        'readers': args.readers,
+        'duration': args.duration,
+        'default': run(Config, args),
+        'production': run(ProductionConfig, args),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
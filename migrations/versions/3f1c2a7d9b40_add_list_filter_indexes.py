@@ -0,0 +1,32 @@
+"""add list filter indexes
+
+Revision ID: 3f1c2a7d9b40
+Revises: 99802d4c754c
+Create Date: 2026-10-18 10:20:04.118273
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a7d9b40'
+down_revision = '99802d4c754c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_cake_price', 'cake', ['price'], unique=False)
+    op.create_index('ix_cakes_bakeries_bakery_id_cake_id', 'cakes_bakeries', ['bakery_id', 'cake_id'], unique=False)
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index('ix_cake_flavor_trgm', 'cake', ['flavor'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'flavor': 'gin_trgm_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_cake_flavor_trgm', table_name='cake')
+    op.drop_index('ix_cakes_bakeries_bakery_id_cake_id', table_name='cakes_bakeries')
+    op.drop_index('ix_cake_price', table_name='cake')
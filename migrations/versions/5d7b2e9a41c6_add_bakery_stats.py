@@ -0,0 +1,46 @@
+"""add bakery stats
+
+Revision ID: 5d7b2e9a41c6
+Revises: 8a4e6c1f2d93
+Create Date: 2026-10-18 10:31:12.118406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d7b2e9a41c6'
+down_revision = '8a4e6c1f2d93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('bakery_stats',
+    sa.Column('bakery_id', sa.Integer(), nullable=False),
+    sa.Column('cake_count', sa.Integer(), nullable=False),
+    sa.Column('price_sum', sa.Float(), nullable=False),
+    sa.Column('min_price', sa.Float(), nullable=False),
+    sa.Column('max_price', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('bakery_id')
+    )
+    op.create_table('bakery_flavor_stats',
+    sa.Column('bakery_id', sa.Integer(), nullable=False),
+    sa.Column('flavor', sa.String(length=50), nullable=False),
+    sa.Column('cake_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('bakery_id', 'flavor')
+    )
+    op.execute("INSERT INTO bakery_stats (bakery_id, cake_count, price_sum, min_price, max_price) "
+               "SELECT cakes_bakeries.bakery_id, count(*), sum(cake.price), min(cake.price), max(cake.price) "
+               "FROM cakes_bakeries JOIN cake ON cake.id = cakes_bakeries.cake_id "
+               "GROUP BY cakes_bakeries.bakery_id")
+    op.execute("INSERT INTO bakery_flavor_stats (bakery_id, flavor, cake_count) "
+               "SELECT cakes_bakeries.bakery_id, cake.flavor, count(*) "
+               "FROM cakes_bakeries JOIN cake ON cake.id = cakes_bakeries.cake_id "
+               "GROUP BY cakes_bakeries.bakery_id, cake.flavor")
+
+
+def downgrade():
+    op.drop_table('bakery_flavor_stats')
+    op.drop_table('bakery_stats')
@@ -0,0 +1,49 @@
+"""add cake search index
+
+Revision ID: 8a4e6c1f2d93
+Revises: 3f1c2a7d9b40
+Create Date: 2026-10-18 10:35:47.502211
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4e6c1f2d93'
+down_revision = '3f1c2a7d9b40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("CREATE VIRTUAL TABLE cake_fts USING fts5("
+                   "name, flavor, content='cake', content_rowid='id', prefix='2 3', "
+                   "tokenize='unicode61 remove_diacritics 2')")
+        op.execute("CREATE TRIGGER cake_fts_ai AFTER INSERT ON cake BEGIN "
+                   "INSERT INTO cake_fts(rowid, name, flavor) VALUES (new.id, new.name, new.flavor); END")
+        op.execute("CREATE TRIGGER cake_fts_ad AFTER DELETE ON cake BEGIN "
+                   "INSERT INTO cake_fts(cake_fts, rowid, name, flavor) "
+                   "VALUES ('delete', old.id, old.name, old.flavor); END")
+        op.execute("CREATE TRIGGER cake_fts_au AFTER UPDATE OF name, flavor ON cake BEGIN "
+                   "INSERT INTO cake_fts(cake_fts, rowid, name, flavor) "
+                   "VALUES ('delete', old.id, old.name, old.flavor); "
+                   "INSERT INTO cake_fts(rowid, name, flavor) VALUES (new.id, new.name, new.flavor); END")
+        op.execute("INSERT INTO cake_fts(cake_fts) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        op.execute("ALTER TABLE cake ADD COLUMN search_vector tsvector GENERATED ALWAYS AS "
+                   "(to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(flavor, ''))) STORED")
+        op.execute("CREATE INDEX ix_cake_search_vector ON cake USING gin (search_vector)")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for trigger in ('cake_fts_au', 'cake_fts_ad', 'cake_fts_ai'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS cake_fts')
+    elif dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_cake_search_vector')
+        op.execute('ALTER TABLE cake DROP COLUMN IF EXISTS search_vector')
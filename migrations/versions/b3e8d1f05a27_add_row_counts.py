@@ -0,0 +1,29 @@
+"""add row counts
+
+Revision ID: b3e8d1f05a27
+Revises: 5d7b2e9a41c6
+Create Date: 2026-10-18 11:02:40.615284
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e8d1f05a27'
+down_revision = '5d7b2e9a41c6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('row_count',
+    sa.Column('table_name', sa.String(length=50), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    op.execute("INSERT INTO row_count (table_name, row_count) SELECT 'cake', count(*) FROM cake")
+
+
+def downgrade():
+    op.drop_table('row_count')
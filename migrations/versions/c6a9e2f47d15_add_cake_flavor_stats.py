@@ -0,0 +1,37 @@
+"""add cake flavor stats
+
+Revision ID: c6a9e2f47d15
+Revises: f27a9c4e1b63
+Create Date: 2026-10-18 16:12:47.530918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6a9e2f47d15'
+down_revision = 'f27a9c4e1b63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cake_flavor_stats',
+    sa.Column('flavor', sa.String(length=50), nullable=False),
+    sa.Column('available', sa.Boolean(), nullable=False),
+    sa.Column('cake_count', sa.Integer(), nullable=False),
+    sa.Column('price_sum', sa.Float(), nullable=False),
+    sa.Column('min_price', sa.Float(), nullable=True),
+    sa.Column('max_price', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('flavor', 'available')
+    )
+    op.create_index('ix_cake_flavor_available_price', 'cake', ['flavor', 'available', 'price'], unique=False)
+    op.execute("INSERT INTO cake_flavor_stats (flavor, available, cake_count, price_sum, min_price, max_price) "
+               "SELECT flavor, coalesce(available, true), count(*), sum(price), min(price), max(price) "
+               "FROM cake GROUP BY flavor, coalesce(available, true)")
+
+
+def downgrade():
+    op.drop_index('ix_cake_flavor_available_price', table_name='cake')
+    op.drop_table('cake_flavor_stats')
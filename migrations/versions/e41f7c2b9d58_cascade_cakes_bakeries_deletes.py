@@ -0,0 +1,41 @@
+"""cascade cakes_bakeries deletes
+
+Revision ID: e41f7c2b9d58
+Revises: b3e8d1f05a27
+Create Date: 2026-10-18 11:24:09.381502
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e41f7c2b9d58'
+down_revision = 'b3e8d1f05a27'
+branch_labels = None
+depends_on = None
+
+# Names the unnamed SQLite foreign keys so batch mode can find them.
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+REFERENCES = (('cake_id', 'cake'), ('bakery_id', 'bakery'))
+
+
+def _fk_name(column, table):
+    if op.get_bind().dialect.name == 'postgresql':
+        return f'cakes_bakeries_{column}_fkey'
+    return f'fk_cakes_bakeries_{column}_{table}'
+
+
+def _replace_foreign_keys(ondelete):
+    with op.batch_alter_table('cakes_bakeries', naming_convention=NAMING_CONVENTION) as batch_op:
+        for column, table in REFERENCES:
+            batch_op.drop_constraint(_fk_name(column, table), type_='foreignkey')
+            batch_op.create_foreign_key(_fk_name(column, table), table, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    _replace_foreign_keys('CASCADE')
+
+
+def downgrade():
+    _replace_foreign_keys(None)
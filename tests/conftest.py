@@ -1,5 +1,6 @@
 import pytest
-from app import create_app, db as _db
+from contextlib import contextmanager
+from app import create_app, db as _db, query_log
 from app.config import TestingConfig
 from sqlalchemy import event
 from sqlalchemy.engine import Engine
@@ -40,3 +41,30 @@ def session(db):
 @pytest.fixture(scope='function')
 def client(app):
     return app.test_client()
+
+
+@pytest.fixture(scope='function')
+def count_queries(db):
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+    return counter
+
+
+@pytest.fixture(scope='function')
+def no_query_problems(app, monkeypatch):
+    """Fail the test if a request made N+1 queries."""
+    monkeypatch.setitem(app.config, 'N_PLUS_ONE_THRESHOLD', 3)
+    with query_log.capture() as reports:
+        yield reports
+    assert not reports, [f"{report['kind']} in {report['route']}: {report['statement']}" for report in reports]
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import pytest
+from app import db
+from app.config import TestingConfig
+from app.models import BakeryStats
+
+pytest.importorskip('aiosqlite')
+from app.asgi import async_database_uri, create_asgi_app  # noqa: E402
+
+
+@pytest.fixture
+def asgi(tmp_path):
+    class AsyncTestingConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path}/async.db'
+
+    application = create_asgi_app(AsyncTestingConfig)
+
+    async def setup():
+        async with application.engine.begin() as conn:
+            await conn.run_sync(db.metadata.create_all)
+
+    asyncio.run(setup())
+    yield application
+    asyncio.run(application.engine.dispose())
+
+
+def request(application, method, path, body=None):
+    path, _, query_string = path.partition('?')
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query_string.encode()}
+    messages = [{'type': 'http.request', 'body': json.dumps(body).encode() if body is not None else b''}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    return sent[0]['status'], json.loads(sent[1]['body'])
+
+
+async def _bakery_stats(application, bakery_id):
+    async with application.sessions() as session:
+        stats = await session.get(BakeryStats, bakery_id)
+        return stats.cake_count, stats.price_sum
+
+
+def test_async_database_uri():
+    assert str(async_database_uri('sqlite:///cakes.db')) == 'sqlite+aiosqlite:///cakes.db'
+    assert async_database_uri('postgresql://u@h/db').drivername == 'postgresql+asyncpg'
+
+
+def test_cake_crud(asgi):
+    status, cake = request(asgi, 'POST', '/api/v1/cakes', {'name': 'Async Cake', 'flavor': 'Yuzu', 'price': 4.5})
+    assert status == 201
+    assert cake['name'] == 'Async Cake'
+
+    status, updated = request(asgi, 'PUT', f"/api/v1/cakes/{cake['id']}", {'price': 5.5})
+    assert status == 200
+    assert updated == dict(cake, price=5.5)
+    assert request(asgi, 'GET', f"/api/v1/cakes/{cake['id']}") == (200, updated)
+
+    assert request(asgi, 'DELETE', f"/api/v1/cakes/{cake['id']}")[0] == 200
+    assert request(asgi, 'GET', f"/api/v1/cakes/{cake['id']}") == (404, {'error': 'Resource not found'})
+
+
+def test_validation_is_shared_with_schemas(asgi):
+    status, errors = request(asgi, 'POST', '/api/v1/cakes', {'flavor': 'Yuzu', 'price': -1})
+    assert status == 422
+    assert set(errors) == {'name', 'price'}
+    assert request(asgi, 'POST', '/api/v1/bakeries', {}) == (400, {'error': 'No input data provided'})
+
+
+def test_unexpected_errors_are_logged(asgi, caplog, monkeypatch):
+    async def fail(session, cake_id):
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(asgi, '_linked_bakeries', fail)
+    status, payload = request(asgi, 'DELETE', '/api/v1/cakes/1')
+    assert (status, payload) == (500, {'error': 'An unexpected error occurred'})
+    record = caplog.records[-1]
+    assert record.name == 'app'
+    assert record.getMessage() == 'Server Error: DELETE /api/v1/cakes/1'
+    assert record.exc_info[1].args == ('boom',)
+
+
+def test_bakery_cakes_filters_and_pagination(asgi):
+    _, bakery = request(asgi, 'POST', '/api/v1/bakeries', {'name': 'Async Bakery', 'location': '1 Loop St', 'rating': 4})
+    for i in range(3):
+        _, cake = request(asgi, 'POST', '/api/v1/cakes', {'name': f'Cake {i}', 'flavor': 'Yuzu', 'price': float(i)})
+        assert request(asgi, 'POST', f"/api/v1/cakes/{cake['id']}/bakeries/{bakery['id']}")[0] == 200
+
+    status, cakes = request(asgi, 'GET', f"/api/v1/bakeries/{bakery['id']}/cakes?max_price=1")
+    assert status == 200
+    assert [cake['name'] for cake in cakes] == ['Cake 0', 'Cake 1']
+
+    _, page = request(asgi, 'GET', '/api/v1/cakes?flavor=yuzu&page=2&limit=2')
+    assert page['total_items'] == 3
+    assert page['total_pages'] == 2
+    assert [cake['name'] for cake in page['cakes']] == ['Cake 2']
+
+    request(asgi, 'DELETE', f"/api/v1/cakes/{cake['id']}/bakeries/{bakery['id']}")
+    assert len(request(asgi, 'GET', f"/api/v1/bakeries/{bakery['id']}/cakes")[1]) == 2
+    assert asyncio.run(_bakery_stats(asgi, bakery['id'])) == (2, 1.0)
+    assert request(asgi, 'GET', '/api/v1/bakeries/999/cakes')[0] == 404
@@ -73,3 +73,22 @@ def test_create_bakery_missing_fields(client):
     errors = response.get_json()
     assert 'location' in errors
     assert 'rating' in errors
+
+def test_update_and_delete_bakery_without_loading_it(client, db, count_queries):
+    bakery = Bakery(name='Direct Write Bakery', location='6 Batch St', rating=2)
+    db.session.add(bakery)
+    db.session.commit()
+    bakery_id = bakery.id
+
+    with count_queries() as statements:
+        response = client.put(f'/api/v1/bakeries/{bakery_id}', json={'rating': 5})
+    assert response.get_json()['rating'] == 5
+    assert len(statements) == 2
+
+    with count_queries() as statements:
+        assert client.delete(f'/api/v1/bakeries/{bakery_id}').status_code == 200
+    # The DELETE (links cascade), the stats refresh and the version bump.
+    assert len(statements) == 6
+
+    assert client.put(f'/api/v1/bakeries/{bakery_id}', json={'rating': 1}).status_code == 404
+    assert client.delete(f'/api/v1/bakeries/{bakery_id}').status_code == 404
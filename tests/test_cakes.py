@@ -133,3 +133,30 @@ def test_get_cakes_with_price_filter(client, db):
     result = response.get_json()
     assert len(result) == 1
     assert result[0]['price'] == 1.0
+
+
+def test_update_and_delete_cake_without_loading_it(client, db, count_queries):
+    cake = Cake(name='Direct Write Cake', flavor='Medlar', price=9.0)
+    bakery = Bakery(name='Direct Write Bakery', location='5 Batch St', rating=4)
+    cake.bakeries.append(bakery)
+    db.session.add(cake)
+    db.session.commit()
+    cake_id, bakery_id = cake.id, bakery.id
+
+    with count_queries() as statements:
+        response = client.put(f'/api/v1/cakes/{cake_id}', json={'name': 'Renamed Direct Cake'})
+    assert response.get_json()['name'] == 'Renamed Direct Cake'
+    # UPDATE ... RETURNING and the version bump; a rename doesn't touch the bakery stats.
+    assert len(statements) == 2
+
+    with count_queries() as statements:
+        response = client.delete(f'/api/v1/cakes/{cake_id}')
+    assert response.status_code == 200
+    # The cake's flavor and bakeries, the DELETE, the row count, the bakery's and the flavor's
+    # stats refresh and the version bump.
+    assert len(statements) == 10
+    assert not any(statement.startswith('DELETE FROM cakes_bakeries') for statement in statements)
+    assert db.session.get(Bakery, bakery_id).cakes == []
+
+    assert client.put(f'/api/v1/cakes/{cake_id}', json={'price': 1.0}).status_code == 404
+    assert client.delete(f'/api/v1/cakes/{cake_id}').status_code == 404
@@ -0,0 +1,121 @@
+from app.models import Cake, Bakery
+
+
+def test_create_cakes_batch(client, db, count_queries):
+    data = [
+        {'name': f'Batch Cake {i}', 'flavor': 'Batch', 'price': 10.0 + i}
+        for i in range(3)
+    ]
+    with count_queries() as statements:
+        response = client.post('/api/v1/cakes:batch', json=data)
+    assert response.status_code == 201
+    results = response.get_json()['results']
+    assert [result['status'] for result in results] == [201, 201, 201]
+    assert [db.session.get(Cake, result['id']).name for result in results] == [item['name'] for item in data]
+    assert db.session.get(Cake, results[0]['id']).available is True
+    assert len({statement for statement in statements if statement.startswith('INSERT INTO cake ')}) == 1
+    assert not any(statement.startswith('SELECT') for statement in statements)
+
+
+def test_create_cakes_batch_validation_is_atomic(client, db):
+    data = [
+        {'name': 'Valid Batch Cake', 'flavor': 'Atomic', 'price': 1.0},
+        {'name': 'Invalid Batch Cake', 'flavor': 'Atomic', 'price': -1.0},
+    ]
+    response = client.post('/api/v1/cakes:batch', json=data)
+    assert response.status_code == 422
+    assert response.get_json()['1']['price'] == ['Price must be a positive number.']
+    assert Cake.query.filter_by(flavor='Atomic').count() == 0
+
+
+def test_create_batch_requires_list(client):
+    response = client.post('/api/v1/cakes:batch', json={'name': 'Not a list'})
+    assert response.status_code == 400
+
+
+def test_create_batch_size_limit(client, app, monkeypatch):
+    monkeypatch.setitem(app.config, 'BATCH_MAX_ITEMS', 1)
+    data = [{'name': 'A', 'flavor': 'B', 'price': 1.0}] * 2
+    response = client.post('/api/v1/cakes:batch', json=data)
+    assert response.status_code == 400
+
+
+def test_update_cakes_batch(client, db):
+    cakes = [Cake(name=f'Update Batch Cake {i}', flavor='Vanilla', price=5.0) for i in range(2)]
+    db.session.add_all(cakes)
+    db.session.commit()
+
+    data = [
+        {'id': cakes[0].id, 'price': 7.5},
+        {'id': cakes[1].id, 'flavor': 'Chocolate'},
+        {'id': 999999, 'price': 1.0},
+    ]
+    response = client.put('/api/v1/cakes:batch', json=data)
+    assert response.status_code == 200
+    assert [result['status'] for result in response.get_json()['results']] == [200, 200, 404]
+    assert db.session.get(Cake, cakes[0].id).price == 7.5
+    assert db.session.get(Cake, cakes[1].id).flavor == 'Chocolate'
+    assert db.session.get(Cake, cakes[1].id).price == 5.0
+
+
+def test_update_batch_requires_ids(client):
+    response = client.put('/api/v1/cakes:batch', json=[{'price': 1.0}])
+    assert response.status_code == 422
+    assert 'id' in response.get_json()['0']
+
+
+def test_delete_cakes_batch(client, db, count_queries):
+    cake = Cake(name='Delete Batch Cake', flavor='Vanilla', price=5.0)
+    bakery = Bakery(name='Delete Batch Bakery', location='1 Bulk St', rating=3)
+    cake.bakeries.append(bakery)
+    db.session.add(cake)
+    db.session.commit()
+
+    with count_queries() as statements:
+        response = client.delete('/api/v1/cakes:batch', json=[cake.id, 999999])
+    assert response.status_code == 200
+    assert [result['status'] for result in response.get_json()['results']] == [200, 404]
+    assert db.session.get(Cake, cake.id) is None
+    # The links go with ON DELETE CASCADE.
+    assert not any(statement.startswith('DELETE FROM cakes_bakeries') for statement in statements)
+    assert db.session.get(Bakery, bakery.id).cakes == []
+
+
+def test_bakeries_batch(client, db):
+    data = [{'name': f'Batch Bakery {i}', 'location': 'Bulk Ave', 'rating': 4} for i in range(2)]
+    response = client.post('/api/v1/bakeries:batch', json=data)
+    assert response.status_code == 201
+    ids = [result['id'] for result in response.get_json()['results']]
+
+    response = client.put('/api/v1/bakeries:batch', json=[{'id': ids[0], 'rating': 6}])
+    assert response.status_code == 422
+
+    response = client.put('/api/v1/bakeries:batch', json=[{'id': ids[0], 'rating': 2}])
+    assert db.session.get(Bakery, ids[0]).rating == 2
+
+    response = client.delete('/api/v1/bakeries:batch', json=ids)
+    assert [result['status'] for result in response.get_json()['results']] == [200, 200]
+
+
+def test_link_and_unlink_batch(client, db):
+    cake = Cake(name='Link Batch Cake', flavor='Vanilla', price=5.0)
+    bakeries = [Bakery(name=f'Link Batch Bakery {i}', location='Bulk Ave', rating=4) for i in range(3)]
+    cake.bakeries.append(bakeries[0])
+    db.session.add_all([cake] + bakeries)
+    db.session.commit()
+
+    data = [{'cake_id': cake.id, 'bakery_id': bakery.id} for bakery in bakeries]
+    data.append({'cake_id': cake.id, 'bakery_id': 999999})
+    response = client.post('/api/v1/cakes/bakeries:batch', json=data)
+    assert response.status_code == 200
+    assert [result['status'] for result in response.get_json()['results']] == [200, 200, 200, 404]
+    assert sorted(b.id for b in db.session.get(Cake, cake.id).bakeries) == sorted(b.id for b in bakeries)
+
+    response = client.delete('/api/v1/cakes/bakeries:batch', json=data[:2])
+    assert response.status_code == 200
+    assert [b.id for b in db.session.get(Cake, cake.id).bakeries] == [bakeries[2].id]
+
+
+def test_link_batch_validation(client):
+    response = client.post('/api/v1/cakes/bakeries:batch', json=[{'cake_id': 'one'}])
+    assert response.status_code == 422
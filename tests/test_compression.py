@@ -0,0 +1,49 @@
+import gzip
+import json
+from app.models import Cake
+
+
+def _add_cakes(db):
+    if not Cake.query.filter_by(flavor='Squashberry').first():
+        db.session.add_all(Cake(name=f'Squash Cake {i}', flavor='Squashberry', price=float(i)) for i in range(30))
+        db.session.commit()
+
+
+def test_gzip_when_accepted(client, db):
+    _add_cakes(db)
+    plain = client.get('/api/v1/cakes?flavor=Squashberry')
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+
+    response = client.get('/api/v1/cakes?flavor=Squashberry', headers={'Accept-Encoding': 'br;q=0.5, gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert int(response.headers['Content-Length']) < len(plain.data)
+    assert gzip.decompress(response.data) == plain.data
+
+
+def test_compressed_etag_is_weak_and_revalidates(client, db):
+    _add_cakes(db)
+    response = client.get('/api/v1/cakes?flavor=Squashberry', headers={'Accept-Encoding': 'gzip'})
+    etag = response.headers['ETag']
+    assert etag.startswith('W/')
+
+    response = client.get('/api/v1/cakes?flavor=Squashberry',
+                          headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert response.status_code == 304
+
+
+def test_small_and_streamed_responses_are_not_compressed(client, db):
+    _add_cakes(db)
+    response = client.get('/api/v1/cakes/1', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+
+    response = client.get('/api/v1/cakes?flavor=Squashberry&stream=1', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert len([json.loads(line) for line in response.get_data(as_text=True).splitlines()]) == 30
+
+
+def test_threshold_is_configurable(client, app, db, monkeypatch):
+    _add_cakes(db)
+    monkeypatch.setitem(app.config, 'COMPRESS_MIN_SIZE', 10 ** 9)
+    response = client.get('/api/v1/cakes?flavor=Squashberry', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
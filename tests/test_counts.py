@@ -0,0 +1,75 @@
+from sqlalchemy import func, select
+from app.models import Cake
+from app.stats import rebuild_row_counts, row_count
+
+
+def _cake(client, flavor, price=4.0):
+    response = client.post('/api/v1/cakes', json={'name': f'{flavor} Cake', 'flavor': flavor, 'price': price})
+    assert response.status_code == 201
+    return response.get_json()
+
+
+def _actual(db):
+    return db.session.scalar(select(func.count()).select_from(Cake))
+
+
+def test_cake_count_follows_every_write_path(client, db):
+    db.session.add(Cake(name='Session Counted Cake', flavor='Tallyfruit', price=3.0))
+    db.session.commit()
+    cake = _cake(client, 'Tallyfruit')
+    created = client.post('/api/v1/cakes:batch', json=[
+        {'name': f'Batch Counted {i}', 'flavor': 'Tallyfruit', 'price': 2.0} for i in range(3)
+    ]).get_json()['results']
+    assert row_count('cake') == _actual(db)
+
+    client.delete(f"/api/v1/cakes/{cake['id']}")
+    client.delete('/api/v1/cakes:batch', json=[result['id'] for result in created[:2]])
+    assert row_count('cake') == _actual(db)
+
+    rebuild_row_counts()
+    assert row_count('cake') == _actual(db)
+
+
+def test_unfiltered_page_reads_the_counter(client, db, count_queries):
+    _cake(client, 'Tallyfruit')
+    with count_queries() as statements:
+        result = client.get('/api/v1/cakes?page=1&limit=2').get_json()
+    assert result['total_items'] == _actual(db)
+    assert not any('count(' in statement.lower() for statement in statements)
+
+
+def test_bakery_page_reads_the_bakery_stats(client, count_queries):
+    bakery = client.post('/api/v1/bakeries', json={'name': 'Tally Bakery', 'location': 'Here', 'rating': 4}).get_json()
+    for _ in range(3):
+        cake = _cake(client, 'Tallyfruit')
+        client.post(f"/api/v1/cakes/{cake['id']}/bakeries/{bakery['id']}")
+
+    with count_queries() as statements:
+        result = client.get(f"/api/v1/bakeries/{bakery['id']}/cakes?page=1&limit=2").get_json()
+    assert result['total_items'] == 3
+    assert result['total_pages'] == 2
+    assert not any('count(' in statement.lower() for statement in statements)
+
+
+def test_count_none_and_invalid_mode(client):
+    _cake(client, 'Tallyfruit')
+    result = client.get('/api/v1/cakes?page=1&limit=2&count=none').get_json()
+    assert 'total_items' not in result
+    assert 'total_pages' not in result
+
+    response = client.get('/api/v1/cakes?page=1&limit=2&count=sometimes')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'count must be one of: exact, estimate, none'
+
+
+def test_filtered_counts_are_cached(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'COUNT_CACHE_TTL', 30)
+    _cake(client, 'Countcachefruit')
+    url = '/api/v1/cakes?flavor=Countcachefruit&page=1&limit=1'
+    assert client.get(url).get_json()['total_items'] == 1
+    assert client.get(url + '&count=estimate').get_json()['total_items'] == 1
+
+    _cake(client, 'Countcachefruit')
+    # Exact counts are keyed on the table versions the write bumped; estimates wait for the TTL.
+    assert client.get(url).get_json()['total_items'] == 2
+    assert client.get(url + '&count=estimate').get_json()['total_items'] == 1
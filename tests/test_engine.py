@@ -0,0 +1,25 @@
+from sqlalchemy import text
+from app import create_app, db
+from app.config import ProductionConfig, TestingConfig
+
+
+def test_sqlite_pragmas_are_applied(tmp_path):
+    class SQLiteProductionConfig(ProductionConfig):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(tmp_path / 'production.db')
+
+    app = create_app(SQLiteProductionConfig)
+    with app.app_context():
+        pragma = lambda name: db.session.execute(text(f'PRAGMA {name}')).scalar()
+        assert pragma('journal_mode') == 'wal'
+        assert pragma('synchronous') == 1
+        assert pragma('busy_timeout') == 5000
+        assert pragma('mmap_size') == 256 * 1024 * 1024
+        assert db.engine.pool.size() == 10
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_no_pragmas_by_default(app):
+    assert TestingConfig.SQLITE_PRAGMAS == {}
+    assert db.session.execute(text('PRAGMA synchronous')).scalar() == 2
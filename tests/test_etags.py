@@ -0,0 +1,83 @@
+from sqlalchemy import update
+from app.models import Cake, Bakery, TableVersion
+from app.versions import bump_versions
+
+def test_list_has_etag_and_304(client, count_queries):
+    response = client.get('/api/v1/cakes?flavor=Etagberry')
+    etag = response.headers['ETag']
+    assert response.status_code == 200
+
+    with count_queries() as statements:
+        response = client.get('/api/v1/cakes?flavor=Etagberry', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert response.headers['ETag'] == etag
+    assert len(statements) == 1
+    assert 'table_version' in statements[0]
+
+
+def test_write_changes_etag(client):
+    etag = client.get('/api/v1/cakes?flavor=Etagberry').headers['ETag']
+    client.post('/api/v1/cakes', json={'name': 'Etag Cake', 'flavor': 'Etagberry', 'price': 2.0})
+    response = client.get('/api/v1/cakes?flavor=Etagberry', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_bakery_cakes_etag_follows_links(client, db):
+    cake = Cake(name='Etag Link Cake', flavor='Vanilla', price=3.0)
+    bakery = Bakery(name='Etag Bakery', location='1 Tag St', rating=4)
+    db.session.add_all([cake, bakery])
+    db.session.commit()
+    path = f'/api/v1/bakeries/{bakery.id}/cakes'
+
+    etag = client.get(path).headers['ETag']
+    assert client.get(path, headers={'If-None-Match': etag}).status_code == 304
+
+    before = db.session.get(TableVersion, 'cakes_bakeries').version
+    client.post(f'/api/v1/cakes/{cake.id}/bakeries/{bakery.id}')
+    db.session.expire_all()
+    assert db.session.get(TableVersion, 'cakes_bakeries').version == before + 1
+    assert client.get(path, headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_bakery_write_keeps_cake_etag(client):
+    etag = client.get('/api/v1/cakes?flavor=Stableberry').headers['ETag']
+    client.post('/api/v1/bakeries', json={'name': 'Etag Neighbour', 'location': '2 Tag St', 'rating': 3})
+    assert client.get('/api/v1/cakes?flavor=Stableberry', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_etag_depends_on_query_args(client):
+    first = client.get('/api/v1/cakes?flavor=A').headers['ETag']
+    second = client.get('/api/v1/cakes?flavor=B').headers['ETag']
+    assert first != second
+
+
+def test_not_found_has_no_etag(client):
+    response = client.get('/api/v1/cakes/999999')
+    assert response.status_code == 404
+    assert 'ETag' not in response.headers
+
+
+def test_cached_body_is_served_under_its_own_etag(app, client, db, count_queries, monkeypatch):
+    monkeypatch.setitem(app.config, 'CACHE_ENABLED', True)
+    cake = Cake(name='Etag Cached Cake', flavor='Vanilla', price=3.0)
+    db.session.add(cake)
+    db.session.commit()
+    path = f'/api/v1/cakes/{cake.id}'
+    client.get(path)
+    etag = client.get(path).headers['ETag']
+    with count_queries() as statements:
+        response = client.get(path)
+    assert response.headers['X-Cache'] == 'HIT'
+    assert response.headers['ETag'] == etag
+    # The cache reuses the versions read for the ETag.
+    assert len(statements) == 1
+
+    db.session.execute(update(Cake).where(Cake.id == cake.id).values(price=8.0))
+    bump_versions(['cake'])
+    db.session.commit()
+    response = client.get(path, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.get_json()['price'] == 8.0
@@ -0,0 +1,89 @@
+import hashlib
+import time
+import pytest
+from app import idempotency
+from app.models import Cake, IdempotencyKey
+
+
+def _post(client, key, price=5.0):
+    return client.post('/api/v1/cakes', json={'name': 'Retried Cake', 'flavor': 'Sorbapple', 'price': price},
+                       headers={'Idempotency-Key': key})
+
+
+def _created(db):
+    return Cake.query.filter_by(flavor='Sorbapple').count()
+
+
+def test_retry_replays_without_writing_again(client, db):
+    before = _created(db)
+    first = _post(client, 'retry-1')
+    assert first.status_code == 201
+    assert 'Idempotent-Replayed' not in first.headers
+
+    retry = _post(client, 'retry-1')
+    assert retry.status_code == 201
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert retry.get_json() == first.get_json()
+
+    # Without the front cache the stored row answers.
+    idempotency.cache.clear()
+    assert _post(client, 'retry-1').get_json() == first.get_json()
+    assert _created(db) == before + 1
+
+    assert _post(client, 'retry-2').get_json()['id'] != first.get_json()['id']
+    assert _created(db) == before + 2
+
+
+def test_key_reused_for_a_different_request(client):
+    _post(client, 'reused-1')
+    response = _post(client, 'reused-1', price=6.0)
+    assert response.status_code == 422
+    assert 'different request' in response.get_json()['error']
+
+
+def test_validation_errors_are_replayed(client):
+    response = client.put('/api/v1/bakeries/1', json={'rating': 9}, headers={'Idempotency-Key': 'invalid-1'})
+    assert response.status_code == 422
+    retry = client.put('/api/v1/bakeries/1', json={'rating': 9}, headers={'Idempotency-Key': 'invalid-1'})
+    assert retry.status_code == 422
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+
+
+def test_in_progress_and_expired_keys(client, db):
+    body = b'{"name": "Retried Cake", "flavor": "Sorbapple", "price": 5.0}'
+    fingerprint = hashlib.sha256(b'POST /api/v1/cakes\n' + body).hexdigest()
+    db.session.add(IdempotencyKey(key='pending-1', fingerprint=fingerprint, expires_at=time.time() + 60))
+    db.session.commit()
+    response = client.post('/api/v1/cakes', data=body, content_type='application/json',
+                           headers={'Idempotency-Key': 'pending-1'})
+    assert response.status_code == 409
+    assert response.headers['Retry-After'] == '1'
+
+    db.session.add(IdempotencyKey(key='expired-1', fingerprint='x', status=201, body=b'{}',
+                                  mimetype='application/json', expires_at=time.time() - 1))
+    db.session.commit()
+    response = _post(client, 'expired-1')
+    assert response.status_code == 201
+    assert 'Idempotent-Replayed' not in response.headers
+    assert db.session.get(IdempotencyKey, 'expired-1').status == 201
+
+
+def test_claims_lapse_and_failed_stores_release_the_key(app, client, db, monkeypatch):
+    assert idempotency._claim('lease-1', 'x')
+    expires_at = db.session.get(IdempotencyKey, 'lease-1').expires_at
+    assert expires_at <= time.time() + app.config['IDEMPOTENCY_LOCK_TIMEOUT']
+
+    def fail(*args):
+        raise RuntimeError('store failed')
+
+    monkeypatch.setattr(idempotency, '_store', fail)
+    with pytest.raises(RuntimeError):
+        idempotency._run(lambda: ('', 204), {}, 'lease-1', 'x')
+    assert db.session.get(IdempotencyKey, 'lease-1') is None
+
+    # A claim left behind by a dead worker stops blocking once its lease is up.
+    db.session.add(IdempotencyKey(key='lease-2', fingerprint='x', expires_at=time.time() - 1))
+    db.session.commit()
+    monkeypatch.undo()
+    assert _post(client, 'lease-2').status_code == 201
+    assert db.session.get(IdempotencyKey, 'lease-2').expires_at > time.time() + app.config['IDEMPOTENCY_LOCK_TIMEOUT']
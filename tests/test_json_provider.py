@@ -0,0 +1,24 @@
+import decimal
+import pytest
+from flask.json.provider import DefaultJSONProvider
+from app.json_provider import json_provider_class
+
+orjson = pytest.importorskip('orjson')
+from app.json_provider import OrjsonProvider  # noqa: E402
+
+DATA = {'b': [1, 2.5, None, True], 'a': {'price': decimal.Decimal('1.10'), 'name': 'Cake'}, 'c': 10.0}
+
+
+def test_auto_prefers_orjson(app):
+    assert json_provider_class('auto') is OrjsonProvider
+    assert json_provider_class('default') is DefaultJSONProvider
+    assert isinstance(app.json, OrjsonProvider)
+
+
+def test_matches_default_provider_output(app):
+    default = DefaultJSONProvider(app)
+    fast = OrjsonProvider(app)
+    with app.test_request_context():
+        assert fast.response(DATA).get_data() == default.response(DATA).get_data()
+    assert fast.loads(fast.dumps(DATA)) == default.loads(default.dumps(DATA))
+    assert fast.dumps(DATA, indent=2) == default.dumps(DATA, indent=2)
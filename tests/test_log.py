@@ -0,0 +1,75 @@
+import json
+import logging
+import time
+from flask import Flask
+from app.config import Config
+from app.log import DroppingQueueHandler, init_logging
+
+
+def _logging_app(tmp_path, **config):
+    app = Flask('logging_test')
+    app.config.from_object(Config)
+    app.config.update(LOG_DIR=str(tmp_path), **config)
+    app.logger.setLevel(logging.INFO)
+
+    @app.route('/boom')
+    def boom():
+        app.logger.info('handling boom')
+        return 'ok'
+
+    return app
+
+
+def test_json_records_carry_request_id_and_latency(tmp_path):
+    app = _logging_app(tmp_path, LOG_QUEUE=False, LOG_REQUESTS=True)
+    handler = init_logging(app)
+    try:
+        response = app.test_client().get('/boom', headers={'X-Request-ID': 'abc123'})
+        assert response.headers['X-Request-ID'] == 'abc123'
+    finally:
+        app.logger.removeHandler(handler)
+        handler.close()
+
+    records = [json.loads(line) for line in (tmp_path / 'cake_catalog.log').read_text().splitlines()]
+    assert [record['message'] for record in records] == ['handling boom', 'GET /boom 200']
+    assert all(record['request_id'] == 'abc123' and record['path'] == '/boom' for record in records)
+    assert records[1]['status'] == 200
+    assert records[1]['latency_ms'] >= 0
+
+
+def test_queue_writes_from_listener_thread(tmp_path):
+    app = _logging_app(tmp_path)
+    handler = init_logging(app)
+    try:
+        with app.test_request_context('/'):
+            try:
+                raise ValueError('bad')
+            except ValueError:
+                app.logger.exception('failed %s', 'here')
+    finally:
+        app.logger.removeHandler(handler)
+        app.extensions['log_queue'].queue.put(None)  # sentinel: the listener drains and exits
+    for _ in range(100):
+        lines = (tmp_path / 'cake_catalog.log').read_text().splitlines()
+        if lines:
+            break
+        time.sleep(0.01)
+
+    [record] = [json.loads(line) for line in lines]
+    assert record['message'] == 'failed here'
+    assert 'ValueError: bad' in record['exc_info']
+
+
+def test_full_queue_drops_and_counts():
+    handler = DroppingQueueHandler(maxsize=1)
+    logger = logging.getLogger('dropping_test')
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        logger.warning('first')
+        logger.warning('second')
+    finally:
+        logger.removeHandler(handler)
+
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
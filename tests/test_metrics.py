@@ -0,0 +1,46 @@
+import copy
+import re
+import pytest
+from sqlalchemy.exc import OperationalError
+from app.models import Cake, Bakery
+
+
+def _timings(response):
+    return {name: (float(dur), desc) for name, dur, desc in
+            re.findall(r'(\w+);dur=([\d.]+)(?:;desc="([^"]*)")?', response.headers['Server-Timing'])}
+
+
+def test_server_timing_header(client, db):
+    bakery = Bakery(name='Timing Bakery', location='1 Clock St', rating=4)
+    bakery.cakes.append(Cake(name='Timing Cake', flavor='Timing', price=5.0))
+    db.session.add(bakery)
+    db.session.commit()
+
+    response = client.get(f'/api/v1/bakeries/{bakery.id}/cakes')
+    assert response.status_code == 200
+    timings = _timings(response)
+    assert set(timings) == {'db', 'serialize', 'json', 'total'}
+    assert re.fullmatch(r'[1-9]\d* queries', timings['db'][1])
+    assert timings['total'][0] >= timings['db'][0]
+
+
+def test_metrics_endpoint_aggregates_per_endpoint(client):
+    client.get('/api/v1/bakeries')
+    client.get('/api/v1/bakeries/999999')
+
+    body = client.get('/metrics').get_data(as_text=True)
+    assert re.search(r'catalog_requests_total\{method="GET",endpoint="api.get_bakeries",status="200"\} [1-9]', body)
+    assert 'catalog_requests_total{method="GET",endpoint="api.get_bakery",status="404"}' in body
+    assert 'catalog_request_queries_bucket{method="GET",endpoint="api.get_bakeries",le="+Inf"}' in body
+    assert 'catalog_response_size_bytes_sum{method="GET",endpoint="api.get_bakeries"}' in body
+    assert 'endpoint="metrics"' not in body
+
+
+def test_failed_statements_leave_no_timing_state(db):
+    with db.engine.connect() as conn:
+        conn.exec_driver_sql('SELECT 1')
+        before = copy.deepcopy(conn.info)
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.exec_driver_sql('SELECT * FROM no_such_table')
+        assert conn.info == before
@@ -0,0 +1,78 @@
+import pytest
+from app.models import Cake, Bakery
+from app.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(42)) == 42
+    assert decode_cursor('') is None
+
+
+def test_decode_invalid_cursor():
+    with pytest.raises(InvalidCursor):
+        decode_cursor('not-a-cursor')
+
+
+def test_get_cakes_with_cursor(client, db):
+    for i in range(5):
+        db.session.add(Cake(name=f'Cursor Cake {i}', flavor='Cursorberry', price=5.0 + i))
+    db.session.commit()
+
+    response = client.get('/api/v1/cakes?flavor=Cursorberry&cursor=&limit=2')
+    assert response.status_code == 200
+    result = response.get_json()
+    assert [cake['name'] for cake in result['cakes']] == ['Cursor Cake 0', 'Cursor Cake 1']
+    assert result['next_cursor'] is not None
+    assert 'total_items' not in result
+
+    seen = [cake['name'] for cake in result['cakes']]
+    while result['next_cursor']:
+        response = client.get(f"/api/v1/cakes?flavor=Cursorberry&cursor={result['next_cursor']}&limit=2")
+        assert response.status_code == 200
+        result = response.get_json()
+        seen.extend(cake['name'] for cake in result['cakes'])
+    assert seen == [f'Cursor Cake {i}' for i in range(5)]
+
+
+def test_get_cakes_with_cursor_and_count(client, db):
+    for i in range(3):
+        db.session.add(Cake(name=f'Counted Cake {i}', flavor='Countberry', price=5.0))
+    db.session.commit()
+
+    response = client.get('/api/v1/cakes?flavor=Countberry&cursor=&limit=2&count=exact')
+    assert response.status_code == 200
+    assert response.get_json()['total_items'] == 3
+
+
+def test_get_cakes_with_invalid_cursor(client):
+    response = client.get('/api/v1/cakes?cursor=garbage')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid cursor'
+
+
+def test_get_cakes_with_cursor_invalid_limit(client):
+    response = client.get('/api/v1/cakes?cursor=&limit=0')
+    assert response.status_code == 400
+
+
+def test_get_cakes_by_bakery_with_cursor(client, db):
+    bakery = Bakery(name='Cursor Bakery', location='1 Seek St', rating=4)
+    other = Bakery(name='Other Bakery', location='2 Seek St', rating=3)
+    for i in range(3):
+        cake = Cake(name=f'Bakery Cursor Cake {i}', flavor='Seek', price=9.0)
+        cake.bakeries.append(bakery)
+        db.session.add(cake)
+    stray = Cake(name='Stray Cake', flavor='Seek', price=9.0)
+    stray.bakeries.append(other)
+    db.session.add(stray)
+    db.session.commit()
+
+    response = client.get(f'/api/v1/bakeries/{bakery.id}/cakes?cursor=&limit=2')
+    assert response.status_code == 200
+    first = response.get_json()
+    assert len(first['cakes']) == 2
+
+    response = client.get(f"/api/v1/bakeries/{bakery.id}/cakes?cursor={first['next_cursor']}&limit=2")
+    second = response.get_json()
+    assert [cake['name'] for cake in second['cakes']] == ['Bakery Cursor Cake 2']
+    assert second['next_cursor'] is None
@@ -0,0 +1,52 @@
+from flask import Response
+from app import query_log
+from app.models import Cake, Bakery
+from app.querylog import normalize
+
+
+def test_normalize_collapses_literals_and_in_lists():
+    assert normalize("SELECT * FROM cake WHERE id IN (?, ?, ?) AND name = 'x'\n  LIMIT 10") == \
+        'SELECT * FROM cake WHERE id IN (?) AND name = ? LIMIT ?'
+    assert normalize('SELECT * FROM cake WHERE id = %(id_1)s') == normalize('SELECT * FROM cake WHERE id = ?')
+
+
+def test_detects_n_plus_one(app, db, monkeypatch):
+    monkeypatch.setitem(app.config, 'N_PLUS_ONE_THRESHOLD', 2)
+    for i in range(3):
+        cake = Cake(name=f'Lazy Cake {i}', flavor='Lazyberry', price=1.0)
+        cake.bakeries.append(Bakery(name=f'Lazy Bakery {i}', location='1 Lazy St', rating=3))
+        db.session.add(cake)
+    db.session.commit()
+    db.session.expire_all()
+
+    with query_log.capture() as reports, app.test_request_context('/api/v1/cakes?flavor=Lazyberry'):
+        query_log.start()
+        for cake in Cake.query.filter_by(flavor='Lazyberry'):
+            cake.bakeries  # lazy load per cake
+        query_log.finish(Response())
+
+    [report] = reports
+    assert report['kind'] == 'n+1'
+    assert report['count'] == 3
+    assert 'cakes_bakeries' in report['statement']
+    assert report['route'] == 'GET /api/v1/cakes'
+    assert report['args'] == {'flavor': ['Lazyberry']}
+    assert report['plan']
+
+
+def test_logs_slow_queries_with_plan(app, client, monkeypatch, caplog):
+    monkeypatch.setitem(app.config, 'SLOW_QUERY_MS', 1e-9)
+    with query_log.capture() as reports:
+        response = client.get('/api/v1/bakeries?limit=5')
+    assert response.status_code == 200
+    assert reports and all(report['kind'] == 'slow' for report in reports)
+    bakery_query = next(report for report in reports if 'FROM bakery' in report['statement'])
+    assert bakery_query['route'] == 'GET /api/v1/bakeries'
+    assert bakery_query['plan']
+    assert 'Slow query' in caplog.text
+
+
+def test_raise_fails_the_request(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'SLOW_QUERY_MS', 1e-9)
+    monkeypatch.setitem(app.config, 'QUERY_LOG_RAISE', True)
+    assert client.get('/api/v1/bakeries').status_code == 500
@@ -0,0 +1,65 @@
+import pytest
+from app.ratelimit import LocalBuckets
+
+
+@pytest.fixture
+def limited(app, monkeypatch):
+    limiter = app.extensions['rate_limiter']
+    monkeypatch.setitem(app.config, 'RATELIMIT_ENABLED', True)
+    monkeypatch.setitem(app.config, 'RATELIMIT_CLIENT_HEADER', 'X-Client')
+    monkeypatch.setattr(limiter, 'backend', LocalBuckets())
+    return limiter
+
+
+def test_bucket_refills_over_time(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('app.ratelimit.time.monotonic', lambda: now[0])
+    buckets = LocalBuckets(max_buckets=1)
+    assert buckets.take('a', 3, rate=1, burst=3) == 0
+    assert buckets.take('a', 2, rate=1, burst=3) == 2
+    now[0] += 2
+    assert buckets.take('a', 2, rate=1, burst=3) == 0
+    # Evicting 'a' for 'b' hands 'a' a full bucket again.
+    buckets.take('b', 1, rate=1, burst=3)
+    assert buckets.take('a', 3, rate=1, burst=3) == 0
+
+
+def test_client_over_its_burst_gets_429(app, client, limited, monkeypatch):
+    monkeypatch.setitem(app.config, 'RATELIMIT_RATE', 0.5)
+    monkeypatch.setitem(app.config, 'RATELIMIT_BURST', 3)
+    headers = {'X-Client': 'burst'}
+    for _ in range(3):
+        assert client.get('/api/v1/cakes?page=1&limit=1', headers=headers).status_code == 200
+
+    response = client.get('/api/v1/bakeries/stats', headers=headers)
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '2'
+    assert response.get_json() == {'error': 'Too many requests'}
+    # Buckets are per client.
+    assert client.get('/api/v1/bakeries/stats', headers={'X-Client': 'other'}).status_code == 200
+    assert client.get('/metrics', headers=headers).status_code == 200
+
+
+def test_unpaginated_lists_cost_more(app, client, limited, monkeypatch):
+    monkeypatch.setitem(app.config, 'RATELIMIT_ENDPOINT_RATE', 0.1)
+    monkeypatch.setitem(app.config, 'RATELIMIT_ENDPOINT_BURST', 12)
+    headers = {'X-Client': 'lists'}
+    assert client.get('/api/v1/cakes', headers=headers).status_code == 200
+    assert client.get('/api/v1/cakes?page=1&limit=1', headers=headers).status_code == 200
+    assert client.get('/api/v1/cakes?page=1&limit=1', headers=headers).status_code == 200
+    assert client.get('/api/v1/cakes?page=1&limit=1', headers=headers).status_code == 429
+    # The limit is per endpoint, so the client can still read bakeries.
+    assert client.get('/api/v1/bakeries', headers=headers).status_code == 200
+
+
+def test_sheds_load_when_too_much_is_in_flight(app, client, limited, monkeypatch):
+    monkeypatch.setitem(app.config, 'LOAD_SHED_MAX_INFLIGHT', 10)
+    monkeypatch.setitem(app.config, 'LOAD_SHED_RETRY_AFTER', 3)
+    headers = {'X-Client': 'shed'}
+    monkeypatch.setattr(limited, 'inflight', 5)
+    assert client.get('/api/v1/cakes?page=1&limit=1', headers=headers).status_code == 200
+    assert limited.inflight == 5
+
+    response = client.get('/api/v1/cakes', headers=headers)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '3'
@@ -60,3 +60,127 @@ def test_remove_nonexistent_bakery_from_cake(client, db):
 
     updated_cake = Cake.query.get(cake.id)
     assert bakery not in updated_cake.bakeries
+
+
+def test_get_cakes_include_bakeries(client, db, count_queries):
+    bakeries = [Bakery(name=f'Include Bakery {i}', location='1 Batch St', rating=4) for i in range(2)]
+    for i in range(3):
+        cake = Cake(name=f'Included Cake {i}', flavor='Includeberry', price=10.0)
+        cake.bakeries.extend(bakeries)
+        db.session.add(cake)
+    db.session.commit()
+
+    with count_queries() as statements:
+        response = client.get('/api/v1/cakes?flavor=Includeberry&include=bakeries')
+    assert response.status_code == 200
+    cakes = response.get_json()
+    assert len(cakes) == 3
+    assert all(sorted(b['name'] for b in cake['bakeries']) == ['Include Bakery 0', 'Include Bakery 1']
+               for cake in cakes)
+    # The ETag version lookup, one query for the cakes and one batched
+    # SELECT ... IN for all their bakeries.
+    assert len(statements) == 3
+
+
+def test_get_cake_include_bakeries(client, db):
+    cake = Cake(name='Detail Include Cake', flavor='Lemon', price=12.0)
+    cake.bakeries.append(Bakery(name='Detail Bakery', location='2 Batch St', rating=5))
+    db.session.add(cake)
+    db.session.commit()
+
+    response = client.get(f'/api/v1/cakes/{cake.id}?include=bakeries')
+    assert response.status_code == 200
+    assert [b['name'] for b in response.get_json()['bakeries']] == ['Detail Bakery']
+
+    response = client.get(f'/api/v1/cakes/{cake.id}')
+    assert 'bakeries' not in response.get_json()
+
+
+def test_get_bakery_include_cakes(client, db, no_query_problems):
+    bakery = Bakery(name='Cake Include Bakery', location='3 Batch St', rating=3)
+    bakery.cakes.append(Cake(name='Bakery Included Cake', flavor='Lime', price=8.0))
+    db.session.add(bakery)
+    db.session.commit()
+
+    response = client.get(f'/api/v1/bakeries/{bakery.id}?include=cakes')
+    assert [c['name'] for c in response.get_json()['cakes']] == ['Bakery Included Cake']
+
+    response = client.get('/api/v1/bakeries?include=cakes')
+    assert response.status_code == 200
+    assert all('cakes' in b for b in response.get_json())
+
+
+def test_unknown_include(client):
+    response = client.get('/api/v1/cakes?include=owners')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Unknown include: owners'
+
+
+def test_add_bakery_does_not_load_collection(client, db, count_queries):
+    cake = Cake(name='Lookup Cake', flavor='Plum', price=11.0)
+    bakery = Bakery(name='Lookup Bakery', location='4 Batch St', rating=4)
+    db.session.add_all([cake, bakery])
+    db.session.commit()
+
+    with count_queries() as statements:
+        client.post(f'/api/v1/cakes/{cake.id}/bakeries/{bakery.id}')
+    # Two primary key lookups, one membership probe, the insert, the bakery's
+    # stats refresh (two deletes, two INSERT ... SELECTs) and the version bump.
+    assert len(statements) == 9
+    assert not any('FROM bakery, cakes_bakeries' in statement for statement in statements)
+    assert db.session.get(Cake, cake.id).bakeries == [bakery]
+
+
+def _chain(db, count):
+    cake = Cake(name='Chain Cake', flavor='Damson', price=6.0)
+    bakeries = [Bakery(name=f'Chain Branch {i}', location=f'{i} Chain St', rating=3) for i in range(count)]
+    db.session.add_all([cake] + bakeries)
+    db.session.commit()
+    return cake, [bakery.id for bakery in bakeries]
+
+
+def _linked_ids(db, cake):
+    db.session.expire(cake)
+    return sorted(bakery.id for bakery in cake.bakeries)
+
+
+def test_link_many_bakeries_in_constant_queries(client, db, count_queries):
+    cake, ids = _chain(db, 40)
+
+    with count_queries() as statements:
+        response = client.post(f'/api/v1/cakes/{cake.id}/bakeries', json=ids[:30])
+    assert response.status_code == 200
+    assert response.get_json() == {'cake_id': cake.id, 'added': ids[:30], 'removed': []}
+    # Cake lookup, one IN check, one INSERT, the stats refresh (four statements) and the version bump.
+    assert len(statements) == 8
+
+    response = client.post(f'/api/v1/cakes/{cake.id}/bakeries', json=ids[20:])
+    assert response.get_json()['added'] == ids[30:]
+    assert _linked_ids(db, cake) == ids
+
+
+def test_replace_and_remove_cake_bakeries(client, db):
+    cake, ids = _chain(db, 6)
+    client.post(f'/api/v1/cakes/{cake.id}/bakeries', json=ids[:4])
+
+    response = client.put(f'/api/v1/cakes/{cake.id}/bakeries', json=ids[2:])
+    assert response.get_json() == {'cake_id': cake.id, 'added': ids[4:], 'removed': ids[:2]}
+    assert _linked_ids(db, cake) == ids[2:]
+
+    response = client.delete(f'/api/v1/cakes/{cake.id}/bakeries', json=[ids[0], ids[2]])
+    assert response.get_json()['removed'] == [ids[2]]
+
+    response = client.put(f'/api/v1/cakes/{cake.id}/bakeries', json=[])
+    assert response.get_json()['removed'] == ids[3:]
+    assert _linked_ids(db, cake) == []
+
+
+def test_cake_bakeries_rejects_unknown_ids(client, db):
+    cake, ids = _chain(db, 2)
+    response = client.put(f'/api/v1/cakes/{cake.id}/bakeries', json=[ids[0], 999999])
+    assert response.status_code == 422
+    assert response.get_json() == {'bakery_ids': ['Unknown ids: 999999']}
+    assert _linked_ids(db, cake) == []
+
+    assert client.post(f'/api/v1/cakes/{cake.id}/bakeries', json={'ids': ids}).status_code == 400
+    assert client.post('/api/v1/cakes/999999/bakeries', json=ids).status_code == 404
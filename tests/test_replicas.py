@@ -0,0 +1,109 @@
+import time
+import pytest
+from app import create_app, db
+from app.config import TestingConfig
+from app.replicas import SQLiteReplicator
+
+
+@pytest.fixture
+def replicated(tmp_path):
+    primary, replica = tmp_path / 'primary.db', tmp_path / 'replica.db'
+
+    class ReplicaConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{primary}'
+        REPLICA_DATABASE_URLS = [f'sqlite:///{replica}']
+        REPLICA_LAG_CHECK_INTERVAL = 0
+        REPLICA_MAX_LAG = 60
+
+    app = create_app(ReplicaConfig)
+    with app.app_context():
+        db.create_all(bind_key=None)
+    replicator = SQLiteReplicator(str(primary), str(replica))
+    replicator.sync()
+    yield app, replicator
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+    # init_app registered an (empty) metadata for the replica bind on the shared extension.
+    db.metadatas.pop('replica0', None)
+
+
+def _create_cake(client):
+    response = client.post('/api/v1/cakes', json={'name': 'Replica Cake', 'flavor': 'Quince', 'price': 3.0})
+    assert response.status_code == 201
+    assert response.headers['X-DB-Route'] == 'primary'
+    return response.get_json()['id']
+
+
+def test_reads_go_to_replica_until_synced(replicated):
+    app, replicator = replicated
+    cake_id = _create_cake(app.test_client())
+
+    reader = app.test_client()
+    response = reader.get(f'/api/v1/cakes/{cake_id}')
+    assert response.headers['X-DB-Route'] == 'replica0'
+    assert response.status_code == 404
+
+    replicator.sync()
+    response = reader.get(f'/api/v1/cakes/{cake_id}')
+    assert response.headers['X-DB-Route'] == 'replica0'
+    assert response.get_json()['name'] == 'Replica Cake'
+
+
+def test_read_your_writes(replicated):
+    app, replicator = replicated
+    writer = app.test_client()
+    cake_id = _create_cake(writer)
+
+    response = writer.get(f'/api/v1/cakes/{cake_id}')
+    assert response.headers['X-DB-Route'] == 'primary'
+    assert response.status_code == 200
+
+    response = app.test_client().get(f'/api/v1/cakes/{cake_id}', headers={'X-Read-Consistency': 'primary'})
+    assert response.headers['X-DB-Route'] == 'primary'
+    assert response.status_code == 200
+
+
+def test_lagging_replica_falls_back_to_primary(replicated):
+    app, replicator = replicated
+    app.config['REPLICA_MAX_LAG'] = 0.05
+    cake_id = _create_cake(app.test_client())
+
+    reader = app.test_client()
+    assert reader.get(f'/api/v1/cakes/{cake_id}').headers['X-DB-Route'] == 'replica0'
+    time.sleep(0.1)
+    response = reader.get(f'/api/v1/cakes/{cake_id}')
+    assert response.headers['X-DB-Route'] == 'primary'
+    assert response.status_code == 200
+
+    replicator.sync()
+    assert reader.get(f'/api/v1/cakes/{cake_id}').headers['X-DB-Route'] == 'replica0'
+
+
+def test_replica_replicating_behind_steady_writes_keeps_serving(replicated, monkeypatch):
+    app, replicator = replicated
+    app.config['REPLICA_MAX_LAG'] = 5
+    clock = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: clock[0])
+    writer, reader = app.test_client(), app.test_client()
+    router = app.extensions['replica_router']
+
+    def lag():
+        # The suite's app context is already pushed, so push this app's own.
+        with app.app_context():
+            return router.lag('replica0')
+
+    # Every check finds the replica one write behind, but never by more than a few seconds.
+    for _ in range(5):
+        cake_id = _create_cake(writer)
+        assert reader.get(f'/api/v1/cakes/{cake_id}').headers['X-DB-Route'] == 'replica0'
+        assert lag() == 0
+        clock[0] += 2
+        replicator.sync()
+
+    _create_cake(writer)
+    reader.get('/api/v1/cakes/1')
+    clock[0] += 4
+    assert lag() == 4
+    clock[0] += 2
+    assert reader.get('/api/v1/cakes/1').headers['X-DB-Route'] == 'primary'
@@ -0,0 +1,139 @@
+import time
+import pytest
+from sqlalchemy import update
+from app.cache import LocalCache
+from app.models import Cake, Bakery
+from app.versions import bump_versions
+
+
+@pytest.fixture
+def cache_enabled(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'CACHE_ENABLED', True)
+
+
+def test_local_cache_evicts_least_recently_used():
+    cache = LocalCache(max_entries=2, default_ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+
+def test_local_cache_expires_entries():
+    cache = LocalCache(max_entries=2, default_ttl=60)
+    cache.set('a', 1, ttl=0.01)
+    cache.set('b', 2, ttl=0)
+    time.sleep(0.02)
+    assert cache.get('a') is None
+    assert cache.get('b') == 2
+
+
+def _get(client, path):
+    response = client.get(path)
+    return response.headers.get('X-Cache'), response.get_json()
+
+
+def test_cached_cake_list_is_invalidated_by_writes(client, db, cache_enabled):
+    path = '/api/v1/cakes?flavor=Cacheberry'
+    db.session.add(Cake(name='Cached Cake', flavor='Cacheberry', price=4.0))
+    db.session.commit()
+
+    _get(client, path)
+    _, first = _get(client, path)
+    status, second = _get(client, path)
+    assert status == 'HIT'
+    assert first == second
+
+    response = client.post('/api/v1/cakes', json={'name': 'New Cached Cake', 'flavor': 'Cacheberry', 'price': 5.0})
+    assert response.status_code == 201
+    status, after = _get(client, path)
+    assert status != 'HIT'
+    assert len(after) == 2
+
+
+def test_cached_cake_detail_is_invalidated_by_update(client, db, cache_enabled):
+    cake = Cake(name='Detail Cached Cake', flavor='Vanilla', price=4.0)
+    db.session.add(cake)
+    db.session.commit()
+    path = f'/api/v1/cakes/{cake.id}'
+
+    _get(client, path)
+    _get(client, path)
+    assert _get(client, path)[0] == 'HIT'
+
+    client.put(path, json={'price': 9.0})
+    status, data = _get(client, path)
+    assert status != 'HIT'
+    assert data['price'] == 9.0
+
+
+def test_unrelated_write_keeps_detail_cached(client, db, cache_enabled):
+    cake = Cake(name='Untouched Cached Cake', flavor='Vanilla', price=4.0)
+    db.session.add(cake)
+    db.session.commit()
+    path = f'/api/v1/cakes/{cake.id}'
+
+    _get(client, path)
+    _get(client, path)
+    client.post('/api/v1/bakeries', json={'name': 'Unrelated Bakery', 'location': 'Elsewhere', 'rating': 3})
+    assert _get(client, path)[0] == 'HIT'
+
+
+def test_link_invalidates_bakery_cakes(client, db, cache_enabled):
+    cake = Cake(name='Linked Cached Cake', flavor='Vanilla', price=4.0)
+    bakery = Bakery(name='Cached Bakery', location='1 Cache St', rating=4)
+    db.session.add_all([cake, bakery])
+    db.session.commit()
+    path = f'/api/v1/bakeries/{bakery.id}/cakes'
+
+    _get(client, path)
+    assert _get(client, path)[1] == []
+    client.post(f'/api/v1/cakes/{cake.id}/bakeries/{bakery.id}')
+    assert [c['name'] for c in _get(client, path)[1]] == ['Linked Cached Cake']
+
+
+def test_query_args_are_normalised(client, cache_enabled):
+    _get(client, '/api/v1/cakes?max_price=1.5&flavor=Order')
+    _get(client, '/api/v1/cakes?max_price=1.5&flavor=Order')
+    assert _get(client, '/api/v1/cakes?flavor=Order&max_price=1.5')[0] == 'HIT'
+
+
+def test_cache_stats(client, cache_enabled):
+    client.get('/api/v1/bakeries?stats=1')
+    client.get('/api/v1/bakeries?stats=1')
+    before = client.get('/api/v1/cache/stats').get_json()
+    client.get('/api/v1/bakeries?stats=1')
+    client.get('/api/v1/bakeries?stats=1')
+    client.get('/api/v1/bakeries?stats=2')
+    after = client.get('/api/v1/cache/stats').get_json()
+    assert after['hits'] - before['hits'] == 2
+    assert after['misses'] - before['misses'] == 1
+
+
+def test_streams_bypass_cache(client, cache_enabled):
+    client.get('/api/v1/cakes?flavor=Bypass')
+    client.get('/api/v1/cakes?flavor=Bypass')
+    response = client.get('/api/v1/cakes?flavor=Bypass', headers={'Accept': 'application/x-ndjson'})
+    assert response.mimetype == 'application/x-ndjson'
+    assert 'X-Cache' not in response.headers
+
+
+def test_writes_outside_this_process_are_not_served_from_cache(client, db, cache_enabled):
+    cake = Cake(name='Elsewhere Cached Cake', flavor='Vanilla', price=4.0)
+    db.session.add(cake)
+    db.session.commit()
+    path = f'/api/v1/cakes/{cake.id}'
+    _get(client, path)
+    _get(client, path)
+    assert _get(client, path)[0] == 'HIT'
+
+    # Like a write from another worker: the table version moves, this process's tag tokens don't.
+    db.session.execute(update(Cake).where(Cake.id == cake.id).values(price=7.0))
+    bump_versions(['cake'])
+    db.session.commit()
+    status, data = _get(client, path)
+    assert status != 'HIT'
+    assert data['price'] == 7.0
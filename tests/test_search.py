@@ -0,0 +1,97 @@
+from sqlalchemy import event, text
+import app.search
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Cake, Bakery
+from app.search import search_available
+
+
+def _names(response):
+    return [cake['name'] for cake in response.get_json()]
+
+
+def test_search_index_is_created(db):
+    assert search_available()
+
+
+def test_search_matches_name_and_flavor_prefixes(client, db):
+    db.session.add_all([
+        Cake(name='Zesty Quandong Tart', flavor='Lemon', price=5.0),
+        Cake(name='Plain Sponge', flavor='Quandong Cream', price=6.0),
+        Cake(name='Unrelated Sponge', flavor='Vanilla', price=7.0),
+    ])
+    db.session.commit()
+
+    assert sorted(_names(client.get('/api/v1/cakes?q=quand'))) == ['Plain Sponge', 'Zesty Quandong Tart']
+    assert _names(client.get('/api/v1/cakes?q=quandong zest')) == ['Zesty Quandong Tart']
+
+
+def test_search_ranks_better_matches_first(client, db):
+    db.session.add_all([
+        Cake(name='Kumquat Sponge With A Very Long Descriptive Name', flavor='Vanilla', price=5.0),
+        Cake(name='Kumquat Kumquat', flavor='Kumquat', price=6.0),
+    ])
+    db.session.commit()
+
+    assert _names(client.get('/api/v1/cakes?q=kumquat'))[0] == 'Kumquat Kumquat'
+
+
+def test_search_index_follows_updates_and_deletes(client, db):
+    cake = Cake(name='Feijoa Loaf', flavor='Feijoa', price=5.0)
+    db.session.add(cake)
+    db.session.commit()
+
+    client.put(f'/api/v1/cakes/{cake.id}', json={'name': 'Tamarillo Loaf', 'flavor': 'Tamarillo'})
+    assert _names(client.get('/api/v1/cakes?q=feijoa')) == []
+    assert _names(client.get('/api/v1/cakes?q=tamarillo')) == ['Tamarillo Loaf']
+
+    client.delete(f'/api/v1/cakes/{cake.id}')
+    assert _names(client.get('/api/v1/cakes?q=tamarillo')) == []
+
+
+def test_search_combines_with_filters_and_pages(client, db):
+    bakery = Bakery(name='Search Bakery', location='1 Find St', rating=4)
+    for i in range(3):
+        cake = Cake(name=f'Jabuticaba Cake {i}', flavor='Jabuticaba', price=float(i))
+        cake.bakeries.append(bakery)
+        db.session.add(cake)
+    db.session.commit()
+
+    assert len(_names(client.get('/api/v1/cakes?q=jabuticaba&max_price=1'))) == 2
+    page = client.get('/api/v1/cakes?q=jabuticaba&page=1&limit=2').get_json()
+    assert page['total_items'] == 3
+    assert len(page['cakes']) == 2
+    assert len(_names(client.get(f'/api/v1/bakeries/{bakery.id}/cakes?q=jabuticaba'))) == 3
+
+
+def test_search_without_terms_matches_nothing(client):
+    assert client.get('/api/v1/cakes?q=%20%21').get_json() == []
+
+
+def test_search_falls_back_to_ilike(client, db, monkeypatch):
+    monkeypatch.setattr(app.search, 'search_available', lambda: False)
+    db.session.add(Cake(name='Fallback Rambutan', flavor='Rambutan', price=5.0))
+    db.session.commit()
+
+    assert _names(client.get('/api/v1/cakes?q=butan')) == ['Fallback Rambutan']
+
+
+def test_missing_index_is_looked_up_once(tmp_path):
+    class NoIndexConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path}/no_index.db'
+
+    no_index = create_app(NoIndexConfig)
+    statements = []
+    with no_index.app_context():
+        db.create_all()
+        db.session.execute(text('DROP TABLE cake_fts'))
+        db.session.commit()
+        app.search._available.pop(db.engine.url)
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+    client = no_index.test_client()
+    for _ in range(2):
+        assert client.get('/api/v1/cakes?q=sponge').status_code == 200
+    assert sum('sqlite_master' in statement for statement in statements) == 1
+    with no_index.app_context():
+        db.engine.dispose()
@@ -0,0 +1,74 @@
+import pytest
+from app.models import Cake, Bakery
+from app.routes import cake_schema, bakery_schema, cake_serializer, bakery_serializer
+
+
+@pytest.fixture
+def catalog(db):
+    bakery = Bakery(name='Équivalence Bakery', location='1 Byte St', rating=5)
+    cakes = [
+        Cake(name='Plain Float Cake', flavor='Equivalence', price=20),
+        Cake(name='Tiny Price Cake', flavor='Equivalence', price=0.1, available=False),
+        Cake(name='Huge Price Cake', flavor='Equivalence', price=1e20, available=True),
+        Cake(name='Ünïcødé Cake 🎂', flavor='Equivalence', price=3.333333333333333),
+        Cake(name='Quote "Cake"', flavor='Equivalence', price=0.0, available=None),
+    ]
+    for cake in cakes:
+        cake.bakeries.append(bakery)
+        db.session.add(cake)
+    db.session.commit()
+    return bakery
+
+
+def test_cake_rows_match_schema(app, db, catalog):
+    query = Cake.query.filter(Cake.flavor == 'Equivalence').order_by(Cake.id)
+    expected = app.json.dumps(cake_schema.dump(query.all(), many=True))
+    rows = query.with_entities(*cake_serializer.columns).all()
+    assert app.json.dumps([cake_serializer.dump_row(row) for row in rows]) == expected
+
+
+def test_bakery_rows_match_schema(app, db, catalog):
+    query = Bakery.query.order_by(Bakery.id)
+    expected = app.json.dumps(bakery_schema.dump(query.all(), many=True))
+    rows = query.with_entities(*bakery_serializer.columns).all()
+    assert app.json.dumps([bakery_serializer.dump_row(row) for row in rows]) == expected
+
+
+def test_dump_row_preserves_field_order(db, catalog):
+    row = Cake.query.filter(Cake.flavor == 'Equivalence').with_entities(*cake_serializer.columns).first()
+    cake = Cake.query.filter(Cake.flavor == 'Equivalence').first()
+    assert list(cake_serializer.dump_row(row)) == list(cake_schema.dump(cake))
+
+
+@pytest.mark.parametrize('path', [
+    '/api/v1/cakes?flavor=Equivalence',
+    '/api/v1/cakes?flavor=Equivalence&page=1&limit=2',
+    '/api/v1/cakes?flavor=Equivalence&cursor=&limit=2',
+    '/api/v1/cakes?flavor=Equivalence&stream=1',
+    '/api/v1/bakeries',
+    '/api/v1/bakeries?stream=1',
+])
+def test_endpoint_bytes_match_schema_path(app, client, catalog, monkeypatch, path):
+    fast = client.get(path)
+    fast_data = fast.get_data()
+    monkeypatch.setitem(app.config, 'FAST_SERIALIZER', False)
+    slow = client.get(path)
+    assert fast.status_code == slow.status_code == 200
+    assert fast_data == slow.get_data()
+
+
+def test_detail_endpoints_match_schema_path(app, client, catalog, monkeypatch):
+    cake_id = Cake.query.filter(Cake.flavor == 'Equivalence').first().id
+    paths = [
+        f'/api/v1/cakes/{cake_id}',
+        f'/api/v1/bakeries/{catalog.id}',
+        f'/api/v1/bakeries/{catalog.id}/cakes',
+    ]
+    fast = [client.get(path).get_data() for path in paths]
+    monkeypatch.setitem(app.config, 'FAST_SERIALIZER', False)
+    assert [client.get(path).get_data() for path in paths] == fast
+
+
+def test_detail_not_found(client):
+    assert client.get('/api/v1/cakes/999999').status_code == 404
+    assert client.get('/api/v1/bakeries/999999').status_code == 404
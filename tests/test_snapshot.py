@@ -0,0 +1,111 @@
+import io
+import tarfile
+import pytest
+from sqlalchemy import func, select
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Cake
+from app.snapshot import _point_in_time
+
+
+def _make_app(path, **settings):
+    class SnapshotConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+    for name, value in settings.items():
+        setattr(SnapshotConfig, name, value)
+
+    app = create_app(SnapshotConfig)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+@pytest.fixture
+def source(tmp_path):
+    # WAL lets a writer commit while an export's read transaction is open.
+    app = _make_app(tmp_path / 'source.db', SQLITE_PRAGMAS={'journal_mode': 'WAL'})
+    client = app.test_client()
+    bakery = client.post('/api/v1/bakeries', json={'name': 'Snap Bakery', 'location': 'Pier 1', 'rating': 5}).get_json()
+    for i in range(5):
+        cake = client.post('/api/v1/cakes', json={
+            'name': f'Snap Cake {i}', 'flavor': 'Snapfruit', 'price': 1.1 * (i + 1), 'available': i % 2 == 0,
+        }).get_json()
+        if i < 3:
+            client.post(f"/api/v1/cakes/{cake['id']}/bakeries/{bakery['id']}")
+    return app
+
+
+@pytest.fixture
+def target(tmp_path):
+    return _make_app(tmp_path / 'target.db')
+
+
+def _catalog(client):
+    return (client.get('/api/v1/cakes').get_json(), client.get('/api/v1/bakeries?include=cakes').get_json(),
+            client.get('/api/v1/bakeries/stats').get_json())
+
+
+def test_round_trip_through_endpoints(source, target):
+    response = source.test_client().get('/api/v1/catalog/snapshot?chunk_size=2')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-tar'
+    snapshot = response.get_data()
+    with tarfile.open(fileobj=io.BytesIO(snapshot)) as archive:
+        assert archive.getnames() == ['manifest.json', 'bakery/000000.csv.gz', 'cake/000000.csv.gz',
+                                      'cake/000001.csv.gz', 'cake/000002.csv.gz',
+                                      'cakes_bakeries/000000.csv.gz', 'cakes_bakeries/000001.csv.gz']
+
+    client = target.test_client()
+    response = client.post('/api/v1/catalog/snapshot', data=snapshot)
+    assert response.status_code == 200
+    assert response.get_json()['loaded'] == {'bakery': 1, 'cake': 5, 'cakes_bakeries': 3}
+    assert _catalog(client) == _catalog(source.test_client())
+    assert client.get('/api/v1/cakes?page=1&limit=2').get_json()['total_items'] == 5
+
+    new = client.post('/api/v1/cakes', json={'name': 'After Load', 'flavor': 'Snapfruit', 'price': 2.0})
+    assert new.get_json()['id'] == 6
+
+
+def test_export_reads_one_point_in_time(source):
+    count = select(func.count()).select_from(Cake)
+    with source.app_context(), _point_in_time(db.engine) as connection:
+        assert connection.scalar(count) == 5
+        source.test_client().post('/api/v1/cakes', json={'name': 'Late Cake', 'flavor': 'Snapfruit', 'price': 3.0})
+        with db.engine.connect() as other:
+            assert other.scalar(count) == 6
+        assert connection.scalar(count) == 5
+
+
+def test_load_refuses_a_non_empty_catalog_unless_replacing(source):
+    client = source.test_client()
+    snapshot = client.get('/api/v1/catalog/snapshot').get_data()
+    client.post('/api/v1/cakes', json={'name': 'Extra', 'flavor': 'Snapfruit', 'price': 2.0})
+
+    response = client.post('/api/v1/catalog/snapshot', data=snapshot)
+    assert response.status_code == 400
+    assert 'not empty' in response.get_json()['error']
+
+    response = client.post('/api/v1/catalog/snapshot?replace=true', data=snapshot)
+    assert response.get_json()['loaded']['cake'] == 5
+    assert len(client.get('/api/v1/cakes').get_json()) == 5
+
+
+def test_load_rejects_garbage(target):
+    response = target.test_client().post('/api/v1/catalog/snapshot', data=b'not a snapshot')
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Invalid snapshot')
+
+
+def test_cli_round_trip(source, target, tmp_path):
+    path = str(tmp_path / 'catalog.tar')
+    # The suite's app context is already pushed, so the CLI wouldn't push these apps' own.
+    with source.app_context():
+        result = source.test_cli_runner().invoke(args=['catalog', 'export', path, '--chunk-size', '2'])
+    assert result.exit_code == 0, result.output
+
+    with target.app_context():
+        result = target.test_cli_runner().invoke(args=['catalog', 'import', path])
+    assert result.exit_code == 0, result.output
+    assert result.output.strip() == '1 bakery, 5 cake, 3 cakes_bakeries rows loaded'
+    assert _catalog(target.test_client()) == _catalog(source.test_client())
@@ -0,0 +1,59 @@
+import json
+import pytest
+from app.models import Cake, Bakery
+
+
+@pytest.fixture
+def sparse_cake(db):
+    cake = Cake.query.filter_by(flavor='Sparseberry').first()
+    if cake is not None:
+        return cake
+    cake = Cake(name='Sparse Cake', flavor='Sparseberry', price=3.5)
+    cake.bakeries.append(Bakery(name='Sparse Bakery', location='1 Thin St', rating=4))
+    db.session.add(cake)
+    db.session.commit()
+    return cake
+
+
+@pytest.mark.parametrize('fast', [True, False])
+def test_fields_narrow_select_and_output(client, app, sparse_cake, count_queries, monkeypatch, fast):
+    monkeypatch.setitem(app.config, 'FAST_SERIALIZER', fast)
+    with count_queries() as statements:
+        response = client.get('/api/v1/cakes?flavor=Sparseberry&fields=name,price')
+    assert response.status_code == 200
+    assert response.get_json() == [{'id': sparse_cake.id, 'name': 'Sparse Cake', 'price': 3.5}]
+    columns = next(statement for statement in statements if 'FROM cake' in statement).split('FROM')[0]
+    assert 'cake.name' in columns and 'cake.price' in columns
+    assert 'cake.flavor' not in columns and 'cake.available' not in columns
+
+
+def test_fields_on_detail_pages_and_cursor(client, sparse_cake):
+    response = client.get(f'/api/v1/cakes/{sparse_cake.id}?fields=flavor')
+    assert response.get_json() == {'id': sparse_cake.id, 'flavor': 'Sparseberry'}
+
+    page = client.get('/api/v1/cakes?flavor=Sparseberry&fields=name&cursor=&limit=1').get_json()
+    assert page['cakes'] == [{'id': sparse_cake.id, 'name': 'Sparse Cake'}]
+
+    bakery = sparse_cake.bakeries[0]
+    assert client.get(f'/api/v1/bakeries/{bakery.id}?fields=rating').get_json() == {'id': bakery.id, 'rating': 4}
+    assert client.get(f'/api/v1/bakeries/{bakery.id}/cakes?fields=price').get_json() == \
+        [{'id': sparse_cake.id, 'price': 3.5}]
+
+
+def test_fields_with_include(client, sparse_cake):
+    response = client.get(f'/api/v1/cakes/{sparse_cake.id}?fields=name&include=bakeries')
+    cake = response.get_json()
+    assert set(cake) == {'id', 'name', 'bakeries'}
+    assert cake['bakeries'][0]['name'] == 'Sparse Bakery'
+
+
+def test_fields_stream(client, sparse_cake):
+    response = client.get('/api/v1/cakes?flavor=Sparseberry&fields=name&stream=1')
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line) for line in lines] == [{'id': sparse_cake.id, 'name': 'Sparse Cake'}]
+
+
+def test_unknown_field(client):
+    response = client.get('/api/v1/cakes?fields=name,secret')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Unknown field: secret'
@@ -0,0 +1,134 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from app.models import BakeryStats
+from app.stats import needs_lock, rebuild_bakery_stats, refresh_statements
+
+
+def _bakery(client, name):
+    return client.post('/api/v1/bakeries', json={'name': name, 'location': '1 Stats St', 'rating': 4}).get_json()
+
+
+def _cake(client, flavor, price):
+    return client.post('/api/v1/cakes', json={'name': f'{flavor} Cake', 'flavor': flavor, 'price': price}).get_json()
+
+
+def _stats(client, bakery_id):
+    response = client.get(f'/api/v1/bakeries/{bakery_id}/stats')
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_bakery_stats_follow_writes(client):
+    bakery = _bakery(client, 'Stats Bakery')
+    assert _stats(client, bakery['id']) == {
+        'bakery_id': bakery['id'], 'name': 'Stats Bakery', 'cake_count': 0,
+        'avg_price': None, 'min_price': None, 'max_price': None, 'flavors': {},
+    }
+
+    cakes = [_cake(client, 'Statsfruit', 2.0), _cake(client, 'Statsfruit', 4.0), _cake(client, 'Statsnut', 9.0)]
+    for cake in cakes:
+        client.post(f"/api/v1/cakes/{cake['id']}/bakeries/{bakery['id']}")
+    stats = _stats(client, bakery['id'])
+    assert (stats['cake_count'], stats['avg_price'], stats['min_price'], stats['max_price']) == (3, 5.0, 2.0, 9.0)
+    assert stats['flavors'] == {'Statsfruit': 2, 'Statsnut': 1}
+
+    client.put(f"/api/v1/cakes/{cakes[2]['id']}", json={'price': 3.0, 'flavor': 'Statsfruit'})
+    assert _stats(client, bakery['id'])['flavors'] == {'Statsfruit': 3}
+    assert _stats(client, bakery['id'])['max_price'] == 4.0
+
+    client.delete(f"/api/v1/cakes/{cakes[1]['id']}")
+    client.delete(f"/api/v1/cakes/{cakes[0]['id']}/bakeries/{bakery['id']}")
+    stats = _stats(client, bakery['id'])
+    assert (stats['cake_count'], stats['min_price'], stats['max_price']) == (1, 3.0, 3.0)
+
+
+def test_bakery_stats_follow_batch_writes(client):
+    bakery = _bakery(client, 'Batch Stats Bakery')
+    cakes = [_cake(client, 'Bulkstatsfruit', float(price)) for price in (1, 2, 3)]
+    client.post('/api/v1/cakes/bakeries:batch', json=[{'cake_id': cake['id'], 'bakery_id': bakery['id']}
+                                                      for cake in cakes])
+    assert _stats(client, bakery['id'])['cake_count'] == 3
+
+    client.put('/api/v1/cakes:batch', json=[{'id': cakes[0]['id'], 'price': 10.0}])
+    assert _stats(client, bakery['id'])['max_price'] == 10.0
+
+    client.delete('/api/v1/cakes:batch', json=[cakes[0]['id']])
+    client.delete('/api/v1/cakes/bakeries:batch', json=[{'cake_id': cakes[1]['id'], 'bakery_id': bakery['id']}])
+    assert _stats(client, bakery['id'])['cake_count'] == 1
+
+    client.delete('/api/v1/bakeries:batch', json=[bakery['id']])
+    assert client.get(f"/api/v1/bakeries/{bakery['id']}/stats").status_code == 404
+    assert BakeryStats.query.filter_by(bakery_id=bakery['id']).first() is None
+
+
+def test_bakeries_stats_lists_every_bakery(client):
+    bakery = _bakery(client, 'Listed Stats Bakery')
+    stats = client.get('/api/v1/bakeries/stats').get_json()
+    assert [row['bakery_id'] for row in stats] == sorted(row['bakery_id'] for row in stats)
+    assert any(row['bakery_id'] == bakery['id'] and row['cake_count'] == 0 for row in stats)
+
+
+def test_rebuild_matches_incremental_stats(client, db):
+    bakery = _bakery(client, 'Rebuild Bakery')
+    for price in (5.0, 7.0):
+        cake = _cake(client, 'Rebuildberry', price)
+        client.post(f"/api/v1/cakes/{cake['id']}/bakeries/{bakery['id']}")
+    incremental = _stats(client, bakery['id'])
+
+    rebuild_bakery_stats()
+    db.session.commit()
+    assert _stats(client, bakery['id']) == incremental
+
+
+def test_cake_stats_group_by(client):
+    _cake(client, 'Groupberry', 2.0)
+    _cake(client, 'Groupberry', 6.0)
+
+    overall = client.get('/api/v1/cakes/stats').get_json()
+    assert overall['cake_count'] >= 2
+
+    response = client.get('/api/v1/cakes/stats?group_by=flavor')
+    assert response.status_code == 200
+    groups = {group['flavor']: group for group in response.get_json()['groups']}
+    assert groups['Groupberry'] == {'flavor': 'Groupberry', 'cake_count': 2, 'avg_price': 4.0,
+                                    'min_price': 2.0, 'max_price': 6.0}
+    assert sum(group['cake_count'] for group in groups.values()) == overall['cake_count']
+
+    response = client.get('/api/v1/cakes/stats?group_by=name')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'group_by must be one of: flavor, available'
+
+
+def _flavor_groups(client):
+    response = client.get('/api/v1/cakes/stats?group_by=flavor')
+    return {group['flavor']: group['cake_count'] for group in response.get_json()['groups']}
+
+
+def test_cake_stats_follow_writes_without_scanning_cakes(client, db, count_queries):
+    cakes = [_cake(client, 'Driftberry', 2.0), _cake(client, 'Driftberry', 4.0)]
+    client.put(f"/api/v1/cakes/{cakes[1]['id']}", json={'flavor': 'Driftnut', 'available': False})
+    assert _flavor_groups(client)['Driftberry'] == 1
+    available = client.get('/api/v1/cakes/stats?group_by=available').get_json()['groups']
+    assert [group['available'] for group in available] == [False, True]
+
+    client.post('/api/v1/cakes:batch', json=[{'name': 'Drift Cake', 'flavor': 'Driftnut', 'price': 8.0}])
+    client.put('/api/v1/cakes:batch', json=[{'id': cakes[0]['id'], 'flavor': 'Driftnut'}])
+    assert _flavor_groups(client)['Driftnut'] == 3 and 'Driftberry' not in _flavor_groups(client)
+
+    client.delete(f"/api/v1/cakes/{cakes[1]['id']}")
+    client.delete('/api/v1/cakes:batch', json=[cakes[0]['id']])
+    assert _flavor_groups(client)['Driftnut'] == 1
+
+    with count_queries() as statements:
+        incremental = client.get('/api/v1/cakes/stats?group_by=flavor').get_json()
+    assert not any('FROM cake ' in statement or statement.endswith('FROM cake') for statement in statements)
+    rebuild_bakery_stats()
+    db.session.commit()
+    assert client.get('/api/v1/cakes/stats?group_by=flavor').get_json() == incremental
+
+
+def test_refresh_locks_the_bakeries_first_where_needed():
+    lock, *rest = refresh_statements([3, 1], lock=True)
+    sql = str(lock.compile(dialect=postgresql.dialect()))
+    assert sql.startswith('SELECT bakery.id') and sql.endswith('ORDER BY bakery.id FOR UPDATE')
+    assert len(rest) == len(refresh_statements([3, 1]))
+    assert needs_lock(postgresql.dialect()) and not needs_lock(sqlite.dialect())
@@ -0,0 +1,69 @@
+import json
+from app.models import Cake, Bakery
+
+
+def _lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_stream_cakes_with_query_arg(client, db):
+    for i in range(3):
+        db.session.add(Cake(name=f'Streamed Cake {i}', flavor='Streamberry', price=3.0))
+    db.session.commit()
+
+    response = client.get('/api/v1/cakes?flavor=Streamberry&stream=1')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert [cake['name'] for cake in _lines(response)] == [f'Streamed Cake {i}' for i in range(3)]
+
+
+def test_stream_cakes_with_accept_header(client, db):
+    db.session.add(Cake(name='Accepted Cake', flavor='Acceptberry', price=3.0))
+    db.session.commit()
+
+    response = client.get('/api/v1/cakes?flavor=Acceptberry', headers={'Accept': 'application/x-ndjson'})
+    assert response.mimetype == 'application/x-ndjson'
+    assert _lines(response)[0]['name'] == 'Accepted Cake'
+
+
+def test_stream_matches_json_response(client, db):
+    db.session.add(Cake(name='Same Cake', flavor='Sameberry', price=4.5))
+    db.session.commit()
+
+    streamed = _lines(client.get('/api/v1/cakes?flavor=Sameberry&stream=1'))
+    assert streamed == client.get('/api/v1/cakes?flavor=Sameberry').get_json()
+
+
+def test_stream_batches_larger_than_batch_size(client, db, app, monkeypatch):
+    monkeypatch.setitem(app.config, 'STREAM_BATCH_SIZE', 2)
+    for i in range(5):
+        db.session.add(Cake(name=f'Batched Cake {i}', flavor='Batchberry', price=1.0))
+    db.session.commit()
+
+    response = client.get('/api/v1/cakes?flavor=Batchberry&stream=1')
+    assert len(_lines(response)) == 5
+
+
+def test_stream_bakeries(client, db):
+    db.session.add(Bakery(name='Streaming Bakery', location='1 Stream St', rating=4))
+    db.session.commit()
+
+    response = client.get('/api/v1/bakeries?stream=1')
+    assert response.mimetype == 'application/x-ndjson'
+    assert 'Streaming Bakery' in [bakery['name'] for bakery in _lines(response)]
+
+
+def test_stream_cakes_by_bakery(client, db):
+    bakery = Bakery(name='Stream Source', location='2 Stream St', rating=5)
+    cake = Cake(name='Bakery Streamed Cake', flavor='Vanilla', price=6.0)
+    cake.bakeries.append(bakery)
+    db.session.add(cake)
+    db.session.commit()
+
+    response = client.get(f'/api/v1/bakeries/{bakery.id}/cakes?stream=1')
+    assert [cake['name'] for cake in _lines(response)] == ['Bakery Streamed Cake']
+
+
+def test_json_is_default(client):
+    response = client.get('/api/v1/cakes', headers={'Accept': '*/*'})
+    assert response.mimetype == 'application/json'